@@ -1,5 +1,6 @@
-from flask import Flask, redirect, url_for
+from flask import Flask, redirect, url_for, request, jsonify
 from flask_cors import CORS
+from markupsafe import escape
 from config import Config
 
 def create_app():
@@ -9,6 +10,14 @@ def create_app():
     # Initialize CORS
     CORS(app)
 
+    # Per-request query ledger (Server-Timing header + N+1 detector)
+    from models import query_ledger
+    query_ledger.init_app(app)
+
+    # Cola que reindexa los documentos RAG de los productos que cambian
+    from models.rag_refresh import init_rag_refresh
+    init_rag_refresh()
+
     # Register Blueprints
     from controllers.auth import auth_bp
     from controllers.main import main_bp
@@ -38,6 +47,30 @@ def create_app():
     def index():
         return redirect(url_for('main.dashboard'))
 
+    # Backend de datos caído o lento: 503 en lugar de páginas vacías. Los 4xx de
+    # PostgREST (restricciones, filtros inválidos, RPC inexistente) no se arreglan
+    # reintentando: se devuelven con su status y el mensaje real.
+    from models.db import SupabaseError, SupabaseHTTPError, CircuitOpenError, ResiliencePolicy
+    @app.errorhandler(SupabaseError)
+    def database_error(e):
+        app.logger.error(f"Supabase error on {request.path}: {e}")
+        headers = {}
+        if isinstance(e, CircuitOpenError) or ResiliencePolicy.is_backend_failure(e):
+            status, message = 503, 'Base de datos no disponible, intente nuevamente'
+            page = 'Base de datos no disponible, intente nuevamente en unos segundos.'
+            if isinstance(e, CircuitOpenError):
+                headers['Retry-After'] = str(max(1, int(e.retry_after)))
+        elif isinstance(e, SupabaseHTTPError) and 400 <= e.status < 500 and e.status not in (401, 403):
+            # 401/403 indican credenciales del servidor mal configuradas, no un error del cliente
+            status, message = e.status, e.message
+            page = escape(message)
+        else:
+            status, message = 500, str(e)
+            page = escape(message)
+        if request.path.startswith('/api/') or request.accept_mimetypes.best == 'application/json':
+            return jsonify({'error': message}), status, headers
+        return page, status, headers
+
     return app
 
 if __name__ == '__main__':
@@ -0,0 +1,155 @@
+"""
+Comparación de proveedores de embeddings para el RAG: latencia y recall.
+
+Arma un catálogo sintético de farmacia (documentos con el mismo formato que
+models/rag_indexer.py) y consultas como las teclearía un trabajador: en
+minúsculas, sin acentos, con errores de tipeo o sólo parte del nombre. Para
+cada proveedor mide el tiempo de embeber el corpus, la latencia por consulta
+y el recall@1 / recall@k y MRR buscando con el índice vectorial local.
+
+    python benchmarks/bench_embeddings.py
+    python benchmarks/bench_embeddings.py --providers local,cohere --k 5
+
+'cohere' necesita COHERE_API_KEY (se omite si no está); 'palabras' es el
+hashing de palabras de benchmarks/fixtures.py como línea base.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+import unicodedata
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from benchmarks.fixtures import HashEmbeddings, percentile
+from models.embeddings import get_embeddings, embeddings_available
+from models.rag_indexer import _product_document
+from models.vector_index import VectorIndex
+
+load_dotenv()
+
+DROGAS = ['Paracetamol', 'Ibuprofeno', 'Amoxicilina', 'Omeprazol', 'Loratadina', 'Metformina', 'Losartán',
+          'Diclofenaco', 'Azitromicina', 'Cetirizina', 'Salbutamol', 'Atorvastatina', 'Ácido Fólico',
+          'Vitamina C', 'Naproxeno', 'Ranitidina', 'Clonazepam', 'Enalapril', 'Dexametasona', 'Ketorolaco']
+DOSIS = ['50mg', '100mg', '250mg', '400mg', '500mg', '1g']
+PRESENTACIONES = ['Caja x 10', 'Caja x 20', 'Frasco 120ml', 'Blíster x 10']
+CATEGORIAS = ['Analgésicos', 'Antibióticos', 'Gastrointestinal', 'Antialérgicos', 'Cardiovascular']
+
+
+def build_corpus(productos, rng):
+    """Documentos de productos (formato del indexador) y sus nombres"""
+    nombres = sorted({f'{d} {s}' for d in DROGAS for s in DOSIS})
+    rng.shuffle(nombres)
+    docs = []
+    for i, nombre in enumerate(nombres[:productos], start=1):
+        docs.append(_product_document({
+            'idarticulo': i, 'nombre': nombre, 'descripcion': f'{nombre} genérico',
+            'stock': rng.randint(0, 300), 'precio_venta': round(rng.uniform(1, 120), 2),
+            'fecha_vencimiento': f'2027-{rng.randint(1, 12):02d}-15',
+            'categoria': {'nombre': rng.choice(CATEGORIAS)}, 'presentacion': {'nombre': rng.choice(PRESENTACIONES)},
+        }))
+    return docs
+
+
+def typo(word, rng):
+    if len(word) < 4:
+        return word
+    i = rng.randint(1, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def plain(text):
+    return ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+
+
+def build_queries(docs, n, rng):
+    """(consulta, id esperado): variantes del nombre del producto"""
+    forms = [
+        lambda nombre: f'cuánto cuesta {nombre.lower()}',
+        lambda nombre: f'stock de {plain(nombre).lower()}',
+        lambda nombre: ' '.join(typo(w, rng) for w in nombre.split()),
+        lambda nombre: f'hay {nombre.split()[0].lower()} de {nombre.split()[-1]}',
+    ]
+    queries = []
+    for _ in range(n):
+        doc = rng.choice(docs)
+        queries.append((rng.choice(forms)(doc['metadata']['nombre']), doc['metadata']['id']))
+    return queries
+
+
+def evaluate(name, embeddings, docs, queries, k):
+    start = time.perf_counter()
+    vectors = embeddings.embed_documents([d['content'] for d in docs])
+    index_s = time.perf_counter() - start
+    index = VectorIndex.from_rows([
+        {'id': d['metadata']['id'], 'content': d['content'], 'embedding': v, 'metadata': d['metadata']}
+        for d, v in zip(docs, vectors)
+    ])
+
+    latencies, hits1, hitsk, reciprocal = [], 0, 0, 0.0
+    for text, expected in queries:
+        start = time.perf_counter()
+        vector = embeddings.embed_query(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ranked = [r['id'] for r in index.search(vector, top_k=k, threshold=-1)]
+        if ranked[:1] == [expected]:
+            hits1 += 1
+        if expected in ranked:
+            hitsk += 1
+            reciprocal += 1 / (ranked.index(expected) + 1)
+    return {
+        'provider': name,
+        'model': getattr(embeddings, 'model', type(embeddings).__name__),
+        'index_ms_per_doc': round(index_s * 1000 / len(docs), 3),
+        'query_median_ms': round(statistics.median(latencies), 3),
+        'query_p95_ms': round(percentile(latencies, 95), 3),
+        'recall@1': round(hits1 / len(queries), 3),
+        f'recall@{k}': round(hitsk / len(queries), 3),
+        'mrr': round(reciprocal / len(queries), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--providers', default='palabras,local,cohere')
+    parser.add_argument('--productos', type=int, default=100)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='guardar los resultados en este JSON')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    docs = build_corpus(args.productos, rng)
+    queries = build_queries(docs, args.queries, rng)
+
+    results = []
+    print(f"=== EMBEDDINGS ({len(docs)} documentos, {len(queries)} consultas, k={args.k}) ===\n")
+    print(f"{'proveedor':<10} {'indexar ms/doc':>14} {'consulta p50':>13} {'p95':>8} "
+          f"{'recall@1':>9} {f'recall@{args.k}':>9} {'mrr':>6}")
+    for name in [p.strip() for p in args.providers.split(',') if p.strip()]:
+        if name == 'palabras':
+            embeddings = HashEmbeddings()
+        elif not embeddings_available(name):
+            print(f"{name:<10} (omitido: proveedor no disponible)")
+            continue
+        else:
+            embeddings = get_embeddings(name)
+        result = evaluate(name, embeddings, docs, queries, args.k)
+        results.append(result)
+        print(f"{name:<10} {result['index_ms_per_doc']:>14.3f} {result['query_median_ms']:>13.3f} "
+              f"{result['query_p95_ms']:>8.3f} {result['recall@1']:>9.3f} {result[f'recall@{args.k}']:>9.3f} "
+              f"{result['mrr']:>6.3f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'productos': len(docs), 'queries': len(queries), 'k': args.k, 'results': results}, f, indent=2)
+        print(f"\nResultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Micro-benchmarks de los caminos calientes sobre el backend SQLite local
+(sin Supabase, Groq ni Cohere):
+
+    python benchmarks/bench_hot_paths.py --latency-ms 5 --repeat 30
+    python benchmarks/bench_hot_paths.py --compare benchmarks/results/hot_paths-abc1234.json
+
+Cada caso registra mediana, p95, media, ops/s y consultas a PostgREST por
+llamada. Los resultados se guardan en JSON para comparar entre commits;
+con --compare se imprime la variación y se sale con código 1 si alguna
+mediana empeora más que --fail-over (%).
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+import subprocess
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import use_local_backend, seed, make_cart, login, percentile, HashEmbeddings
+from models.db import add_query_listener, remove_query_listener
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return 'unknown'
+
+
+def measure(fn, repeat, warmup=2):
+    """Ejecutar fn `repeat` veces y devolver estadísticas en ms + consultas por llamada"""
+    for _ in range(warmup):
+        fn()
+    queries = []
+    add_query_listener(queries.append)
+    samples = []
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - start) * 1000)
+    finally:
+        remove_query_listener(queries.append)
+    median = statistics.median(samples)
+    return {
+        'median_ms': round(median, 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'mean_ms': round(statistics.mean(samples), 3),
+        'min_ms': round(min(samples), 3),
+        'ops_per_s': round(1000 / median, 1) if median else None,
+        'queries_per_call': round(len(queries) / repeat, 2),
+        'repeat': repeat,
+    }
+
+
+def build_cases(db, app, args):
+    """Casos a medir: nombre -> función sin argumentos"""
+    from controllers.chatbot import get_database_context
+    from models import dashboard_stats
+    from models.rag import RAGManager
+    from models.vector_index import LocalVectorStore
+
+    client = app.test_client()
+    login(client)
+
+    def check(response):
+        assert response.status_code == 200, response.status_code
+        return response
+
+    def cold_dashboard():
+        # Sin snapshot la vista recalcula las estadísticas en la petición; con uno
+        # caliente sólo se mediría el render (stale-while-revalidate, 0 consultas)
+        dashboard_stats._snapshot = None
+        return check(client.get('/'))
+
+    def build_query():
+        db.table('venta').select('*, cliente(nombre, apellidos)') \
+            .gte('fecha_hora', '2026-01-01 00:00:00').lte('fecha_hora', '2026-01-31 23:59:59') \
+            .in_('estado', ['completada', 'anulada']).order('fecha_hora', desc=True).limit(50) \
+            ._build_query_string()
+
+    rag = RAGManager()
+    rag.embeddings = HashEmbeddings()
+    rag.vector_store = None
+    rag_local = RAGManager()
+    rag_local.embeddings = HashEmbeddings()
+    rag_local.vector_store = LocalVectorStore(lambda: db)
+
+    cases = {
+        'db.build_query_string': build_query,
+        'db.execute_select_by_id': lambda: db.table('articulo').select('*').eq('idarticulo', 7).single().execute(),
+        'dashboard.load_stats': lambda: dashboard_stats.load_dashboard_stats(db),
+        'main.dashboard': cold_dashboard,
+        'sales.lookup': lambda: check(client.get('/sales/lookup?q=producto 1')),
+        'sales.invoice_pdf': lambda: check(client.get('/sales/invoice_pdf/1')),
+        'chatbot.get_database_context': lambda: get_database_context(
+            'resumen de ventas, stock de productos por categoría y vencimientos', db),
+        'rag.search_relevant_docs': lambda: rag.search_relevant_docs('dosis y precio del producto 12', top_k=3),
+        'rag.search_relevant_docs[local]': lambda: rag_local.search_relevant_docs('dosis y precio del producto 12', top_k=3),
+    }
+    for size in [int(s) for s in args.cart_sizes.split(',')]:
+        cart = make_cart(size)
+        cases[f'sales.store[{size}]'] = lambda cart=cart: check(client.post('/sales/store', json={'idcliente': 1, 'items': cart}))
+    return cases
+
+
+def compare(current, baseline_path, fail_over):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\n=== COMPARACIÓN vs {baseline['meta']['commit']} ===\n")
+    print(f"{'caso':<32} {'antes ms':>10} {'ahora ms':>10} {'cambio':>8}")
+    regressions = []
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if not before:
+            print(f"{name:<32} {'-':>10} {result['median_ms']:>10.2f} {'nuevo':>8}")
+            continue
+        change = (result['median_ms'] - before['median_ms']) / before['median_ms'] * 100 if before['median_ms'] else 0
+        print(f"{name:<32} {before['median_ms']:>10.2f} {result['median_ms']:>10.2f} {change:>+7.1f}%")
+        if change > fail_over:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='latencia simulada por round trip')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--cart-sizes', default='1,10,50', help='tamaños de carrito para sales.store')
+    parser.add_argument('--productos', type=int, default=500)
+    parser.add_argument('--ventas', type=int, default=2000)
+    parser.add_argument('--only', default='', help='ejecutar sólo los casos que contienen este texto')
+    parser.add_argument('--output', help='ruta del JSON (por defecto benchmarks/results/hot_paths-<commit>.json)')
+    parser.add_argument('--compare', help='JSON de una corrida anterior para comparar')
+    parser.add_argument('--fail-over', type=float, default=20.0, help='%% de empeoramiento que cuenta como regresión')
+    args = parser.parse_args()
+
+    db = use_local_backend(args.latency_ms)
+    seed(db, productos=args.productos, ventas=args.ventas)
+
+    from app import create_app
+    app = create_app()
+    app.config['QUERY_LEDGER_ENABLED'] = False
+
+    results = {}
+    print(f"=== CAMINOS CALIENTES (latencia={args.latency_ms:.1f} ms, repeat={args.repeat}) ===\n")
+    print(f"{'caso':<32} {'mediana':>9} {'p95':>9} {'ops/s':>9} {'queries':>8}")
+    for name, fn in build_cases(db, app, args).items():
+        if args.only and args.only not in name:
+            continue
+        result = measure(fn, args.repeat)
+        results[name] = result
+        print(f"{name:<32} {result['median_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+              f"{result['ops_per_s'] or 0:>9.1f} {result['queries_per_call']:>8.2f}")
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'latency_ms': args.latency_ms,
+            'repeat': args.repeat,
+            'productos': args.productos,
+            'ventas': args.ventas,
+        },
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"hot_paths-{report['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResultados guardados en {output}")
+
+    if args.compare:
+        regressions = compare(report, args.compare, args.fail_over)
+        if regressions:
+            print(f"\n❌ Regresiones (> {args.fail_over:.0f}%): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
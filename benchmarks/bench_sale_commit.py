@@ -0,0 +1,126 @@
+"""
+Benchmark: registro de venta con el bucle por ítem (3N+1 round trips)
+vs. la RPC atómica register_sale (1 round trip).
+
+Usa un transporte simulado con latencia de red configurable, por lo que no
+necesita Supabase:
+
+    python benchmarks/bench_sale_commit.py --rtt-ms 40 --repeat 5
+"""
+import os
+import sys
+import time
+import json
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.db import SupabaseClient
+from models.sale_service import SaleService
+
+
+class _FakeResponse:
+    def __init__(self, data):
+        self.status_code = 200
+        self.headers = {'Content-Type': 'application/json'}
+        self._data = data
+        self.text = json.dumps(data)
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._data
+
+
+class LatencyTransport:
+    """Transporte que simula un round trip a PostgREST con `rtt` segundos de latencia"""
+    def __init__(self, rtt):
+        self.rtt = rtt
+        self.round_trips = 0
+
+    def request(self, method, url, op='select', **kwargs):
+        self.round_trips += 1
+        time.sleep(self.rtt)
+        if '/rpc/register_sale' in url:
+            items = kwargs['json']['p_items']
+            return _FakeResponse({
+                'idventa': 1,
+                'total_venta': sum(i['subtotal'] for i in items),
+                'stocks': [{'idarticulo': i['idarticulo'], 'stock': 100} for i in items]
+            })
+        if method == 'GET':
+            return _FakeResponse([{'stock': 100}])
+        return _FakeResponse([{'idventa': 1}])
+
+    def stats(self):
+        return {'requests': self.round_trips}
+
+
+def legacy_store(db, items, idcliente, idtrabajador):
+    """Copia del flujo anterior de sales.store (inserción + SELECT + PATCH por ítem)"""
+    total_venta = sum(float(item['subtotal']) for item in items)
+    res_venta = db['table']('venta').insert({
+        'idcliente': idcliente,
+        'idtrabajador': idtrabajador,
+        'total_venta': total_venta,
+        'estado': 'completada'
+    }).execute()
+    idventa = res_venta.data[0]['idventa']
+    for item in items:
+        db['table']('detalle_venta').insert({
+            'idventa': idventa,
+            'idarticulo': item['idarticulo'],
+            'cantidad': item['cantidad'],
+            'precio_unitario': item['precio'],
+            'subtotal': item['subtotal']
+        }).execute()
+        curr_prod = db['table']('articulo').select('stock').eq('idarticulo', item['idarticulo']).single().execute()
+        new_stock = curr_prod.data['stock'] - int(item['cantidad'])
+        db['table']('articulo').update({'stock': new_stock}).eq('idarticulo', item['idarticulo']).execute()
+    return idventa
+
+
+def make_cart(n):
+    return [
+        {'idarticulo': i + 1, 'cantidad': 1, 'precio': 2.5, 'subtotal': 2.5}
+        for i in range(n)
+    ]
+
+
+def measure(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rtt-ms', type=float, default=40.0, help='latencia simulada por round trip')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--sizes', default='1,10,50', help='tamaños de carrito separados por coma')
+    args = parser.parse_args()
+
+    print(f"=== REGISTRO DE VENTA (rtt={args.rtt_ms:.0f} ms) ===\n")
+    print(f"{'items':>6} {'legacy rt':>10} {'legacy ms':>10} {'rpc rt':>7} {'rpc ms':>8} {'speedup':>8}")
+    for size in [int(s) for s in args.sizes.split(',')]:
+        cart = make_cart(size)
+
+        legacy_transport = LatencyTransport(args.rtt_ms / 1000)
+        legacy_db = SupabaseClient('http://bench', 'bench', transport=legacy_transport)
+        legacy_ms = measure(lambda: legacy_store(legacy_db, cart, 1, 1), args.repeat)
+
+        rpc_transport = LatencyTransport(args.rtt_ms / 1000)
+        service = SaleService(SupabaseClient('http://bench', 'bench', transport=rpc_transport))
+        rpc_ms = measure(lambda: service.register(cart, idcliente=1, idtrabajador=1), args.repeat)
+
+        print(f"{size:>6} {legacy_transport.round_trips // args.repeat:>10} {legacy_ms:>10.1f} "
+              f"{rpc_transport.round_trips // args.repeat:>7} {rpc_ms:>8.1f} {legacy_ms / rpc_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Utilidades compartidas por los benchmarks: backend SQLite local con datos
+sembrados, embeddings deterministas sin API y sesión de Flask autenticada.
+"""
+import os
+import sys
+import math
+import random
+import hashlib
+from datetime import datetime, timedelta
+from werkzeug.security import generate_password_hash
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+import models.db as db_module
+
+BENCH_USER = 'admin'
+BENCH_PASSWORD = 'bench-admin'
+
+
+def use_local_backend(latency_ms=0.0):
+    """Hacer que get_db() devuelva un cliente nuevo sobre el backend SQLite en memoria"""
+    Config.SUPABASE_BACKEND = 'sqlite'
+    Config.SUPABASE_SQLITE_PATH = ':memory:'
+    Config.SUPABASE_LOCAL_LATENCY_MS = latency_ms
+    db_module._client = None
+    return db_module.get_db()
+
+
+class HashEmbeddings:
+    """Embeddings deterministas por hashing de palabras (mismo interfaz que CohereEmbeddings)"""
+    def __init__(self, dim=1024):
+        self.dim = dim
+
+    def embed_query(self, text):
+        vector = [0.0] * self.dim
+        for word in text.lower().split():
+            digest = hashlib.md5(word.encode()).digest()
+            index = int.from_bytes(digest[:4], 'little') % self.dim
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+
+def seed(db, productos=200, clientes=50, ventas=500, items_por_venta=3, documentos=50, seed_value=42):
+    """Sembrar el backend local con un catálogo, historial de ventas y documentos RAG"""
+    rng = random.Random(seed_value)
+    backend = db.transport
+    hoy = datetime.now()
+
+    backend.bulk_insert('trabajador', [{'nombre': 'Admin', 'apellidos': 'Bench', 'usuario': BENCH_USER,
+                                        'password': generate_password_hash(BENCH_PASSWORD), 'acceso': 'Administrador'}])
+    backend.bulk_insert('categoria', [{'nombre': f'Categoría {i}', 'descripcion': 'Benchmark'} for i in range(1, 11)])
+    backend.bulk_insert('presentacion', [{'nombre': f'Presentación {i}'} for i in range(1, 6)])
+    backend.bulk_insert('cliente', [{'nombre': f'Cliente {i}', 'apellidos': 'Bench'} for i in range(1, clientes + 1)])
+    backend.bulk_insert('articulo', [{
+        'codigo': f'P{i:05d}',
+        'nombre': f'Producto {i}',
+        'descripcion': 'Producto de benchmark',
+        'stock': rng.randint(0, 500) if i % 10 else 10 ** 6,
+        'precio_venta': round(rng.uniform(1, 150), 2),
+        'idcategoria': rng.randint(1, 10),
+        'idpresentacion': rng.randint(1, 5),
+        'estado': 'activo',
+        'tipo_venta': 'COMPLETO',
+        'fecha_vencimiento': (hoy + timedelta(days=rng.randint(-30, 720))).strftime('%Y-%m-%d'),
+    } for i in range(1, productos + 1)])
+
+    filas_venta, filas_detalle = [], []
+    for idventa in range(1, ventas + 1):
+        fecha = hoy - timedelta(minutes=rng.randint(0, 60 * 24 * 30))
+        detalle = []
+        for _ in range(items_por_venta):
+            cantidad = rng.randint(1, 3)
+            precio = round(rng.uniform(1, 150), 2)
+            detalle.append({'idventa': idventa, 'idarticulo': rng.randint(1, productos), 'cantidad': cantidad,
+                            'precio_unitario': precio, 'subtotal': round(precio * cantidad, 2)})
+        filas_detalle.extend(detalle)
+        filas_venta.append({'idventa': idventa, 'idcliente': rng.randint(1, clientes), 'idtrabajador': 1,
+                            'fecha_hora': fecha.strftime('%Y-%m-%d %H:%M:%S'), 'estado': 'completada',
+                            'total_venta': round(sum(d['subtotal'] for d in detalle), 2)})
+    backend.bulk_insert('venta', filas_venta)
+    backend.bulk_insert('detalle_venta', filas_detalle)
+
+    embeddings = HashEmbeddings()
+    textos = [f'Producto {i}: indicaciones, dosis y precio de venta' for i in range(1, documentos + 1)]
+    backend.bulk_insert('documents', [
+        {'content': texto, 'embedding': vector, 'metadata': {'source': 'benchmark'}}
+        for texto, vector in zip(textos, embeddings.embed_documents(textos))
+    ])
+
+
+def percentile(samples, p):
+    """Percentil p (0-100) por rango más cercano"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def make_cart(n, productos=200):
+    """Carrito de n líneas sobre los artículos con stock ilimitado (uno de cada 10)"""
+    ids = list(range(10, productos + 1, 10))
+    return [{'idarticulo': ids[i % len(ids)], 'cantidad': 1, 'precio': 2.5, 'subtotal': 2.5} for i in range(n)]
+
+
+def login(client):
+    """Marcar la sesión del test client como autenticada"""
+    with client.session_transaction() as session:
+        session['logueado'] = True
+        session['idtrabajador'] = 1
+        session['usuario'] = BENCH_USER
+        session['nombre'] = 'Admin Bench'
+        session['rol'] = 'Administrador'
@@ -0,0 +1,241 @@
+"""
+Generador de carga HTTP de punta a punta sobre create_app().
+
+Levanta la app en un servidor WSGI con hilos (o usa --url para apuntar a un
+servidor ya corriendo, p. ej. gunicorn con SUPABASE_BACKEND=sqlite) y
+simula dos tipos de usuario:
+
+  - caja (POS): login, /sales/create, /sales/lookup, /sales/store, /sales/invoice_pdf/<id>
+  - chat:       login, /chatbot/chat
+
+Supabase se reemplaza por el backend SQLite local y Groq/Cohere por stubs
+con latencia configurable. Al final informa throughput y p50/p95/p99 por
+endpoint:
+
+    python benchmarks/load_test.py --pos-users 20 --chat-users 5 --duration 60 --ramp 10 \\
+        --think-ms 500 --db-ms 15 --groq-ms 800 --cohere-ms 120
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from benchmarks.fixtures import (use_local_backend, seed, make_cart, percentile, HashEmbeddings,
+                                 BENCH_USER, BENCH_PASSWORD)
+
+CHAT_MESSAGES = [
+    '¿Qué productos tienen stock bajo?',
+    'Resumen de ventas de hoy',
+    '¿Cuál es el precio del Producto 12?',
+    '¿Qué categorías de productos hay?',
+    '¿Qué medicamentos vencen pronto?',
+]
+
+
+class _FakeCompletions:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def create(self, **kwargs):
+        time.sleep(self.latency)
+        message = type('Message', (), {'content': 'Respuesta simulada del asistente.'})()
+        choice = type('Choice', (), {'message': message})()
+        return type('Completion', (), {'choices': [choice]})()
+
+
+class FakeGroq:
+    """Cliente Groq simulado: misma forma que groq.Groq para chat.completions.create"""
+    def __init__(self, latency):
+        self.chat = type('Chat', (), {'completions': _FakeCompletions(latency)})()
+
+
+class SlowEmbeddings(HashEmbeddings):
+    """Embeddings deterministas con la latencia de una llamada a Cohere"""
+    def __init__(self, latency, dim=1024):
+        super().__init__(dim)
+        self.latency = latency
+
+    def embed_query(self, text):
+        time.sleep(self.latency)
+        return super().embed_query(text)
+
+
+def install_stubs(args):
+    """Backend local sembrado + Groq/Cohere simulados dentro de este proceso"""
+    db = use_local_backend(args.db_ms)
+    seed(db, productos=args.productos, ventas=args.ventas)
+
+    import controllers.chatbot as chatbot
+    import models.rag as rag
+    chatbot.get_groq_client = lambda: FakeGroq(args.groq_ms / 1000)
+    rag.rag_manager = rag.RAGManager()
+    # Igual que en producción: Cohere simulado detrás del cache de embeddings
+    rag.rag_manager.embeddings = rag.CachedEmbeddings(SlowEmbeddings(args.cohere_ms / 1000), rag.get_embedding_cache())
+
+
+def start_server():
+    """Servir create_app() en un hilo con un servidor WSGI multihilo"""
+    from werkzeug.serving import make_server, WSGIRequestHandler
+    from app import create_app
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    app = create_app()
+    app.config['DEBUG'] = False
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+class Stats:
+    """Latencias y errores por endpoint, compartidos por todos los usuarios virtuales"""
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, name, ms, ok):
+        with self._lock:
+            self.samples[name].append(ms)
+            if not ok:
+                self.errors[name] += 1
+
+    def report(self, elapsed):
+        rows = {}
+        for name in sorted(self.samples):
+            samples = self.samples[name]
+            rows[name] = {
+                'requests': len(samples),
+                'errors': self.errors[name],
+                'rps': round(len(samples) / elapsed, 2),
+                'p50_ms': round(percentile(samples, 50), 1),
+                'p95_ms': round(percentile(samples, 95), 1),
+                'p99_ms': round(percentile(samples, 99), 1),
+                'max_ms': round(max(samples), 1),
+            }
+        return rows
+
+
+class VirtualUser(threading.Thread):
+    """Usuario simulado con su propia sesión (cookies) y tiempo de espera entre pasos"""
+    def __init__(self, kind, base_url, stats, args, stop_at, start_delay, seed_value):
+        super().__init__(daemon=True)
+        self.kind = kind
+        self.base_url = base_url
+        self.stats = stats
+        self.args = args
+        self.stop_at = stop_at
+        self.start_delay = start_delay
+        self.rng = random.Random(seed_value)
+        self.session = requests.Session()
+
+    def call(self, name, method, path, **kwargs):
+        start = time.perf_counter()
+        ok = False
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=60, allow_redirects=False, **kwargs)
+            ok = response.status_code < 400
+            if ok and response.headers.get('Content-Type', '').startswith('application/json'):
+                ok = response.json().get('success', True) is not False
+            return response
+        except requests.RequestException:
+            return None
+        finally:
+            self.stats.record(name, (time.perf_counter() - start) * 1000, ok)
+
+    def think(self):
+        if self.args.think_ms:
+            time.sleep(self.rng.expovariate(1000 / self.args.think_ms))
+
+    def run(self):
+        time.sleep(self.start_delay)
+        self.call('POST /login', 'POST', '/login', data={'usuario': BENCH_USER, 'clave': BENCH_PASSWORD})
+        while time.time() < self.stop_at:
+            if self.kind == 'pos':
+                self.pos_iteration()
+            else:
+                self.chat_iteration()
+
+    def pos_iteration(self):
+        self.call('GET /sales/create', 'GET', '/sales/create')
+        self.call('GET /sales/lookup', 'GET', '/sales/lookup', params={'q': f'producto {self.rng.randint(1, 99)}'})
+        self.think()
+        cart = make_cart(self.rng.randint(1, 10), productos=self.args.productos)
+        self.call('POST /sales/store', 'POST', '/sales/store', json={'idcliente': 1, 'items': cart})
+        self.think()
+        idventa = self.rng.randint(1, self.args.ventas)
+        self.call('GET /sales/invoice_pdf', 'GET', f'/sales/invoice_pdf/{idventa}')
+        self.think()
+
+    def chat_iteration(self):
+        message = self.rng.choice(CHAT_MESSAGES)
+        self.call('POST /chatbot/chat', 'POST', '/chatbot/chat', json={'message': message, 'history': []})
+        self.think()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pos-users', type=int, default=10, help='cajas concurrentes')
+    parser.add_argument('--chat-users', type=int, default=2, help='usuarios de chat concurrentes')
+    parser.add_argument('--duration', type=float, default=30, help='segundos de prueba (incluye la rampa)')
+    parser.add_argument('--ramp', type=float, default=5, help='segundos para arrancar a todos los usuarios')
+    parser.add_argument('--think-ms', type=float, default=300, help='espera media entre pasos (exponencial)')
+    parser.add_argument('--db-ms', type=float, default=10, help='latencia simulada de PostgREST por consulta')
+    parser.add_argument('--groq-ms', type=float, default=600, help='latencia simulada de Groq')
+    parser.add_argument('--cohere-ms', type=float, default=100, help='latencia simulada de Cohere')
+    parser.add_argument('--productos', type=int, default=500)
+    parser.add_argument('--ventas', type=int, default=2000)
+    parser.add_argument('--url', help='servidor ya corriendo (los stubs de este proceso no aplican)')
+    parser.add_argument('--output', help='guardar el reporte en JSON')
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+    else:
+        install_stubs(args)
+        server, base_url = start_server()
+
+    stats = Stats()
+    users = args.pos_users + args.chat_users
+    start = time.time()
+    stop_at = start + args.duration
+    kinds = ['pos'] * args.pos_users + ['chat'] * args.chat_users
+    threads = [
+        VirtualUser(kind, base_url, stats, args, stop_at, args.ramp * i / max(users, 1), seed_value=i)
+        for i, kind in enumerate(kinds)
+    ]
+    print(f"=== CARGA: {args.pos_users} cajas + {args.chat_users} chat, {args.duration:.0f}s contra {base_url} ===\n")
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - start
+    if server:
+        server.shutdown()
+
+    rows = stats.report(elapsed)
+    total = sum(r['requests'] for r in rows.values())
+    print(f"{'endpoint':<26} {'reqs':>6} {'err':>5} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for name, r in rows.items():
+        print(f"{name:<26} {r['requests']:>6} {r['errors']:>5} {r['rps']:>7.1f} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['max_ms']:>8.1f}")
+    print(f"\nTotal: {total} peticiones en {elapsed:.1f}s ({total / elapsed:.1f} req/s)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'config': vars(args), 'elapsed_s': round(elapsed, 2), 'endpoints': rows}, f, indent=2)
+        print(f"Reporte guardado en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
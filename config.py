@@ -16,3 +16,85 @@ class Config:
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=7)
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
+
+    # Backend de datos: 'postgrest' (Supabase) o 'sqlite' (sustituto local para tests/benchmarks)
+    SUPABASE_BACKEND = os.getenv('SUPABASE_BACKEND', 'postgrest')
+    SUPABASE_SQLITE_PATH = os.getenv('SUPABASE_SQLITE_PATH', ':memory:')
+    SUPABASE_LOCAL_LATENCY_MS = float(os.getenv('SUPABASE_LOCAL_LATENCY_MS', '0'))
+
+    # Pool HTTP hacia PostgREST (uno por proceso/worker)
+    SUPABASE_POOL_SIZE = int(os.getenv('SUPABASE_POOL_SIZE', '10'))
+    SUPABASE_POOL_BLOCK = os.getenv('SUPABASE_POOL_BLOCK', 'false').lower() == 'true'
+    SUPABASE_CONNECT_TIMEOUT = float(os.getenv('SUPABASE_CONNECT_TIMEOUT', '3.05'))
+    SUPABASE_READ_TIMEOUT = float(os.getenv('SUPABASE_READ_TIMEOUT', '10'))
+    SUPABASE_WRITE_TIMEOUT = float(os.getenv('SUPABASE_WRITE_TIMEOUT', '15'))
+    SUPABASE_RPC_TIMEOUT = float(os.getenv('SUPABASE_RPC_TIMEOUT', '20'))
+
+    # Cache read-through para tablas de referencia: "tabla:ttl_segundos,..."
+    SUPABASE_CACHE_TTLS = os.getenv('SUPABASE_CACHE_TTLS', 'categoria:300,presentacion:300,cliente:60')
+    SUPABASE_CACHE_MAX_ENTRIES = int(os.getenv('SUPABASE_CACHE_MAX_ENTRIES', '256'))
+    SUPABASE_CACHE_MAX_ROWS = int(os.getenv('SUPABASE_CACHE_MAX_ROWS', '5000'))
+
+    # Ledger de consultas por petición (Server-Timing y detector N+1)
+    QUERY_LEDGER_ENABLED = os.getenv('QUERY_LEDGER_ENABLED', 'true').lower() == 'true'
+    QUERY_LEDGER_N1_THRESHOLD = int(os.getenv('QUERY_LEDGER_N1_THRESHOLD', '5'))
+    QUERY_LEDGER_STRICT = os.getenv('QUERY_LEDGER_STRICT', 'false').lower() == 'true'
+
+    # Política de resiliencia hacia PostgREST (reintentos, hedging, circuit breaker)
+    SUPABASE_RETRIES = int(os.getenv('SUPABASE_RETRIES', '2'))
+    SUPABASE_RETRY_BACKOFF = float(os.getenv('SUPABASE_RETRY_BACKOFF', '0.1'))
+    SUPABASE_RETRY_BACKOFF_MAX = float(os.getenv('SUPABASE_RETRY_BACKOFF_MAX', '2'))
+    SUPABASE_HEDGE_ENABLED = os.getenv('SUPABASE_HEDGE_ENABLED', 'false').lower() == 'true'
+    SUPABASE_HEDGE_DELAY_MS = float(os.getenv('SUPABASE_HEDGE_DELAY_MS', '0'))
+    SUPABASE_BREAKER_THRESHOLD = int(os.getenv('SUPABASE_BREAKER_THRESHOLD', '5'))
+    SUPABASE_BREAKER_RESET = float(os.getenv('SUPABASE_BREAKER_RESET', '30'))
+
+    # Reporte de ventas: filas del detalle por página
+    REPORT_PAGE_SIZE = int(os.getenv('REPORT_PAGE_SIZE', '50'))
+
+    # Snapshot de estadísticas del dashboard (stale-while-revalidate), en segundos
+    DASHBOARD_STATS_TTL = float(os.getenv('DASHBOARD_STATS_TTL', '30'))
+    DASHBOARD_STATS_MAX_STALE = float(os.getenv('DASHBOARD_STATS_MAX_STALE', '300'))
+
+    # Índice de productos del POS en memoria (segundos entre recargas completas)
+    PRODUCT_LOOKUP_TTL = float(os.getenv('PRODUCT_LOOKUP_TTL', '60'))
+
+    # Sincronización del catálogo: sólo se sirven versiones escritas hace más de estos segundos.
+    # Debe superar la transacción más larga que escribe articulo/cliente (register_sale, acotada
+    # por statement_timeout) más la diferencia de reloj entre la app y la base.
+    CATALOG_SYNC_LAG = float(os.getenv('CATALOG_SYNC_LAG', '10'))
+
+    # Stock en vivo para los POS (bus de eventos + SSE)
+    EVENT_BUS_HISTORY = int(os.getenv('EVENT_BUS_HISTORY', '500'))
+    STOCK_STREAM_BUFFER = int(os.getenv('STOCK_STREAM_BUFFER', '100'))
+    STOCK_STREAM_HEARTBEAT = float(os.getenv('STOCK_STREAM_HEARTBEAT', '15'))
+    STOCK_STREAM_POLL = float(os.getenv('STOCK_STREAM_POLL', '5'))
+
+    # Cache de embeddings de consultas del chatbot (ruta vacía = sólo memoria)
+    EMBEDDING_CACHE_SIZE = int(os.getenv('EMBEDDING_CACHE_SIZE', '1024'))
+    EMBEDDING_CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH', '')
+    EMBEDDING_CACHE_DISK_MAX = int(os.getenv('EMBEDDING_CACHE_DISK_MAX', '50000'))
+
+    # Índice vectorial local de documents para el RAG (NumPy, float32 o int8)
+    RAG_LOCAL_INDEX = os.getenv('RAG_LOCAL_INDEX', 'false').lower() == 'true'
+    RAG_INDEX_DTYPE = os.getenv('RAG_INDEX_DTYPE', 'float32')
+    RAG_INDEX_PATH = os.getenv('RAG_INDEX_PATH', '')
+    RAG_INDEX_REFRESH = float(os.getenv('RAG_INDEX_REFRESH', '60'))
+    # Como CATALOG_SYNC_LAG: el cursor del índice sólo pasa versiones de documents escritas hace
+    # más de estos segundos (el indexador y las colas de cada worker confirman fuera de orden)
+    RAG_INDEX_SYNC_LAG = float(os.getenv('RAG_INDEX_SYNC_LAG', '10'))
+
+    # Indexador incremental de documents (lote máximo de Cohere, lotes en paralelo, llamadas/s)
+    RAG_INDEX_BATCH_SIZE = int(os.getenv('RAG_INDEX_BATCH_SIZE', '90'))
+    RAG_INDEX_CONCURRENCY = int(os.getenv('RAG_INDEX_CONCURRENCY', '4'))
+    RAG_EMBED_RATE = float(os.getenv('RAG_EMBED_RATE', '2'))
+    RAG_EMBED_RATE_MAX = float(os.getenv('RAG_EMBED_RATE_MAX', '20'))
+
+    # Refresco de documentos de productos tras ventas/ediciones (segundos)
+    RAG_REFRESH_ENABLED = os.getenv('RAG_REFRESH_ENABLED', 'true').lower() == 'true'
+    RAG_REFRESH_DEBOUNCE = float(os.getenv('RAG_REFRESH_DEBOUNCE', '5'))
+    RAG_REFRESH_MAX_DELAY = float(os.getenv('RAG_REFRESH_MAX_DELAY', '60'))
+
+    # Proveedor de embeddings del RAG: 'cohere' (API) o 'local' (n-gramas con NumPy, offline)
+    EMBEDDING_PROVIDER = os.getenv('EMBEDDING_PROVIDER', 'cohere')
+    EMBEDDING_DIM = int(os.getenv('EMBEDDING_DIM', '1024'))
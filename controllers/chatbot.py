@@ -1,6 +1,12 @@
 from flask import Blueprint, request, jsonify, session
 from models.db import get_db
+from models.async_db import gather_queries
+from models.venta_diaria import rollup_query, totals_by_day
 from models.rag import get_rag_manager
+from models.embedding_cache import get_embedding_cache
+from models.vector_index import get_vector_store
+from models.rag_refresh import get_rag_refresh_queue
+from config import Config
 from models.jwt_auth import token_required
 import os
 from groq import Groq
@@ -134,12 +140,34 @@ def get_database_context(query, db):
     query_lower = query.lower()
     
     try:
-        # ===== CONTEXTO DE PRODUCTOS =====
+        # Armar las consultas necesarias y lanzarlas en paralelo (un solo round trip de espera)
+        hoy = datetime.now().strftime('%Y-%m-%d')
+        queries = {}
         if any(word in query_lower for word in ['producto', 'medicamento', 'stock', 'precio', 'vence', 'vencimiento']):
+            queries['productos'] = db.table('articulo').select(
+                'nombre, stock, precio_venta, fecha_vencimiento'
+            ).eq('estado', 'activo').order('fecha_vencimiento').limit(10)
+        if any(word in query_lower for word in ['venta', 'vendido', 'cuanto', 'total', 'resumen']):
+            queries['ventas'] = rollup_query(db, hoy, hoy)
+        if any(word in query_lower for word in ['categoria', 'categoría', 'tipo', 'clases', 'grupos']):
+            queries['categorias'] = db.table('categoria').select('nombre, descripcion').limit(10)
+        queries['total_vencidos'] = db.table('articulo').lt('fecha_vencimiento', hoy).eq('estado', 'activo').count_only()
+        queries['vencidos'] = db.table('articulo').select(
+            'nombre'
+        ).lt('fecha_vencimiento', hoy).eq('estado', 'activo').order('fecha_vencimiento').limit(3)
+        
+        # Una consulta que falla sólo deja fuera su sección, no todo el contexto
+        results = {}
+        for name, result in zip(queries, gather_queries(*queries.values(), return_exceptions=True)):
+            if isinstance(result, Exception):
+                print(f"Error en contexto {name}: {result}")
+            else:
+                results[name] = result
+        
+        # ===== CONTEXTO DE PRODUCTOS =====
+        if 'productos' in results:
             try:
-                productos = db.table('articulo').select(
-                    'nombre, stock, precio_venta, fecha_vencimiento'
-                ).eq('estado', 'activo').order('fecha_vencimiento').limit(10).execute().data
+                productos = results['productos'].data
                 
                 if productos:
                     context += "\n📦 PRODUCTOS ACTIVOS:\n"
@@ -151,25 +179,21 @@ def get_database_context(query, db):
                 print(f"Error en contexto productos: {e}")
         
         # ===== CONTEXTO DE VENTAS =====
-        if any(word in query_lower for word in ['venta', 'vendido', 'cuanto', 'total', 'resumen']):
+        if 'ventas' in results:
             try:
-                today = datetime.now().strftime('%Y-%m-%d')
-                ventas = db.table('venta').select('total_venta').gte(
-                    'fecha_hora', today
-                ).execute().data
+                ventas = totals_by_day(results['ventas'].data).get(hoy)
                 
-                if ventas:
-                    total = sum(float(v['total_venta']) for v in ventas if v['total_venta'])
-                    context += f"\n💰 VENTAS DE HOY:\n  Total: Bs.{total:.2f} ({len(ventas)} transacciones)\n"
+                if ventas and ventas['cantidad']:
+                    context += f"\n💰 VENTAS DE HOY:\n  Total: Bs.{ventas['total']:.2f} ({ventas['cantidad']} transacciones)\n"
                 else:
                     context += "\n💰 Sin ventas hoy aún\n"
             except Exception as e:
                 print(f"Error en contexto ventas: {e}")
 
         # ===== CONTEXTO DE CATEGORIAS =====
-        if any(word in query_lower for word in ['categoria', 'categoría', 'tipo', 'clases', 'grupos']):
+        if 'categorias' in results:
             try:
-                cats = db.table('categoria').select('nombre, descripcion').limit(10).execute().data
+                cats = results['categorias'].data
                 if cats:
                     context += "\n🗂️ CATEGORÍAS DISPONIBLES:\n"
                     for c in cats:
@@ -178,18 +202,17 @@ def get_database_context(query, db):
                 print(f"Error en contexto categorias: {e}")
         
         # ===== ALERTAS CRÍTICAS =====
-        try:
-            hoy = datetime.now().strftime('%Y-%m-%d')
-            vencidos = db.table('articulo').select(
-                'nombre'
-            ).lt('fecha_vencimiento', hoy).eq('estado', 'activo').execute().data
-            
-            if vencidos:
-                context += f"\n🔴 PRODUCTOS VENCIDOS ({len(vencidos)}):\n"
-                for v in vencidos[:3]:
-                    context += f"  - {v['nombre']}\n"
-        except Exception as e:
-            print(f"Error en alertas: {e}")
+        if 'total_vencidos' in results:
+            try:
+                total_vencidos = results['total_vencidos'].data
+
+                if total_vencidos:
+                    vencidos = results['vencidos'].data if 'vencidos' in results else []
+                    context += f"\n🔴 PRODUCTOS VENCIDOS ({total_vencidos}):\n"
+                    for v in vencidos[:3]:
+                        context += f"  - {v['nombre']}\n"
+            except Exception as e:
+                print(f"Error en alertas: {e}")
         
     except Exception as e:
         print(f"Error general en contexto BD: {e}")
@@ -226,6 +249,17 @@ def index_documents():
         }), 500
 
 
+@chatbot_bp.route('/stats', methods=['GET'])
+def stats():
+    """Cache de embeddings, índice vectorial y cola de refresco RAG de este worker"""
+    queue = get_rag_refresh_queue()
+    return jsonify({
+        'embedding_cache': get_embedding_cache().stats(),
+        'vector_index': get_vector_store().stats() if Config.RAG_LOCAL_INDEX else None,
+        'rag_refresh': queue.stats() if queue is not None else None,
+    })
+
+
 @chatbot_bp.route('/api/chat', methods=['POST'])
 @token_required
 def api_chat():
@@ -1,6 +1,5 @@
 from flask import Blueprint, render_template, session, redirect, url_for, request
-from models.db import get_db
-from datetime import date, datetime, timedelta
+from models.dashboard_stats import get_dashboard_snapshot
 
 main_bp = Blueprint('main', __name__)
 
@@ -14,36 +13,18 @@ def dashboard():
     if not session.get('logueado'):
         return redirect(url_for('auth.login'))
         
-    db = get_db()
-    
-    # Fetch stats
+    # Snapshot con stale-while-revalidate: se sirve al instante y se refresca en segundo plano
     try:
-        # Productos
-        res_prod = db['table']('articulo').select('*').execute()
-        count_prod = len(res_prod.data) if res_prod.data else 0
-        
-        # Clientes
-        res_client = db['table']('cliente').select('*').execute()
-        count_client = len(res_client.data) if res_client.data else 0
-        
-        # Ventas Hoy (Cantidad y Monto)
-        from datetime import datetime
-        today = datetime.now().strftime('%Y-%m-%d')
-        res_sales = db['table']('venta').select('total_venta').gte('fecha_hora', today).execute()
-        sales_today_data = res_sales.data if res_sales.data else []
-        count_sales = len(sales_today_data)
-        total_sales_today = sum(float(v['total_venta']) for v in sales_today_data if v['total_venta'])
-        
-        # Stock Bajo
-        res_stock = db['table']('articulo').select('*').lte('stock', 10).execute()
-        count_stock = len(res_stock.data) if res_stock.data else 0
-        
+        snapshot = get_dashboard_snapshot().get()
     except Exception as e:
         print(f"Error fetching stats: {e}")
-        count_prod = 0
-        count_client = 0
-        count_sales = 0
-        count_stock = 0
+        snapshot = {}
+    
+    count_prod = snapshot.get('count_prod', 0)
+    count_client = snapshot.get('count_client', 0)
+    count_sales = snapshot.get('count_sales', 0)
+    total_sales_today = snapshot.get('total_sales_today', 0)
+    count_stock = snapshot.get('count_stock', 0)
 
     stats = [
         {
@@ -72,38 +53,8 @@ def dashboard():
         }
     ]
 
-    # Datos para el gráfico (Últimos 7 días) - OPTIMIZADO: Una sola query
-    try:
-        from datetime import datetime, timedelta
-        chart_labels = []
-        chart_values = []
-        
-        # Fecha de inicio (hace 6 días)
-        start_date = (datetime.now() - timedelta(days=6)).replace(hour=0, minute=0, second=0, microsecond=0)
-        start_date_str = start_date.strftime('%Y-%m-%d')
-        
-        # Obtener todas las ventas de la semana en una sola llamada
-        res_week = db.table('venta').select('total_venta, fecha_hora').gte('fecha_hora', start_date_str).execute()
-        all_sales = res_week.data if res_week.data else []
-        
-        # Procesar datos por día
-        for i in range(6, -1, -1):
-            day = datetime.now() - timedelta(days=i)
-            day_str = day.strftime('%Y-%m-%d')
-            day_name = ['Lun', 'Mar', 'Mie', 'Jue', 'Vie', 'Sab', 'Dom'][day.weekday()]
-            
-            # Filtrar ventas de este día específico en memoria
-            total_day = sum(
-                float(v['total_venta']) 
-                for v in all_sales 
-                if v['fecha_hora'].startswith(day_str) and v.get('total_venta') is not None
-            )
-            
-            chart_labels.append(day_name)
-            chart_values.append(total_day)
-    except Exception as e:
-        print(f"Error calculando gráfico optimizado: {e}")
-        chart_labels = ['Lun', 'Mar', 'Mie', 'Jue', 'Vie', 'Sab', 'Dom']
-        chart_values = [0, 0, 0, 0, 0, 0, 0]
+    # Datos para el gráfico (Últimos 7 días)
+    chart_labels = snapshot.get('chart_labels', ['Lun', 'Mar', 'Mie', 'Jue', 'Vie', 'Sab', 'Dom'])
+    chart_values = snapshot.get('chart_values', [0, 0, 0, 0, 0, 0, 0])
     
     return render_template('index.html', stats=stats, chart_labels=chart_labels, chart_values=chart_values)
@@ -1,5 +1,6 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from models.db import get_db
+from models.event_bus import publish_stock
 
 products_bp = Blueprint('products', __name__)
 
@@ -55,7 +56,8 @@ def create():
                 'estado': request.form['estado'],
                 'tipo_venta': request.form['tipo_venta']
             }
-            db['table']('articulo').insert(data).execute()
+            creado = db['table']('articulo').insert(data).execute().data
+            publish_stock(creado)
             flash('Producto creado correctamente', 'success')
             return redirect(url_for('products.index'))
         except Exception as e:
@@ -82,7 +84,8 @@ def edit(id):
                 'estado': request.form['estado'],
                 'tipo_venta': request.form['tipo_venta']
             }
-            db['table']('articulo').eq('idarticulo', id).update(data).execute()
+            actualizado = db['table']('articulo').eq('idarticulo', id).update(data).execute().data
+            publish_stock(actualizado)
             flash('Producto actualizado correctamente', 'success')
             return redirect(url_for('products.index'))
         except Exception as e:
@@ -106,6 +109,7 @@ def delete(id):
         # Using soft delete (estado=inactivo) is safer, but let's do real delete for CRUD request unless specified.
         # Actually in PHP code it seemed to be a delete.
         db.table('articulo').delete().eq('idarticulo', id).execute()
+        publish_stock([{'idarticulo': id, 'stock': 0, 'deleted': True}])
         flash('Producto eliminado', 'success')
     except Exception as e:
         flash(f"Error al eliminar: {e}", 'danger')
@@ -1,21 +1,72 @@
-from flask import Blueprint, jsonify, request
-from models.db import get_db
+import json
+from flask import Blueprint, jsonify, request, Response, stream_with_context
+from models.db import get_db, prefetch_first_page
+from models.catalog_sync import catalog_version, catalog_etag, changes_since
+from models.event_bus import publish_stock
+from config import Config
 
 # Blueprint para API de productos (sin conflictos de nombres)
 products_api_bp = Blueprint('products_api', __name__, url_prefix='/api/products')
 
+def _not_modified(version):
+    """304 si el cliente ya tiene esta versión del catálogo (If-None-Match)"""
+    etag = catalog_etag('articulo', version)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+    return None
+
+def _stream_products(version, wrapper='{"products": ['):
+    # Primera página dentro del try del llamador: un error da 500 y no un JSON cortado
+    rows = prefetch_first_page(
+        get_db()['table']('articulo').select('*').order('idarticulo', desc=True).iter_rows(key='idarticulo'))
+
+    def generate():
+        yield wrapper
+        for i, producto in enumerate(rows):
+            yield (',' if i else '') + json.dumps(producto)
+        yield ']}'
+
+    response = Response(stream_with_context(generate()), mimetype='application/json')
+    response.set_etag(catalog_etag('articulo', version), weak=True)
+    return response
+
 @products_api_bp.route('', methods=['GET'])
 def get_all():
-    """Obtener todos los productos"""
+    """Obtener todos los productos (JSON en streaming, página a página; 304 si no cambió)"""
     try:
-        db = get_db()
-        response = db['table']('articulo').select('*').order('idarticulo', desc=True).execute()
-        productos = response.data if response.data else []
-        return jsonify({'products': productos}), 200
+        version = catalog_version(get_db(), 'articulo')
+        return _not_modified(version) or (_stream_products(version), 200)
     except Exception as e:
         import traceback
         return jsonify({'error': str(e), 'traceback': traceback.format_exc()}), 500
 
+@products_api_bp.route('/snapshot', methods=['GET'])
+def snapshot():
+    """Catálogo completo con su cursor de versión, para iniciar la sincronización incremental"""
+    try:
+        # El cursor se toma antes de leer y sólo sobre versiones ya estables (CATALOG_SYNC_LAG):
+        # lo que cambie durante la descarga o siga en una transacción llega en /changes
+        db = get_db()
+        version = catalog_version(db, 'articulo')
+        cursor = catalog_version(db, 'articulo', lag=Config.CATALOG_SYNC_LAG)
+        return _not_modified(version) or (_stream_products(version, f'{{"version": {cursor}, "products": ['), 200)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@products_api_bp.route('/changes', methods=['GET'])
+def changes():
+    """Productos modificados y borrados desde ?since=<cursor> (paginado por versión)"""
+    since = request.args.get('since', type=int)
+    if since is None or since < 0:
+        return jsonify({'error': 'Parámetro since requerido (cursor de /snapshot o de /changes)'}), 400
+    limit = min(max(request.args.get('limit', 500, type=int), 1), 5000)
+    try:
+        return jsonify(changes_since(get_db(), 'articulo', since, limit)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @products_api_bp.route('/<int:id>', methods=['GET'])
 def get_by_id(id):
     """Obtener producto por ID"""
@@ -45,6 +96,7 @@ def create():
             'fecha_vencimiento': data.get('fecha_vencimiento'),
             'estado': 'activo'
         }).execute()
+        publish_stock(response.data)
         
         return jsonify({'message': 'Producto creado', 'data': response.data}), 201
     except Exception as e:
@@ -68,6 +120,7 @@ def update(id):
             update_data['precio_venta'] = data['precio_venta']
         
         response = db['table']('articulo').eq('idarticulo', id).update(update_data).execute()
+        publish_stock(response.data)
         
         return jsonify({'message': 'Producto actualizado', 'data': response.data}), 200
     except Exception as e:
@@ -79,6 +132,7 @@ def delete(id):
     try:
         db = get_db()
         response = db['table']('articulo').eq('idarticulo', id).delete().execute()
+        publish_stock([{'idarticulo': id, 'stock': 0, 'deleted': True}])
         return jsonify({'message': 'Producto eliminado', 'data': response.data}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1,5 +1,7 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session
-from models.db import get_db
+from flask import Blueprint, render_template, stream_template, request, redirect, url_for, session
+from models.db import get_db, prefetch_first_page
+from models.async_db import gather_queries
+from config import Config
 from datetime import datetime, timedelta
 
 reports_bp = Blueprint('reports', __name__, url_prefix='/reports')
@@ -22,31 +24,42 @@ def sales():
     # Get date range from query params, default to last 30 days
     date_to = request.args.get('date_to', datetime.now().strftime('%Y-%m-%d'))
     date_from = request.args.get('date_from', (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d'))
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = Config.REPORT_PAGE_SIZE
     
     try:
-        # Fetch sales within date range
-        response = db['table']('venta').select(
-            '*, cliente(nombre, apellidos), trabajador(usuario)'
-        ).gte('fecha_hora', f'{date_from} 00:00:00').lte('fecha_hora', f'{date_to} 23:59:59').order('fecha_hora', desc=True).execute()
+        # Aggregates are computed server-side (sales_report RPC); only one page of detail rows is fetched
+        res_resumen, res_ventas = gather_queries(
+            db.rpc('sales_report', {'p_desde': date_from, 'p_hasta': date_to}),
+            db['table']('venta').select(
+                '*, cliente(nombre, apellidos), trabajador(usuario)'
+            ).gte('fecha_hora', f'{date_from} 00:00:00').lte('fecha_hora', f'{date_to} 23:59:59')
+            .order('fecha_hora', desc=True).order('idventa', desc=True)
+            .offset((page - 1) * per_page).limit(per_page)
+        )
         
-        ventas = response.data
-        
-        # Calculate totals
-        total_ventas = len(ventas)
-        total_monto = sum(float(v['total_venta']) for v in ventas)
+        resumen = res_resumen.data or {}
+        ventas = res_ventas.data or []
         
     except Exception as e:
         print(f"Error fetching sales report: {e}")
+        resumen = {}
         ventas = []
-        total_ventas = 0
-        total_monto = 0
+    
+    total_ventas = int(resumen.get('total_ventas') or 0)
+    pages = max((total_ventas + per_page - 1) // per_page, 1)
     
     return render_template('reports/sales.html', 
                          ventas=ventas, 
                          date_from=date_from, 
                          date_to=date_to,
                          total_ventas=total_ventas,
-                         total_monto=total_monto)
+                         total_monto=float(resumen.get('total_monto') or 0),
+                         ticket_promedio=float(resumen.get('ticket_promedio') or 0),
+                         por_dia=resumen.get('por_dia') or [],
+                         por_trabajador=resumen.get('por_trabajador') or [],
+                         page=page,
+                         pages=pages)
 
 @reports_bp.route('/inventory')
 def inventory():
@@ -54,17 +67,14 @@ def inventory():
     db = get_db()
     
     try:
-        # Fetch all products with category info
-        response = db['table']('articulo').select(
-            '*, categoria(nombre)'
-        ).order('nombre').execute()
+        # Statistics are counted server-side; rows are streamed page by page
+        total_productos = db['table']('articulo').count()
+        productos_bajo_stock = db['table']('articulo').lt('stock', 10).count()
+        productos_sin_stock = db['table']('articulo').eq('stock', 0).count()
         
-        productos = response.data
-        
-        # Calculate statistics
-        total_productos = len(productos)
-        productos_bajo_stock = sum(1 for p in productos if p['stock'] < 10)
-        productos_sin_stock = sum(1 for p in productos if p['stock'] == 0)
+        productos = prefetch_first_page(db['table']('articulo').select(
+            '*, categoria(nombre)'
+        ).order('nombre').order('idarticulo').iter_rows(page_size=500))
         
     except Exception as e:
         print(f"Error fetching inventory report: {e}")
@@ -73,7 +83,7 @@ def inventory():
         productos_bajo_stock = 0
         productos_sin_stock = 0
     
-    return render_template('reports/inventory.html',
+    return stream_template('reports/inventory.html',
                          productos=productos,
                          total_productos=total_productos,
                          productos_bajo_stock=productos_bajo_stock,
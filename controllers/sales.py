@@ -1,9 +1,14 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Blueprint, render_template, stream_template, request, redirect, url_for, flash, session, jsonify, Response, stream_with_context
 import os
-from models.db import get_db
+from models.db import get_db, prefetch_first_page
 import json
 from datetime import datetime
 from models.jwt_auth import token_required
+from models.sale_service import SaleService, invoice_query
+from models.product_lookup import get_product_lookup
+from models.event_bus import bus, get_stock_watcher
+from config import Config
+import time
 import io
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
@@ -22,22 +27,21 @@ def require_login():
 def index():
     db = get_db()
     try:
-        # Fetch sales with related info
-        # Note: Supabase-py join syntax can be tricky. 
-        # For simplicity, we fetch sales and then maybe enrich or just show basic info.
-        # Ideally: .select('*, cliente(nombre, apellidos), trabajador(nombre)')
-        response = db['table']('venta').select('*, cliente(nombre, apellidos), trabajador(usuario)').order('idventa', desc=True).execute()
-        ventas = response.data
+        # Historial en streaming: se pide a PostgREST por páginas (keyset sobre idventa)
+        # y se renderiza a medida que llegan, sin cargar toda la tabla en memoria.
+        # La primera página se pide aquí para que un error use el fallback.
+        ventas = prefetch_first_page(db['table']('venta').select(
+            '*, cliente(nombre, apellidos), trabajador(usuario)'
+        ).order('idventa', desc=True).iter_rows(key='idventa', page_size=500))
     except Exception as e:
         print(f"Error serving sales: {e}")
         ventas = []
-    return render_template('sales/index.html', ventas=ventas)
+    return stream_template('sales/index.html', ventas=ventas)
 
 @sales_bp.route('/create', methods=['GET'])
 def create():
     db = get_db()
-    # Get products for the search/dropdown
-    productos = db['table']('articulo').select('*').eq('estado', 'activo').gt('stock', 0).execute().data
+    # Los productos se buscan con /sales/lookup (índice en memoria); aquí sólo los clientes
     clientes = db['table']('cliente').select('*').execute().data
 
     # Detectar el QR dinámicamente
@@ -48,7 +52,54 @@ def create():
             qr_filename = f'qr_pago{ext}'
             break
             
-    return render_template('sales/create.html', productos=productos, clientes=clientes, qr_filename=qr_filename)
+    return render_template('sales/create.html', clientes=clientes, qr_filename=qr_filename)
+
+@sales_bp.route('/lookup', methods=['GET'])
+def lookup():
+    """Typeahead del POS: código de barras exacto o prefijo del nombre"""
+    q = request.args.get('q', '')
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 50)
+    try:
+        start = time.perf_counter()
+        productos = get_product_lookup().search(q, limit)
+        return jsonify({
+            'products': productos,
+            'exact': bool(productos) and str(productos[0].get('codigo') or '').lower() == q.strip().lower(),
+            'took_ms': round((time.perf_counter() - start) * 1000, 3)
+        })
+    except Exception as e:
+        print(f"Error en búsqueda de productos: {e}")
+        return jsonify({'products': [], 'exact': False, 'message': str(e)}), 503
+
+@sales_bp.route('/stock/stream', methods=['GET'])
+def stock_stream():
+    """Server-Sent Events con los cambios de stock: [{idarticulo, stock}, ...] por evento.
+
+    La respuesta queda abierta mientras la pestaña del POS esté abierta y ocupa un hilo:
+    requiere workers con hilos (gthread, ver Procfile), no el worker sync de Gunicorn.
+    """
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    subscription = bus.subscribe('stock', Config.STOCK_STREAM_BUFFER, last_event_id)
+    get_stock_watcher().ensure_started()
+
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            while not subscription.closed:
+                events = subscription.get(timeout=Config.STOCK_STREAM_HEARTBEAT)
+                if subscription.take_overflow():
+                    # Se perdieron eventos (cliente lento o reconexión tardía): recargar todo
+                    yield 'event: resync\ndata: {}\n\n'
+                if not events:
+                    yield ': keepalive\n\n'
+                    continue
+                deltas = [delta for event in events for delta in event.data]
+                yield f"id: {events[-1].id}\nevent: stock\ndata: {json.dumps(deltas)}\n\n"
+        finally:
+            subscription.close()
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @sales_bp.route('/store', methods=['POST'])
 def store():
@@ -60,39 +111,8 @@ def store():
         if not items:
             return jsonify({'success': False, 'message': 'No hay items en la venta'})
 
-        db = get_db()
-        total_venta = sum(float(item['subtotal']) for item in items)
-        
-        # 1. Create Sale
-        venta_data = {
-            'idcliente': idcliente,
-            'idtrabajador': session.get('idtrabajador'),
-            'total_venta': total_venta,
-            'estado': 'completada'
-        }
-        res_venta = db['table']('venta').insert(venta_data).execute()
-        if not res_venta.data:
-            raise Exception("No se pudo registrar la venta")
-            
-        idventa = res_venta.data[0]['idventa']
-        
-        # 2. Create Details and Update Stock
-        for item in items:
-            detalle_data = {
-                'idventa': idventa,
-                'idarticulo': item['idarticulo'],
-                'cantidad': item['cantidad'],
-                'precio_unitario': item['precio'],
-                'subtotal': item['subtotal']
-            }
-            db['table']('detalle_venta').insert(detalle_data).execute()
-            
-            # Decrease Stock
-            # Note: Concurrency might be an issue here in prod, but for this migration let's do read-modify-write or rpc if available.
-            # Simple approach: rpc or direct update. Let's do direct update for now.
-            curr_prod = db['table']('articulo').select('stock').eq('idarticulo', item['idarticulo']).single().execute()
-            new_stock = curr_prod.data['stock'] - int(item['cantidad'])
-            db['table']('articulo').update({'stock': new_stock}).eq('idarticulo', item['idarticulo']).execute()
+        # Cabecera, detalle y stock en una sola transacción (RPC register_sale)
+        SaleService().register(items, idcliente=idcliente, idtrabajador=session.get('idtrabajador'))
             
         return jsonify({'success': True, 'message': 'Venta registrada correctamente', 'redirect': url_for('sales.index')})
         
@@ -102,7 +122,7 @@ def store():
 
 @sales_bp.route('/api/store', methods=['POST'])
 @token_required
-def api_store(current_user):
+def api_store():
     try:
         data = request.get_json()
         idcliente = data.get('idcliente')
@@ -111,43 +131,13 @@ def api_store(current_user):
         if not items:
             return jsonify({'success': False, 'message': 'No hay items en la venta'}), 400
 
-        db = get_db()
-        total_venta = sum(float(item['subtotal']) for item in items)
-        
-        # 1. Create Sale
-        venta_data = {
-            'idcliente': idcliente,
-            'idtrabajador': current_user['idtrabajador'],
-            'total_venta': total_venta,
-            'estado': 'completada'
-        }
-        res_venta = db['table']('venta').insert(venta_data).execute()
-        if not res_venta.data:
-            raise Exception("No se pudo registrar la venta")
-            
-        idventa = res_venta.data[0]['idventa']
-        
-        # 2. Create Details and Update Stock
-        for item in items:
-            detalle_data = {
-                'idventa': idventa,
-                'idarticulo': item['idarticulo'],
-                'cantidad': item['cantidad'],
-                'precio_unitario': item['precio'],
-                'subtotal': item['subtotal']
-            }
-            db['table']('detalle_venta').insert(detalle_data).execute()
-            
-            # Decrease Stock
-            curr_prod = db['table']('articulo').select('stock').eq('idarticulo', item['idarticulo']).single().execute()
-            if curr_prod.data:
-                new_stock = curr_prod.data['stock'] - int(item['cantidad'])
-                db['table']('articulo').update({'stock': new_stock}).eq('idarticulo', item['idarticulo']).execute()
+        # token_required deja el payload del JWT en request.user
+        venta = SaleService().register(items, idcliente=idcliente, idtrabajador=request.user.get('user_id'))
             
         return jsonify({
             'success': True, 
             'message': 'Venta registrada correctamente', 
-            'idventa': idventa
+            'idventa': venta['idventa']
         }), 201
         
     except Exception as e:
@@ -159,8 +149,9 @@ def invoice_pdf(id):
     db = get_db()
     
     try:
-        venta = db['table']('venta').select('*, cliente(nombre, apellidos, telefono), trabajador(usuario)').eq('idventa', id).single().execute().data
-        detalles = db['table']('detalle_venta').select('*, articulo(nombre, codigo)').eq('idventa', id).execute().data
+        # Cabecera y detalle en un solo round trip (embedding de detalle_venta)
+        venta = invoice_query(db, id).single().execute().data
+        detalles = venta.pop('detalle_venta', [])
     except Exception as e:
         flash(f"Error al obtener venta: {e}", "danger")
         return redirect(url_for('sales.index'))
@@ -261,6 +252,6 @@ def invoice_pdf(id):
 def invoice(id):
     # Logic to show invoice/ticket
     db = get_db()
-    venta = db['table']('venta').select('*, cliente(*), trabajador(*)').eq('idventa', id).single().execute().data
-    detalles = db['table']('detalle_venta').select('*, articulo(nombre, codigo)').eq('idventa', id).execute().data
+    venta = invoice_query(db, id).single().execute().data
+    detalles = venta.pop('detalle_venta', []) if venta else []
     return render_template('sales/invoice.html', venta=venta, detalles=detalles)
@@ -0,0 +1,76 @@
+-- migration_catalog_version.sql
+-- Ejecutar en Supabase SQL Editor.
+-- Versión monotónica por fila en articulo y cliente (más lápidas para los
+-- borrados) para que los terminales POS y el frontend mantengan una copia
+-- local y pidan sólo lo que cambió:
+--   GET /api/products/snapshot          -> catálogo completo + cursor (ETag)
+--   GET /api/products/changes?since=N   -> filas con version > N y borrados
+
+CREATE SEQUENCE IF NOT EXISTS catalogo_version_seq;
+
+ALTER TABLE articulo ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+ALTER TABLE articulo ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT nextval('catalogo_version_seq');
+ALTER TABLE cliente ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+ALTER TABLE cliente ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT nextval('catalogo_version_seq');
+
+-- updated_at / borrado_en marcan cuándo se tomó la versión: los lectores sólo
+-- sirven versiones más viejas que CATALOG_SYNC_LAG (una transacción larga, como
+-- register_sale, puede confirmar una versión menor después que otras ya leídas)
+ALTER TABLE articulo ALTER COLUMN updated_at SET DEFAULT clock_timestamp();
+ALTER TABLE cliente ALTER COLUMN updated_at SET DEFAULT clock_timestamp();
+
+CREATE INDEX IF NOT EXISTS idx_articulo_version ON articulo (version);
+CREATE INDEX IF NOT EXISTS idx_cliente_version ON cliente (version);
+
+-- Lápidas: filas borradas, con la versión en que se borraron
+CREATE TABLE IF NOT EXISTS catalogo_borrado (
+    tabla VARCHAR(50) NOT NULL,
+    id BIGINT NOT NULL,
+    version BIGINT NOT NULL DEFAULT nextval('catalogo_version_seq'),
+    borrado_en TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (tabla, id)
+);
+ALTER TABLE catalogo_borrado ALTER COLUMN borrado_en SET DEFAULT clock_timestamp();
+CREATE INDEX IF NOT EXISTS idx_catalogo_borrado_version ON catalogo_borrado (tabla, version);
+
+-- Cada UPDATE toma una versión nueva (incluido el descuento de stock de register_sale)
+CREATE OR REPLACE FUNCTION catalogo_version_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.version := nextval('catalogo_version_seq');
+    -- Hora real de la escritura (NOW() es la del inicio de la transacción)
+    NEW.updated_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION catalogo_borrado_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO catalogo_borrado (tabla, id)
+    VALUES (TG_TABLE_NAME, CASE TG_TABLE_NAME WHEN 'articulo' THEN OLD.idarticulo ELSE OLD.idcliente END)
+    ON CONFLICT (tabla, id) DO UPDATE
+    SET version = nextval('catalogo_version_seq'), borrado_en = clock_timestamp();
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS articulo_version ON articulo;
+CREATE TRIGGER articulo_version BEFORE UPDATE ON articulo
+FOR EACH ROW EXECUTE FUNCTION catalogo_version_trigger();
+
+DROP TRIGGER IF EXISTS cliente_version ON cliente;
+CREATE TRIGGER cliente_version BEFORE UPDATE ON cliente
+FOR EACH ROW EXECUTE FUNCTION catalogo_version_trigger();
+
+DROP TRIGGER IF EXISTS articulo_borrado ON articulo;
+CREATE TRIGGER articulo_borrado AFTER DELETE ON articulo
+FOR EACH ROW EXECUTE FUNCTION catalogo_borrado_trigger();
+
+DROP TRIGGER IF EXISTS cliente_borrado ON cliente;
+CREATE TRIGGER cliente_borrado AFTER DELETE ON cliente
+FOR EACH ROW EXECUTE FUNCTION catalogo_borrado_trigger();
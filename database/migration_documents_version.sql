@@ -0,0 +1,60 @@
+-- migration_documents_version.sql
+-- Ejecutar en Supabase SQL Editor.
+-- Versión monotónica por fila en documents para que cada worker mantenga
+-- una copia local de los embeddings (RAG_LOCAL_INDEX) y traiga sólo las
+-- filas con version > cursor en lugar de consultar search_documents, cuyo
+-- filtro por similitud no aprovecha el índice ivfflat. Los borrados quedan
+-- como lápidas en documents_borrado con una versión de la misma secuencia.
+
+CREATE SEQUENCE IF NOT EXISTS documents_version_seq;
+
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT nextval('documents_version_seq');
+
+CREATE INDEX IF NOT EXISTS idx_documents_version ON documents (version);
+
+-- updated_at / borrado_en marcan cuándo se tomó la versión: el cursor de cada
+-- worker sólo pasa versiones más viejas que RAG_INDEX_SYNC_LAG (el indexador
+-- sube lotes en paralelo y pueden confirmarse fuera de orden)
+ALTER TABLE documents ALTER COLUMN updated_at SET DEFAULT clock_timestamp();
+
+CREATE TABLE IF NOT EXISTS documents_borrado (
+    id BIGINT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT nextval('documents_version_seq'),
+    borrado_en TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+ALTER TABLE documents_borrado ALTER COLUMN borrado_en SET DEFAULT clock_timestamp();
+CREATE INDEX IF NOT EXISTS idx_documents_borrado_version ON documents_borrado (version);
+
+-- Cada UPDATE toma una versión nueva
+CREATE OR REPLACE FUNCTION documents_version_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.version := nextval('documents_version_seq');
+    -- Hora real de la escritura (NOW() es la del inicio de la transacción)
+    NEW.updated_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS documents_version ON documents;
+CREATE TRIGGER documents_version BEFORE UPDATE ON documents
+FOR EACH ROW EXECUTE FUNCTION documents_version_trigger();
+
+-- Cada DELETE deja una lápida: los workers quitan esos ids sin recorrer la tabla
+CREATE OR REPLACE FUNCTION documents_borrado_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO documents_borrado (id) VALUES (OLD.id)
+    ON CONFLICT (id) DO UPDATE SET version = nextval('documents_version_seq'), borrado_en = clock_timestamp();
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS documents_borrado ON documents;
+CREATE TRIGGER documents_borrado AFTER DELETE ON documents
+FOR EACH ROW EXECUTE FUNCTION documents_borrado_trigger();
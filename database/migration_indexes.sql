@@ -0,0 +1,33 @@
+-- migration_indexes.sql
+-- Ejecutar en Supabase SQL Editor.
+-- Índices para los filtros que usan los controladores. Verificar después con:
+--   python scripts/check_query_plans.py
+-- (requiere db-plan-enabled en PostgREST; en Supabase:
+--   ALTER ROLE authenticator SET pgrst.db_plan_enabled TO true; NOTIFY pgrst, 'reload config';)
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- venta: rangos por fecha (dashboard, reportes, chatbot) con idventa como desempate del orden
+CREATE INDEX IF NOT EXISTS idx_venta_fecha_hora ON venta (fecha_hora, idventa);
+CREATE INDEX IF NOT EXISTS idx_venta_idcliente ON venta (idcliente);
+CREATE INDEX IF NOT EXISTS idx_venta_idtrabajador ON venta (idtrabajador);
+
+-- detalle_venta: embed detalle_venta(*) de factura/PDF y borrado por venta
+CREATE INDEX IF NOT EXISTS idx_detalle_venta_idventa ON detalle_venta (idventa);
+CREATE INDEX IF NOT EXISTS idx_detalle_venta_idarticulo ON detalle_venta (idarticulo);
+
+-- articulo: POS (estado = 'activo' AND stock > 0), stock bajo y vencimientos de productos activos
+CREATE INDEX IF NOT EXISTS idx_articulo_estado_stock ON articulo (estado, stock);
+CREATE INDEX IF NOT EXISTS idx_articulo_stock ON articulo (stock);
+CREATE INDEX IF NOT EXISTS idx_articulo_activo_vencimiento ON articulo (fecha_vencimiento) WHERE estado = 'activo';
+CREATE INDEX IF NOT EXISTS idx_articulo_codigo ON articulo (codigo);
+CREATE INDEX IF NOT EXISTS idx_articulo_nombre_trgm ON articulo USING gin (nombre gin_trgm_ops);
+
+-- cliente: búsqueda por nombre/apellidos con ilike
+CREATE INDEX IF NOT EXISTS idx_cliente_nombre_trgm ON cliente USING gin (nombre gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_cliente_apellidos_trgm ON cliente USING gin (apellidos gin_trgm_ops);
+
+ANALYZE venta;
+ANALYZE detalle_venta;
+ANALYZE articulo;
+ANALYZE cliente;
@@ -0,0 +1,13 @@
+-- migration_rag_indexer.sql
+-- Ejecutar en Supabase SQL Editor.
+-- Clave estable y hash de contenido por documento para el indexador
+-- incremental (scripts/index_rag.py): sólo se re-embeben los documentos
+-- nuevos o modificados, se hace upsert por source_key y se borran los que
+-- ya no tienen origen.
+
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS source_key VARCHAR(255);
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
+
+-- Requerida por el upsert de PostgREST (on_conflict=source_key); las filas
+-- antiguas sin clave (NULL) no chocan entre sí
+CREATE UNIQUE INDEX IF NOT EXISTS documents_source_key_key ON documents (source_key);
@@ -0,0 +1,84 @@
+-- migration_register_sale.sql
+-- Ejecutar en Supabase SQL Editor.
+-- Registra una venta completa (cabecera, detalle y descuento de stock) en una
+-- sola transacción y una sola llamada RPC, con bloqueo de filas de articulo
+-- para evitar la pérdida de actualizaciones de stock entre cajas.
+--
+-- Uso vía PostgREST: POST /rest/v1/rpc/register_sale
+--   {"p_items": [{"idarticulo": 1, "cantidad": 2, "precio": 5.5, "subtotal": 11}],
+--    "p_idcliente": 1, "p_idtrabajador": 1}
+
+CREATE OR REPLACE FUNCTION register_sale(
+    p_items jsonb,
+    p_idcliente bigint DEFAULT NULL,
+    p_idtrabajador bigint DEFAULT NULL
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_idventa bigint;
+    v_total numeric(10, 2);
+    v_stocks jsonb;
+    v_articulos int;
+    v_actualizados int;
+    v_sin_stock bigint;
+BEGIN
+    IF p_items IS NULL OR jsonb_typeof(p_items) <> 'array' OR jsonb_array_length(p_items) = 0 THEN
+        RAISE EXCEPTION 'No hay items en la venta';
+    END IF;
+
+    -- Bloquear los artículos en orden de id (evita deadlocks entre cajas concurrentes)
+    PERFORM 1
+    FROM articulo
+    WHERE idarticulo IN (SELECT (e->>'idarticulo')::bigint FROM jsonb_array_elements(p_items) e)
+    ORDER BY idarticulo
+    FOR UPDATE;
+
+    SELECT COALESCE(SUM((e->>'subtotal')::numeric), 0),
+           COUNT(DISTINCT (e->>'idarticulo')::bigint)
+    INTO v_total, v_articulos
+    FROM jsonb_array_elements(p_items) e;
+
+    -- 1. Cabecera
+    INSERT INTO venta (idcliente, idtrabajador, total_venta, estado)
+    VALUES (p_idcliente, p_idtrabajador, v_total, 'completada')
+    RETURNING idventa INTO v_idventa;
+
+    -- 2. Detalle
+    INSERT INTO detalle_venta (idventa, idarticulo, cantidad, precio_unitario, subtotal)
+    SELECT v_idventa,
+           (e->>'idarticulo')::bigint,
+           (e->>'cantidad')::int,
+           (e->>'precio')::numeric,
+           (e->>'subtotal')::numeric
+    FROM jsonb_array_elements(p_items) e;
+
+    -- 3. Descontar stock (un UPDATE por artículo, aunque se repita en el carrito)
+    WITH pedido AS (
+        SELECT (e->>'idarticulo')::bigint AS idarticulo, SUM((e->>'cantidad')::int) AS cantidad
+        FROM jsonb_array_elements(p_items) e
+        GROUP BY 1
+    ), actualizados AS (
+        UPDATE articulo a
+        SET stock = a.stock - p.cantidad
+        FROM pedido p
+        WHERE a.idarticulo = p.idarticulo
+        RETURNING a.idarticulo, a.stock
+    )
+    SELECT COUNT(*),
+           MIN(idarticulo) FILTER (WHERE stock < 0),
+           COALESCE(jsonb_agg(jsonb_build_object('idarticulo', idarticulo, 'stock', stock)), '[]'::jsonb)
+    INTO v_actualizados, v_sin_stock, v_stocks
+    FROM actualizados;
+
+    IF v_actualizados <> v_articulos THEN
+        RAISE EXCEPTION 'La venta contiene artículos inexistentes';
+    END IF;
+    IF v_sin_stock IS NOT NULL THEN
+        RAISE EXCEPTION 'Stock insuficiente para el artículo %', v_sin_stock;
+    END IF;
+
+    RETURN jsonb_build_object('idventa', v_idventa, 'total_venta', v_total, 'stocks', v_stocks);
+END;
+$$;
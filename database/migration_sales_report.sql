@@ -0,0 +1,38 @@
+-- migration_sales_report.sql
+-- Ejecutar en Supabase SQL Editor (después de migration_venta_diaria.sql).
+-- Agregados del reporte de ventas calculados en el servidor a partir de
+-- venta_diaria: el costo depende de los días del rango, no de las ventas.
+--
+-- Uso vía PostgREST: POST /rest/v1/rpc/sales_report
+--   {"p_desde": "2026-01-01", "p_hasta": "2026-01-31"}
+-- Devuelve {"total_ventas", "total_monto", "ticket_promedio",
+--           "por_dia": [{"fecha", "cantidad", "total"}],
+--           "por_trabajador": [{"idtrabajador", "usuario", "cantidad", "total"}]}
+
+CREATE OR REPLACE FUNCTION sales_report(p_desde date, p_hasta date)
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+AS $$
+    WITH rango AS (
+        SELECT fecha, idtrabajador, cantidad, total
+        FROM venta_diaria
+        WHERE fecha BETWEEN p_desde AND p_hasta AND cantidad <> 0
+    ),
+    por_dia AS (
+        SELECT fecha, SUM(cantidad)::int AS cantidad, SUM(total) AS total
+        FROM rango GROUP BY fecha
+    ),
+    por_trabajador AS (
+        SELECT r.idtrabajador, t.usuario, SUM(r.cantidad)::int AS cantidad, SUM(r.total) AS total
+        FROM rango r LEFT JOIN trabajador t ON t.idtrabajador = r.idtrabajador
+        GROUP BY r.idtrabajador, t.usuario
+    )
+    SELECT jsonb_build_object(
+        'total_ventas', COALESCE((SELECT SUM(cantidad) FROM rango), 0),
+        'total_monto', COALESCE((SELECT SUM(total) FROM rango), 0),
+        'ticket_promedio', COALESCE((SELECT ROUND(SUM(total) / NULLIF(SUM(cantidad), 0), 2) FROM rango), 0),
+        'por_dia', COALESCE((SELECT jsonb_agg(to_jsonb(d) ORDER BY d.fecha) FROM por_dia d), '[]'::jsonb),
+        'por_trabajador', COALESCE((SELECT jsonb_agg(to_jsonb(w) ORDER BY w.total DESC) FROM por_trabajador w), '[]'::jsonb)
+    );
+$$;
@@ -0,0 +1,72 @@
+-- migration_venta_diaria.sql
+-- Resumen diario de ventas por trabajador, mantenido por trigger.
+-- El dashboard, el gráfico de 7 días y el chatbot leen unas pocas filas de
+-- venta_diaria en lugar de recorrer la tabla venta.
+-- Ejecutar en Supabase SQL Editor y luego: python scripts/backfill_venta_diaria.py
+
+CREATE TABLE IF NOT EXISTS venta_diaria (
+    fecha DATE NOT NULL,
+    idtrabajador BIGINT NOT NULL DEFAULT 0,
+    cantidad INT NOT NULL DEFAULT 0,
+    total DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    PRIMARY KEY (fecha, idtrabajador)
+);
+
+-- Aplicar a venta_diaria el efecto de una fila de venta (signo +1 al insertar, -1 al borrar)
+CREATE OR REPLACE FUNCTION venta_diaria_aplicar(p_fecha_hora timestamptz, p_idtrabajador bigint, p_total numeric, p_signo int)
+RETURNS void
+LANGUAGE sql
+AS $$
+    INSERT INTO venta_diaria AS vd (fecha, idtrabajador, cantidad, total)
+    VALUES (p_fecha_hora::date, COALESCE(p_idtrabajador, 0), p_signo, p_signo * COALESCE(p_total, 0))
+    ON CONFLICT (fecha, idtrabajador) DO UPDATE
+    SET cantidad = vd.cantidad + EXCLUDED.cantidad,
+        total = vd.total + EXCLUDED.total;
+$$;
+
+CREATE OR REPLACE FUNCTION venta_diaria_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM venta_diaria_aplicar(OLD.fecha_hora, OLD.idtrabajador, OLD.total_venta, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM venta_diaria_aplicar(NEW.fecha_hora, NEW.idtrabajador, NEW.total_venta, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS venta_diaria_sync ON venta;
+CREATE TRIGGER venta_diaria_sync
+AFTER INSERT OR DELETE OR UPDATE OF fecha_hora, idtrabajador, total_venta ON venta
+FOR EACH ROW EXECUTE FUNCTION venta_diaria_trigger();
+
+-- Recalcular el resumen desde venta (todo o un rango de fechas); devuelve las filas escritas
+CREATE OR REPLACE FUNCTION backfill_venta_diaria(p_desde date DEFAULT NULL, p_hasta date DEFAULT NULL)
+RETURNS int
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_filas int;
+BEGIN
+    -- Evita que ventas concurrentes se sumen dos veces mientras se reconstruye
+    LOCK TABLE venta IN SHARE MODE;
+
+    DELETE FROM venta_diaria
+    WHERE (p_desde IS NULL OR fecha >= p_desde)
+      AND (p_hasta IS NULL OR fecha <= p_hasta);
+
+    INSERT INTO venta_diaria (fecha, idtrabajador, cantidad, total)
+    SELECT fecha_hora::date, COALESCE(idtrabajador, 0), COUNT(*), COALESCE(SUM(total_venta), 0)
+    FROM venta
+    WHERE (p_desde IS NULL OR fecha_hora >= p_desde)
+      AND (p_hasta IS NULL OR fecha_hora < p_hasta + 1)
+    GROUP BY 1, 2;
+
+    GET DIAGNOSTICS v_filas = ROW_COUNT;
+    RETURN v_filas;
+END;
+$$;
@@ -25,6 +25,12 @@ CREATE TABLE IF NOT EXISTS presentacion (
     descripcion TEXT
 );
 
+-- Versión de catálogo (articulo/cliente) para la sincronización incremental de los POS
+CREATE SEQUENCE IF NOT EXISTS catalogo_version_seq;
+
+-- Versión de documents para el índice vectorial local de cada worker
+CREATE SEQUENCE IF NOT EXISTS documents_version_seq;
+
 -- 4. Tabla: articulo (Productos)
 CREATE TABLE IF NOT EXISTS articulo (
     idarticulo BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
@@ -41,7 +47,9 @@ CREATE TABLE IF NOT EXISTS articulo (
     tiras_por_paquete INT,
     unidades_por_tira INT,
     contenido_desc VARCHAR(255),
-    fecha_vencimiento DATE
+    fecha_vencimiento DATE,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    version BIGINT NOT NULL DEFAULT nextval('catalogo_version_seq')
 );
 
 -- 5. Tabla: cliente
@@ -50,7 +58,9 @@ CREATE TABLE IF NOT EXISTS cliente (
     nombre VARCHAR(255) NOT NULL,
     apellidos VARCHAR(255),
     telefono VARCHAR(20),
-    email VARCHAR(100)
+    email VARCHAR(100),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    version BIGINT NOT NULL DEFAULT nextval('catalogo_version_seq')
 );
 
 -- 6. Tabla: venta
@@ -73,6 +83,15 @@ CREATE TABLE IF NOT EXISTS detalle_venta (
     subtotal DECIMAL(10, 2) NOT NULL
 );
 
+-- 7b. Tabla: venta_diaria (resumen por día y trabajador, mantenido por trigger)
+CREATE TABLE IF NOT EXISTS venta_diaria (
+    fecha DATE NOT NULL,
+    idtrabajador BIGINT NOT NULL DEFAULT 0,
+    cantidad INT NOT NULL DEFAULT 0,
+    total DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    PRIMARY KEY (fecha, idtrabajador)
+);
+
 -- 8. Tabla: proveedor
 CREATE TABLE IF NOT EXISTS proveedor (
     idproveedor BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
@@ -85,10 +104,30 @@ CREATE TABLE IF NOT EXISTS proveedor (
 -- 9. Tabla: documents (Para RAG/Chatbot)
 CREATE TABLE IF NOT EXISTS documents (
     id SERIAL PRIMARY KEY,
+    source_key VARCHAR(255) UNIQUE, -- 'articulo:12', 'categoria:3', ... (ver models/rag_indexer.py)
     content TEXT NOT NULL,
+    content_hash VARCHAR(64),
     embedding vector(1536),
     metadata JSONB,
-    created_at TIMESTAMP DEFAULT NOW()
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    version BIGINT NOT NULL DEFAULT nextval('documents_version_seq')
+);
+
+-- 10. Tabla: catalogo_borrado (lápidas de articulo/cliente para la sincronización incremental)
+CREATE TABLE IF NOT EXISTS catalogo_borrado (
+    tabla VARCHAR(50) NOT NULL,
+    id BIGINT NOT NULL,
+    version BIGINT NOT NULL DEFAULT nextval('catalogo_version_seq'),
+    borrado_en TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (tabla, id)
+);
+
+-- 11. Tabla: documents_borrado (lápidas de documents para el índice vectorial local)
+CREATE TABLE IF NOT EXISTS documents_borrado (
+    id BIGINT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT nextval('documents_version_seq'),
+    borrado_en TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
 -- Búsqueda vectorial
@@ -96,6 +135,45 @@ CREATE INDEX IF NOT EXISTS documents_embedding_idx
 ON documents USING ivfflat (embedding vector_cosine_ops)
 WITH (lists = 100);
 
+-- Índices de los filtros frecuentes (ver migration_indexes.sql)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- venta: rangos por fecha (dashboard, reportes, chatbot) con idventa como desempate del orden
+CREATE INDEX IF NOT EXISTS idx_venta_fecha_hora ON venta (fecha_hora, idventa);
+CREATE INDEX IF NOT EXISTS idx_venta_idcliente ON venta (idcliente);
+CREATE INDEX IF NOT EXISTS idx_venta_idtrabajador ON venta (idtrabajador);
+
+-- detalle_venta: embed detalle_venta(*) de factura/PDF y borrado por venta
+CREATE INDEX IF NOT EXISTS idx_detalle_venta_idventa ON detalle_venta (idventa);
+CREATE INDEX IF NOT EXISTS idx_detalle_venta_idarticulo ON detalle_venta (idarticulo);
+
+-- articulo: POS (estado = 'activo' AND stock > 0), stock bajo y vencimientos de productos activos
+CREATE INDEX IF NOT EXISTS idx_articulo_estado_stock ON articulo (estado, stock);
+CREATE INDEX IF NOT EXISTS idx_articulo_stock ON articulo (stock);
+CREATE INDEX IF NOT EXISTS idx_articulo_activo_vencimiento ON articulo (fecha_vencimiento) WHERE estado = 'activo';
+CREATE INDEX IF NOT EXISTS idx_articulo_codigo ON articulo (codigo);
+CREATE INDEX IF NOT EXISTS idx_articulo_nombre_trgm ON articulo USING gin (nombre gin_trgm_ops);
+
+-- cliente: búsqueda por nombre/apellidos con ilike
+CREATE INDEX IF NOT EXISTS idx_cliente_nombre_trgm ON cliente USING gin (nombre gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_cliente_apellidos_trgm ON cliente USING gin (apellidos gin_trgm_ops);
+
+-- Sincronización incremental del catálogo (ver migration_catalog_version.sql)
+-- Hora real de la escritura junto con la versión (CATALOG_SYNC_LAG)
+ALTER TABLE articulo ALTER COLUMN updated_at SET DEFAULT clock_timestamp();
+ALTER TABLE cliente ALTER COLUMN updated_at SET DEFAULT clock_timestamp();
+ALTER TABLE catalogo_borrado ALTER COLUMN borrado_en SET DEFAULT clock_timestamp();
+CREATE INDEX IF NOT EXISTS idx_articulo_version ON articulo (version);
+CREATE INDEX IF NOT EXISTS idx_cliente_version ON cliente (version);
+CREATE INDEX IF NOT EXISTS idx_catalogo_borrado_version ON catalogo_borrado (tabla, version);
+
+-- Refresco incremental del índice vectorial local (ver migration_documents_version.sql)
+CREATE INDEX IF NOT EXISTS idx_documents_version ON documents (version);
+-- Hora real de la escritura junto con la versión (RAG_INDEX_SYNC_LAG)
+ALTER TABLE documents ALTER COLUMN updated_at SET DEFAULT clock_timestamp();
+ALTER TABLE documents_borrado ALTER COLUMN borrado_en SET DEFAULT clock_timestamp();
+CREATE INDEX IF NOT EXISTS idx_documents_borrado_version ON documents_borrado (version);
+
 -- Función para búsqueda RAG
 CREATE OR REPLACE FUNCTION search_documents(
     query_embedding vector(1536),
@@ -115,3 +193,242 @@ WHERE 1 - (d.embedding <=> query_embedding) > similarity_threshold
 ORDER BY d.embedding <=> query_embedding
 LIMIT match_count;
 $$;
+
+-- Función para registrar ventas de forma atómica (ver migration_register_sale.sql)
+CREATE OR REPLACE FUNCTION register_sale(
+    p_items jsonb,
+    p_idcliente bigint DEFAULT NULL,
+    p_idtrabajador bigint DEFAULT NULL
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_idventa bigint;
+    v_total numeric(10, 2);
+    v_stocks jsonb;
+    v_articulos int;
+    v_actualizados int;
+    v_sin_stock bigint;
+BEGIN
+    IF p_items IS NULL OR jsonb_typeof(p_items) <> 'array' OR jsonb_array_length(p_items) = 0 THEN
+        RAISE EXCEPTION 'No hay items en la venta';
+    END IF;
+
+    -- Bloquear los artículos en orden de id (evita deadlocks entre cajas concurrentes)
+    PERFORM 1
+    FROM articulo
+    WHERE idarticulo IN (SELECT (e->>'idarticulo')::bigint FROM jsonb_array_elements(p_items) e)
+    ORDER BY idarticulo
+    FOR UPDATE;
+
+    SELECT COALESCE(SUM((e->>'subtotal')::numeric), 0),
+           COUNT(DISTINCT (e->>'idarticulo')::bigint)
+    INTO v_total, v_articulos
+    FROM jsonb_array_elements(p_items) e;
+
+    -- 1. Cabecera
+    INSERT INTO venta (idcliente, idtrabajador, total_venta, estado)
+    VALUES (p_idcliente, p_idtrabajador, v_total, 'completada')
+    RETURNING idventa INTO v_idventa;
+
+    -- 2. Detalle
+    INSERT INTO detalle_venta (idventa, idarticulo, cantidad, precio_unitario, subtotal)
+    SELECT v_idventa,
+           (e->>'idarticulo')::bigint,
+           (e->>'cantidad')::int,
+           (e->>'precio')::numeric,
+           (e->>'subtotal')::numeric
+    FROM jsonb_array_elements(p_items) e;
+
+    -- 3. Descontar stock (un UPDATE por artículo, aunque se repita en el carrito)
+    WITH pedido AS (
+        SELECT (e->>'idarticulo')::bigint AS idarticulo, SUM((e->>'cantidad')::int) AS cantidad
+        FROM jsonb_array_elements(p_items) e
+        GROUP BY 1
+    ), actualizados AS (
+        UPDATE articulo a
+        SET stock = a.stock - p.cantidad
+        FROM pedido p
+        WHERE a.idarticulo = p.idarticulo
+        RETURNING a.idarticulo, a.stock
+    )
+    SELECT COUNT(*),
+           MIN(idarticulo) FILTER (WHERE stock < 0),
+           COALESCE(jsonb_agg(jsonb_build_object('idarticulo', idarticulo, 'stock', stock)), '[]'::jsonb)
+    INTO v_actualizados, v_sin_stock, v_stocks
+    FROM actualizados;
+
+    IF v_actualizados <> v_articulos THEN
+        RAISE EXCEPTION 'La venta contiene artículos inexistentes';
+    END IF;
+    IF v_sin_stock IS NOT NULL THEN
+        RAISE EXCEPTION 'Stock insuficiente para el artículo %', v_sin_stock;
+    END IF;
+
+    RETURN jsonb_build_object('idventa', v_idventa, 'total_venta', v_total, 'stocks', v_stocks);
+END;
+$$;
+
+-- Resumen diario de ventas (ver migration_venta_diaria.sql)
+-- Aplicar a venta_diaria el efecto de una fila de venta (signo +1 al insertar, -1 al borrar)
+CREATE OR REPLACE FUNCTION venta_diaria_aplicar(p_fecha_hora timestamptz, p_idtrabajador bigint, p_total numeric, p_signo int)
+RETURNS void
+LANGUAGE sql
+AS $$
+    INSERT INTO venta_diaria AS vd (fecha, idtrabajador, cantidad, total)
+    VALUES (p_fecha_hora::date, COALESCE(p_idtrabajador, 0), p_signo, p_signo * COALESCE(p_total, 0))
+    ON CONFLICT (fecha, idtrabajador) DO UPDATE
+    SET cantidad = vd.cantidad + EXCLUDED.cantidad,
+        total = vd.total + EXCLUDED.total;
+$$;
+
+CREATE OR REPLACE FUNCTION venta_diaria_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM venta_diaria_aplicar(OLD.fecha_hora, OLD.idtrabajador, OLD.total_venta, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM venta_diaria_aplicar(NEW.fecha_hora, NEW.idtrabajador, NEW.total_venta, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS venta_diaria_sync ON venta;
+CREATE TRIGGER venta_diaria_sync
+AFTER INSERT OR DELETE OR UPDATE OF fecha_hora, idtrabajador, total_venta ON venta
+FOR EACH ROW EXECUTE FUNCTION venta_diaria_trigger();
+
+-- Recalcular el resumen desde venta (todo o un rango de fechas); devuelve las filas escritas
+CREATE OR REPLACE FUNCTION backfill_venta_diaria(p_desde date DEFAULT NULL, p_hasta date DEFAULT NULL)
+RETURNS int
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_filas int;
+BEGIN
+    -- Evita que ventas concurrentes se sumen dos veces mientras se reconstruye
+    LOCK TABLE venta IN SHARE MODE;
+
+    DELETE FROM venta_diaria
+    WHERE (p_desde IS NULL OR fecha >= p_desde)
+      AND (p_hasta IS NULL OR fecha <= p_hasta);
+
+    INSERT INTO venta_diaria (fecha, idtrabajador, cantidad, total)
+    SELECT fecha_hora::date, COALESCE(idtrabajador, 0), COUNT(*), COALESCE(SUM(total_venta), 0)
+    FROM venta
+    WHERE (p_desde IS NULL OR fecha_hora >= p_desde)
+      AND (p_hasta IS NULL OR fecha_hora < p_hasta + 1)
+    GROUP BY 1, 2;
+
+    GET DIAGNOSTICS v_filas = ROW_COUNT;
+    RETURN v_filas;
+END;
+$$;
+
+-- Agregados del reporte de ventas (ver migration_sales_report.sql)
+CREATE OR REPLACE FUNCTION sales_report(p_desde date, p_hasta date)
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+AS $$
+    WITH rango AS (
+        SELECT fecha, idtrabajador, cantidad, total
+        FROM venta_diaria
+        WHERE fecha BETWEEN p_desde AND p_hasta AND cantidad <> 0
+    ),
+    por_dia AS (
+        SELECT fecha, SUM(cantidad)::int AS cantidad, SUM(total) AS total
+        FROM rango GROUP BY fecha
+    ),
+    por_trabajador AS (
+        SELECT r.idtrabajador, t.usuario, SUM(r.cantidad)::int AS cantidad, SUM(r.total) AS total
+        FROM rango r LEFT JOIN trabajador t ON t.idtrabajador = r.idtrabajador
+        GROUP BY r.idtrabajador, t.usuario
+    )
+    SELECT jsonb_build_object(
+        'total_ventas', COALESCE((SELECT SUM(cantidad) FROM rango), 0),
+        'total_monto', COALESCE((SELECT SUM(total) FROM rango), 0),
+        'ticket_promedio', COALESCE((SELECT ROUND(SUM(total) / NULLIF(SUM(cantidad), 0), 2) FROM rango), 0),
+        'por_dia', COALESCE((SELECT jsonb_agg(to_jsonb(d) ORDER BY d.fecha) FROM por_dia d), '[]'::jsonb),
+        'por_trabajador', COALESCE((SELECT jsonb_agg(to_jsonb(w) ORDER BY w.total DESC) FROM por_trabajador w), '[]'::jsonb)
+    );
+$$;
+
+-- Versión y lápidas del catálogo (ver migration_catalog_version.sql)
+CREATE OR REPLACE FUNCTION catalogo_version_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.version := nextval('catalogo_version_seq');
+    -- Hora real de la escritura (NOW() es la del inicio de la transacción)
+    NEW.updated_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION catalogo_borrado_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO catalogo_borrado (tabla, id)
+    VALUES (TG_TABLE_NAME, CASE TG_TABLE_NAME WHEN 'articulo' THEN OLD.idarticulo ELSE OLD.idcliente END)
+    ON CONFLICT (tabla, id) DO UPDATE
+    SET version = nextval('catalogo_version_seq'), borrado_en = clock_timestamp();
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS articulo_version ON articulo;
+CREATE TRIGGER articulo_version BEFORE UPDATE ON articulo
+FOR EACH ROW EXECUTE FUNCTION catalogo_version_trigger();
+
+DROP TRIGGER IF EXISTS cliente_version ON cliente;
+CREATE TRIGGER cliente_version BEFORE UPDATE ON cliente
+FOR EACH ROW EXECUTE FUNCTION catalogo_version_trigger();
+
+DROP TRIGGER IF EXISTS articulo_borrado ON articulo;
+CREATE TRIGGER articulo_borrado AFTER DELETE ON articulo
+FOR EACH ROW EXECUTE FUNCTION catalogo_borrado_trigger();
+
+DROP TRIGGER IF EXISTS cliente_borrado ON cliente;
+CREATE TRIGGER cliente_borrado AFTER DELETE ON cliente
+FOR EACH ROW EXECUTE FUNCTION catalogo_borrado_trigger();
+
+-- Versión de documents (ver migration_documents_version.sql)
+CREATE OR REPLACE FUNCTION documents_version_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.version := nextval('documents_version_seq');
+    -- Hora real de la escritura (NOW() es la del inicio de la transacción)
+    NEW.updated_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS documents_version ON documents;
+CREATE TRIGGER documents_version BEFORE UPDATE ON documents
+FOR EACH ROW EXECUTE FUNCTION documents_version_trigger();
+
+CREATE OR REPLACE FUNCTION documents_borrado_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO documents_borrado (id) VALUES (OLD.id)
+    ON CONFLICT (id) DO UPDATE SET version = nextval('documents_version_seq'), borrado_en = clock_timestamp();
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS documents_borrado ON documents;
+CREATE TRIGGER documents_borrado AFTER DELETE ON documents
+FOR EACH ROW EXECUTE FUNCTION documents_borrado_trigger();
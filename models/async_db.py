@@ -0,0 +1,233 @@
+import os
+import time
+import asyncio
+import threading
+import contextvars
+import concurrent.futures
+import httpx
+from config import Config
+from models.db import (SupabaseTable, HTTPTransport, QueryCache, ResiliencePolicy,
+                       SupabaseError, SupabaseTimeoutError, SupabaseConnectionError)
+
+
+class AsyncHTTPTransport:
+    """Transporte asíncrono (httpx) con pool keep-alive, equivalente a HTTPTransport"""
+    def __init__(self, pool_size=None, connect_timeout=None, timeouts=None):
+        self.pool_size = pool_size or Config.SUPABASE_POOL_SIZE
+        self.connect_timeout = connect_timeout or Config.SUPABASE_CONNECT_TIMEOUT
+        self.timeouts = {
+            'select': Config.SUPABASE_READ_TIMEOUT,
+            'insert': Config.SUPABASE_WRITE_TIMEOUT,
+            'update': Config.SUPABASE_WRITE_TIMEOUT,
+            'delete': Config.SUPABASE_WRITE_TIMEOUT,
+            'rpc': Config.SUPABASE_RPC_TIMEOUT,
+        }
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self._requests = 0
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+            headers={'Connection': 'keep-alive'},
+        )
+
+    def timeout_for(self, op):
+        read = self.timeouts.get(op, Config.SUPABASE_READ_TIMEOUT)
+        return httpx.Timeout(read, connect=self.connect_timeout)
+
+    async def request(self, method, url, op='select', **kwargs):
+        kwargs.setdefault('timeout', self.timeout_for(op))
+        self._requests += 1
+        return await self.client.request(method, url, **kwargs)
+
+    def stats(self):
+        return {'requests': self._requests, 'pool_size': self.pool_size}
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class AsyncSupabaseTable(SupabaseTable):
+    """Mismo builder que SupabaseTable, pero execute()/count() son corrutinas"""
+
+    @classmethod
+    def from_query(cls, query, client):
+        """Reutilizar un builder síncrono ya configurado sobre el cliente asíncrono"""
+        table = cls.__new__(cls)
+        table.__dict__.update(query._copy().__dict__)
+        table.client = client
+        table.transport = client.transport
+        return table
+
+    async def _asend(self, method, url, op='select', **kwargs):
+        return await self.client.policy.acall(lambda: self._aattempt(method, url, op, **kwargs), method)
+
+    async def _aattempt(self, method, url, op, **kwargs):
+        start = time.perf_counter()
+        response = None
+        try:
+            try:
+                response = await self.transport.request(method, url, op=op, **kwargs)
+            except httpx.TimeoutException as e:
+                raise SupabaseTimeoutError(f"Timeout en {self._target()}: {e}") from e
+            except httpx.TransportError as e:
+                raise SupabaseConnectionError(f"Error de conexión en {self._target()}: {e}") from e
+            self._raise_transient(response)
+            return response
+        finally:
+            self._record(method, url, op, response, start)
+
+    async def execute(self):
+        """Ejecutar operación (SELECT, INSERT, UPDATE, DELETE, RPC, conteo)"""
+        method, url, op, kwargs = self._request_spec()
+        try:
+            cached = self._cached(op, url)
+            if cached is not None:
+                return cached
+            generation = self._cache_generation(op)
+            response = await self._asend(method, url, op=op, **kwargs)
+            return self._finish(op, url, response, generation)
+        except SupabaseError:
+            raise
+        except Exception as e:
+            raise SupabaseError(f"Error executing query on {self._target()}: {e}") from e
+
+    async def count(self, mode='exact'):
+        return (await self._copy().count_only(mode).execute()).data
+
+    async def iter_rows(self, page_size=1000, key=None):
+        """Generador asíncrono página a página (misma paginación keyset/offset que el síncrono)"""
+        pages = self._pages(page_size, key)
+        try:
+            page = next(pages)
+            while True:
+                rows = (await page.execute()).data or []
+                for row in rows:
+                    yield row
+                page = pages.send(rows)
+        except StopIteration:
+            return
+
+
+class AsyncSupabaseClient:
+    """Cliente asíncrono con la misma API de builder que SupabaseClient"""
+    def __init__(self, url, key, transport=None, cache=None, policy=None):
+        self.url = url
+        self.key = key
+        self.transport = transport or AsyncHTTPTransport()
+        self.cache = cache if cache is not None else QueryCache.from_config()
+        self.policy = policy or ResiliencePolicy.from_config()
+
+    def table(self, name):
+        return AsyncSupabaseTable(self, name)
+
+    def rpc(self, name, params=None):
+        return AsyncSupabaseTable(self, "").rpc(name, params)
+
+    def __getitem__(self, key):
+        if key == 'url': return self.url
+        if key == 'key': return self.key
+        if key == 'table': return self.table
+        raise KeyError(key)
+
+
+class _LoopRunner:
+    """Event loop en un hilo de fondo (uno por proceso) para usar httpx desde vistas síncronas.
+
+    El loop vive mientras vive el worker, así el pool keep-alive del cliente
+    asíncrono se reutiliza entre peticiones.
+    """
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='supabase-async', daemon=True)
+        self.thread.start()
+
+    def run(self, coro, timeout=None):
+        # Copiar el contexto actual: la tarea ve el request/g de Flask (ledger de consultas)
+        ctx = contextvars.copy_context()
+        future = concurrent.futures.Future()
+
+        def _spawn():
+            task = self.loop.create_task(coro)
+            task.add_done_callback(lambda t: _transfer(t, future))
+
+        self.loop.call_soon_threadsafe(ctx.run, _spawn)
+        return future.result(timeout)
+
+
+def _transfer(task, future):
+    if task.cancelled():
+        future.cancel()
+    elif task.exception() is not None:
+        future.set_exception(task.exception())
+    else:
+        future.set_result(task.result())
+
+
+_runner = None
+_runner_pid = None
+_runner_lock = threading.Lock()
+
+
+def _get_runner():
+    global _runner, _runner_pid
+    pid = os.getpid()
+    if _runner is None or _runner_pid != pid:
+        with _runner_lock:
+            if _runner is None or _runner_pid != pid:
+                _runner = _LoopRunner()
+                _runner_pid = pid
+    return _runner
+
+
+_async_client_lock = threading.Lock()
+
+
+def _async_client_for(client):
+    """Cliente asíncrono asociado a un SupabaseClient (mismo proceso, cache y breaker)"""
+    pid = os.getpid()
+    async_client = getattr(client, '_async_client', None)
+    if async_client is None or async_client[0] != pid:
+        # Un solo httpx.AsyncClient por cliente: peticiones concurrentes no abren pools extra
+        with _async_client_lock:
+            async_client = getattr(client, '_async_client', None)
+            if async_client is None or async_client[0] != pid:
+                transport = AsyncHTTPTransport(pool_size=client.transport.pool_size)
+                async_client = (pid, AsyncSupabaseClient(client.url, client.key, transport=transport,
+                                                         cache=client.cache, policy=client.policy))
+                client._async_client = async_client
+    return async_client[1]
+
+
+def gather_queries(*queries, timeout=None, return_exceptions=False):
+    """Ejecutar consultas independientes en paralelo desde una vista síncrona.
+
+    Recibe builders normales (`db.table(...).select(...)`, `.count_only()`) y
+    devuelve sus SupabaseResponse en el mismo orden. Con el transporte HTTP
+    las consultas viajan concurrentemente por el cliente httpx; con otros
+    transportes (backend local, stubs) se ejecutan en hilos. Con
+    return_exceptions=True una consulta que falla deja su excepción en su
+    lugar de la lista en vez de hacer fallar a todas.
+    """
+    if not queries:
+        return []
+    client = queries[0].client
+    if all(isinstance(q.client.transport, HTTPTransport) for q in queries):
+        async_client = _async_client_for(client)
+        tables = [AsyncSupabaseTable.from_query(q, async_client) for q in queries]
+
+        async def _run_all():
+            return await asyncio.gather(*(t.execute() for t in tables), return_exceptions=return_exceptions)
+
+        return list(_get_runner().run(_run_all(), timeout=timeout))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(queries)) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, q.execute) for q in queries]
+        if not return_exceptions:
+            return [f.result(timeout) for f in futures]
+        results = []
+        for f in futures:
+            try:
+                results.append(f.result(timeout))
+            except Exception as e:
+                results.append(e)
+        return results
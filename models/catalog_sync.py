@@ -0,0 +1,114 @@
+"""
+Sincronización incremental del catálogo (articulo, cliente).
+
+Cada fila lleva `version` (secuencia catalogo_version_seq, renovada en cada
+UPDATE por trigger) y los borrados quedan como lápidas en catalogo_borrado.
+Un cliente descarga el snapshot una vez, guarda el cursor y luego pide sólo
+las filas y borrados con version > cursor, aplicándolos en orden de versión.
+
+Las versiones se asignan al escribir, no al confirmar: register_sale es una
+transacción de varias sentencias y puede confirmar una versión menor después
+de que un lector ya avanzó su cursor por encima. Por eso updated_at/borrado_en
+guardan la hora real en que se tomó la versión (clock_timestamp()) y los
+cursores sólo avanzan sobre versiones escritas hace más de CATALOG_SYNC_LAG
+segundos; lo más reciente llega en la pasada siguiente.
+"""
+from datetime import datetime, timedelta, timezone
+from config import Config
+from models.async_db import gather_queries
+
+CATALOG_TABLES = {'articulo': 'idarticulo', 'cliente': 'idcliente'}
+
+
+def _check_table(table):
+    if table not in CATALOG_TABLES:
+        raise ValueError(f"Tabla sin versión de catálogo: {table}")
+
+
+def _cutoff(lag):
+    """Hora límite: lo escrito desde entonces todavía puede tener transacciones previas en curso"""
+    return datetime.now(timezone.utc) - timedelta(seconds=lag)
+
+
+def _is_stable(stamp, cutoff):
+    if not stamp:
+        return True
+    stamp = datetime.fromisoformat(str(stamp).replace('Z', '+00:00'))
+    # El backend local guarda la hora local sin zona
+    return (stamp if stamp.tzinfo else stamp.astimezone()) < cutoff
+
+
+def _newest_stable(query, stamp_column, cutoff):
+    for row in query.order('version', desc=True).iter_rows(page_size=100, key='version'):
+        if _is_stable(row.get(stamp_column), cutoff):
+            return row['version'] or 0
+    return 0
+
+
+def catalog_version(db, table, lag=0):
+    """Versión actual del catálogo: la mayor entre filas vivas y lápidas (0 si está vacío).
+
+    Con `lag` (segundos) sólo cuenta lo escrito antes de ese margen: es el
+    cursor seguro para empezar a pedir cambios después de un snapshot.
+    """
+    _check_table(table)
+    if lag:
+        cutoff = _cutoff(lag)
+        return max(
+            _newest_stable(db.table(table).select('version, updated_at'), 'updated_at', cutoff),
+            _newest_stable(db.table('catalogo_borrado').select('version, borrado_en').eq('tabla', table),
+                           'borrado_en', cutoff),
+        )
+    rows, deleted = gather_queries(
+        db.table(table).select('version').order('version', desc=True).limit(1),
+        db.table('catalogo_borrado').select('version').eq('tabla', table).order('version', desc=True).limit(1),
+    )
+    return max([r['version'] or 0 for r in (rows.data or []) + (deleted.data or [])] or [0])
+
+
+def catalog_etag(table, version):
+    """Valor (sin comillas) del ETag débil de un snapshot"""
+    return f'{table}-{version}'
+
+
+def change_queries(db, table, since, limit=500, columns='*'):
+    """Filas y lápidas con versión mayor a `since` (sin ejecutar), en orden de versión"""
+    return (
+        db.table(table).select(columns).gt('version', since).order('version').limit(limit),
+        db.table('catalogo_borrado').select('id, version, borrado_en').eq('tabla', table).gt('version', since)
+            .order('version').limit(limit),
+    )
+
+
+def changes_since(db, table, since, limit=500, columns='*', lag=None):
+    """Cambios posteriores a `since`: {'cursor', 'changes', 'deleted', 'has_more'}.
+
+    Filas y lápidas se mezclan por versión y se corta en `limit` eventos o en
+    el primero escrito hace menos de `lag` segundos (CATALOG_SYNC_LAG por
+    defecto); el cursor devuelto es la última versión incluida, así la
+    siguiente página continúa sin huecos.
+    """
+    _check_table(table)
+    lag = Config.CATALOG_SYNC_LAG if lag is None else lag
+    if columns != '*' and 'updated_at' not in columns:
+        columns = f'{columns}, updated_at'
+    rows, deleted = gather_queries(*change_queries(db, table, since, limit, columns))
+    rows, deleted = rows.data or [], deleted.data or []
+    merged = sorted([(r['version'], False, r) for r in rows] + [(d['version'], True, d) for d in deleted],
+                    key=lambda event: event[0])[:limit]
+    # Hay más si alguna consulta llenó su página o si juntas pasaron del límite (se recortó)
+    has_more = len(rows) + len(deleted) > limit or len(rows) == limit or len(deleted) == limit
+    events = merged
+    if lag:
+        cutoff = _cutoff(lag)
+        for i, (_, is_deleted, row) in enumerate(merged):
+            if not _is_stable(row.get('borrado_en' if is_deleted else 'updated_at'), cutoff):
+                # Lo que sigue es demasiado reciente: se entrega en la próxima consulta
+                events, has_more = merged[:i], False
+                break
+    return {
+        'cursor': events[-1][0] if events else since,
+        'changes': [row for _, is_deleted, row in events if not is_deleted],
+        'deleted': [row['id'] for _, is_deleted, row in events if is_deleted],
+        'has_more': has_more,
+    }
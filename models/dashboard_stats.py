@@ -0,0 +1,177 @@
+"""
+Snapshot de las estadísticas del dashboard con stale-while-revalidate.
+
+Todas las sesiones aterrizan en el dashboard tras el login; en lugar de
+recalcular los contadores en cada visita se sirve el último snapshot y, si
+pasó la ventana de frescura, se recalcula en segundo plano. Sólo corre un
+refresco a la vez por worker (single-flight). SaleService llama a
+invalidate_dashboard_stats() después de cada venta.
+"""
+import time
+import threading
+from datetime import datetime, timedelta
+from config import Config
+from models.db import get_db
+from models.async_db import gather_queries
+from models.venta_diaria import rollup_query, totals_by_day
+
+DAY_NAMES = ['Lun', 'Mar', 'Mie', 'Jue', 'Vie', 'Sab', 'Dom']
+
+
+def load_dashboard_stats(db=None):
+    """Calcular contadores, ventas de hoy y el gráfico de los últimos 7 días"""
+    db = db or get_db()
+    now = datetime.now()
+    today = now.strftime('%Y-%m-%d')
+    start_date_str = (now - timedelta(days=6)).strftime('%Y-%m-%d')
+
+    # Las cuatro consultas son independientes: se lanzan en paralelo (un solo round trip de espera)
+    res_prod, res_client, res_stock, res_week = gather_queries(
+        # Productos y clientes: sólo el total, sin descargar las filas
+        db.table('articulo').count_only(),
+        db.table('cliente').count_only('estimated'),
+        # Stock Bajo
+        db.table('articulo').lte('stock', 10).count_only(),
+        # Ventas Hoy y gráfico de la semana: resumen diario (pocas filas por día)
+        rollup_query(db, start_date_str)
+    )
+    sales_by_day = totals_by_day(res_week.data)
+    sales_today = sales_by_day.get(today, {'cantidad': 0, 'total': 0.0})
+
+    chart_labels, chart_values = [], []
+    for i in range(6, -1, -1):
+        day = now - timedelta(days=i)
+        chart_labels.append(DAY_NAMES[day.weekday()])
+        chart_values.append(sales_by_day.get(day.strftime('%Y-%m-%d'), {}).get('total', 0))
+
+    return {
+        'day': today,
+        'count_prod': res_prod.data,
+        'count_client': res_client.data,
+        'count_sales': sales_today['cantidad'],
+        'total_sales_today': sales_today['total'],
+        'count_stock': res_stock.data,
+        'chart_labels': chart_labels,
+        'chart_values': chart_values,
+    }
+
+
+class DashboardSnapshot:
+    """Último resultado de `loader` con ventana de frescura y refresco en segundo plano.
+
+    - Dentro de `ttl` segundos se devuelve tal cual.
+    - Vencido (o invalidado) se devuelve igual y se lanza un refresco en un hilo,
+      salvo que ya haya uno en curso.
+    - Sin snapshot, con más de `max_stale` segundos o de otro día, se recalcula
+      en la petición (las concurrentes esperan a ese mismo cálculo).
+    """
+    def __init__(self, loader, ttl=30, max_stale=300, clock=time.monotonic, today=None):
+        self.loader = loader
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.clock = clock
+        self.today = today or (lambda: datetime.now().strftime('%Y-%m-%d'))
+        self._value = None
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._loaded_generation = -1
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._refreshing = False
+        self.hits = self.stale_hits = self.loads = self.refresh_errors = 0
+
+    @classmethod
+    def from_config(cls, loader):
+        return cls(loader, ttl=Config.DASHBOARD_STATS_TTL, max_stale=Config.DASHBOARD_STATS_MAX_STALE)
+
+    def _usable(self):
+        if self._value is None or self._value.get('day') != self.today():
+            return False
+        return self.clock() - self._loaded_at <= self.max_stale
+
+    def _fresh(self):
+        return self._loaded_generation == self._generation and self.clock() - self._loaded_at <= self.ttl
+
+    def get(self):
+        """Snapshot actual; nunca espera a un refresco si hay uno utilizable"""
+        with self._lock:
+            if self._usable():
+                if self._fresh():
+                    self.hits += 1
+                else:
+                    self.stale_hits += 1
+                    self._start_refresh()
+                return self._value
+        with self._load_lock:
+            # Otra petición pudo haberlo cargado mientras esperábamos
+            with self._lock:
+                if self._usable():
+                    self.hits += 1
+                    return self._value
+            return self._load()
+
+    def invalidate(self):
+        """Marcar el snapshot como vencido: la próxima lectura lo refresca en segundo plano"""
+        with self._lock:
+            self._generation += 1
+
+    def _load(self):
+        with self._lock:
+            generation = self._generation
+        value = self.loader()
+        with self._lock:
+            self._value = value
+            self._loaded_at = self.clock()
+            self._loaded_generation = generation
+            self.loads += 1
+        return value
+
+    def _start_refresh(self):
+        # Llamado con self._lock tomado
+        if self._refreshing:
+            return
+        self._refreshing = True
+        threading.Thread(target=self._refresh, name='dashboard-stats-refresh', daemon=True).start()
+
+    def _refresh(self):
+        try:
+            with self._load_lock:
+                self._load()
+        except Exception as e:
+            print(f"Error refrescando estadísticas del dashboard: {e}")
+            with self._lock:
+                self.refresh_errors += 1
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'loads': self.loads,
+                'refresh_errors': self.refresh_errors,
+                'refreshing': self._refreshing,
+                'age_s': round(self.clock() - self._loaded_at, 1) if self._value is not None else None,
+            }
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_dashboard_snapshot():
+    """Snapshot compartido por todas las peticiones de este proceso/worker"""
+    global _snapshot
+    if _snapshot is None:
+        with _snapshot_lock:
+            if _snapshot is None:
+                _snapshot = DashboardSnapshot.from_config(load_dashboard_stats)
+    return _snapshot
+
+
+def invalidate_dashboard_stats():
+    """Hook para el camino de ventas: el próximo dashboard se refresca"""
+    if _snapshot is not None:
+        _snapshot.invalidate()
@@ -1,23 +1,558 @@
 import os
+import copy
 import json
+import re
+import time
+import random
+import asyncio
+import itertools
+import threading
+import contextvars
+import concurrent.futures
+from collections import deque
+from collections import OrderedDict
+from urllib.parse import urlencode, quote
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 from config import Config
 
 url: str = Config.SUPABASE_URL
 key: str = Config.SUPABASE_KEY
 
+# Caracteres con significado en la sintaxis de PostgREST que no se codifican
+_QUERY_SAFE_CHARS = ',.()*:!'
+
+# Modos de conteo soportados por PostgREST (Prefer: count=...)
+COUNT_MODES = ('exact', 'planned', 'estimated')
+
+# Sólo las lecturas se reintentan o duplican (hedging); un POST/PATCH podría aplicarse dos veces
+IDEMPOTENT_METHODS = ('GET', 'HEAD')
+# Respuestas transitorias: se reintentan y cuentan como fallo del backend
+RETRY_STATUSES = (408, 429, 502, 503, 504)
+
+
+class SupabaseError(Exception):
+    """Error al consultar PostgREST"""
+    pass
+
+
+class SupabaseHTTPError(SupabaseError):
+    """PostgREST respondió con un status de error"""
+    def __init__(self, status, body='', table=None):
+        self.status = status
+        self.body = body
+        self.table = table
+        where = f' ({table})' if table else ''
+        super().__init__(f"HTTP {status} from Supabase{where}: {body}")
+
+    @property
+    def message(self):
+        """Mensaje de Postgres/PostgREST (p. ej. el RAISE EXCEPTION de una RPC)"""
+        try:
+            return json.loads(self.body).get('message') or self.body
+        except (ValueError, AttributeError):
+            return self.body
+
+    @property
+    def transient(self):
+        return self.status >= 500 or self.status in RETRY_STATUSES
+
+
+class SupabaseTimeoutError(SupabaseError):
+    """PostgREST no respondió dentro del timeout de la operación"""
+    pass
+
+
+class SupabaseConnectionError(SupabaseError):
+    """No se pudo conectar con PostgREST"""
+    pass
+
+
+class CircuitOpenError(SupabaseError):
+    """El circuit breaker está abierto: se falla sin llamar al backend"""
+    def __init__(self, retry_after):
+        self.retry_after = retry_after
+        super().__init__(f"Supabase no disponible (circuit breaker abierto, reintentar en {retry_after:.0f}s)")
+
+
+class _CountingPoolMixin:
+    """Cuenta cada conexión TCP/TLS nueva que abre el pool de urllib3"""
+    transport = None
+
+    def _new_conn(self):
+        if self.transport is not None:
+            self.transport._connection_opened()
+        return super()._new_conn()
+
+
+class _PooledAdapter(HTTPAdapter):
+    """Adaptador de requests cuyos pools reportan conexiones abiertas al transporte"""
+    def __init__(self, transport, **kwargs):
+        self._transport = transport
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        attrs = {'transport': self._transport}
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': type('CountingHTTPConnectionPool', (_CountingPoolMixin, HTTPConnectionPool), attrs),
+            'https': type('CountingHTTPSConnectionPool', (_CountingPoolMixin, HTTPSConnectionPool), attrs),
+        }
+
+
+class HTTPTransport:
+    """Transporte HTTP keep-alive compartido por todas las tablas y RPC de un proceso.
+
+    Mantiene una sola `requests.Session` con un pool de conexiones acotado, de
+    modo que las consultas reutilizan la conexión TCP+TLS hacia PostgREST en
+    lugar de abrir una nueva por query.
+    """
+    def __init__(self, pool_size=None, pool_block=None, connect_timeout=None, timeouts=None):
+        self.pool_size = pool_size or Config.SUPABASE_POOL_SIZE
+        self.connect_timeout = connect_timeout or Config.SUPABASE_CONNECT_TIMEOUT
+        self.timeouts = {
+            'select': Config.SUPABASE_READ_TIMEOUT,
+            'insert': Config.SUPABASE_WRITE_TIMEOUT,
+            'update': Config.SUPABASE_WRITE_TIMEOUT,
+            'delete': Config.SUPABASE_WRITE_TIMEOUT,
+            'rpc': Config.SUPABASE_RPC_TIMEOUT,
+        }
+        if timeouts:
+            self.timeouts.update(timeouts)
+
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._connections = 0
+
+        self.session = requests.Session()
+        self.session.headers['Connection'] = 'keep-alive'
+        adapter = _PooledAdapter(
+            self,
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            pool_block=Config.SUPABASE_POOL_BLOCK if pool_block is None else pool_block,
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _connection_opened(self):
+        with self._lock:
+            self._connections += 1
+
+    def timeout_for(self, op):
+        """Timeout (connect, read) para un tipo de operación"""
+        return (self.connect_timeout, self.timeouts.get(op, Config.SUPABASE_READ_TIMEOUT))
+
+    def request(self, method, url, op='select', **kwargs):
+        """Enviar una petición reutilizando el pool de conexiones"""
+        kwargs.setdefault('timeout', self.timeout_for(op))
+        with self._lock:
+            self._requests += 1
+        return self.session.request(method, url, **kwargs)
+
+    def stats(self):
+        """Contadores de conexiones abiertas vs. reutilizadas"""
+        with self._lock:
+            return {
+                'requests': self._requests,
+                'connections_opened': self._connections,
+                'connections_reused': max(self._requests - self._connections, 0),
+                'pool_size': self.pool_size,
+            }
+
+    def close(self):
+        self.session.close()
+
+
+# Observadores de consultas: reciben un dict por cada llamada a PostgREST
+_query_listeners = []
+
+def add_query_listener(fn):
+    """Registrar fn(record) para cada consulta (tabla, método, query, status, bytes, ms)"""
+    if fn not in _query_listeners:
+        _query_listeners.append(fn)
+
+def remove_query_listener(fn):
+    if fn in _query_listeners:
+        _query_listeners.remove(fn)
+
+def _notify_query(record):
+    for fn in list(_query_listeners):
+        try:
+            fn(record)
+        except Exception as e:
+            print(f"Error in query listener: {e}")
+
+
+
+class CircuitBreaker:
+    """Corta las llamadas tras `threshold` fallos seguidos del backend.
+
+    Abierto, falla de inmediato con CircuitOpenError; pasado `reset_timeout`
+    deja pasar una sola llamada de prueba (half-open) que lo cierra si sale bien.
+    threshold=0 lo desactiva.
+    """
+    def __init__(self, threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True si la llamada puede salir; lanza CircuitOpenError si no"""
+        if not self.threshold:
+            return True
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            elapsed = self.clock() - self.opened_at
+            if elapsed >= self.reset_timeout:
+                # Una sola prueba por ventana: si se pierde, la siguiente llega tras otro reset_timeout
+                self.state = 'half_open'
+                self.opened_at = self.clock()
+                return True
+            raise CircuitOpenError(self.reset_timeout - elapsed)
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+
+    def record_failure(self):
+        if not self.threshold:
+            return
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.threshold:
+                self.state = 'open'
+                self.opened_at = self.clock()
+
+
+class LatencyTracker:
+    """Ventana móvil de latencias para estimar el p95 (retardo del hedging)"""
+    def __init__(self, window=200, min_samples=20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def add(self, ms):
+        with self._lock:
+            self.samples.append(ms)
+
+    def percentile(self, p):
+        """Percentil p (0-100) en ms, o None con pocas muestras"""
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class ResiliencePolicy:
+    """Reintentos, hedging y circuit breaker alrededor de cada llamada a PostgREST.
+
+    - Las lecturas (GET/HEAD) se reintentan ante timeouts, errores de conexión
+      y status transitorios, con backoff exponencial y jitter completo.
+    - Con hedging activo, si una lectura tarda más que el p95 observado (o
+      `hedge_delay_ms`) se lanza un duplicado y gana la primera respuesta.
+    - Las escrituras y RPC salen una sola vez; igual pasan por el breaker.
+    """
+    def __init__(self, retries=2, backoff=0.1, backoff_max=2.0, hedge=False, hedge_delay_ms=None,
+                 breaker=None, sleep=time.sleep, max_workers=8):
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_delay_ms = hedge_delay_ms or None
+        self.breaker = breaker or CircuitBreaker(threshold=0)
+        self.latency = LatencyTracker()
+        self.sleep = sleep
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._counters = {'retries': 0, 'hedges': 0, 'hedge_wins': 0, 'rejected': 0}
+
+    @classmethod
+    def from_config(cls):
+        return cls(
+            retries=Config.SUPABASE_RETRIES,
+            backoff=Config.SUPABASE_RETRY_BACKOFF,
+            backoff_max=Config.SUPABASE_RETRY_BACKOFF_MAX,
+            hedge=Config.SUPABASE_HEDGE_ENABLED,
+            hedge_delay_ms=Config.SUPABASE_HEDGE_DELAY_MS,
+            breaker=CircuitBreaker(Config.SUPABASE_BREAKER_THRESHOLD, Config.SUPABASE_BREAKER_RESET),
+            max_workers=Config.SUPABASE_POOL_SIZE,
+        )
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def backoff_delay(self, attempt):
+        """Backoff exponencial con jitter completo: uniforme en [0, min(max, base*2^n)]"""
+        return random.uniform(0, min(self.backoff_max, self.backoff * (2 ** attempt)))
+
+    def hedge_delay(self):
+        """Segundos a esperar antes de duplicar una lectura (None = sin datos aún)"""
+        ms = self.hedge_delay_ms or self.latency.percentile(95)
+        return ms / 1000 if ms else None
+
+    @staticmethod
+    def is_backend_failure(exc):
+        """Fallos que indican un backend enfermo (no los 4xx de validación)"""
+        if isinstance(exc, SupabaseHTTPError):
+            return exc.transient
+        return isinstance(exc, (SupabaseTimeoutError, SupabaseConnectionError))
+
+    def _attempts(self, method):
+        return 1 + (self.retries if method in IDEMPOTENT_METHODS else 0)
+
+    def _before_attempt(self):
+        try:
+            self.breaker.allow()
+        except CircuitOpenError:
+            self._count('rejected')
+            raise
+
+    def _after_failure(self, exc, attempt, attempts):
+        """Registrar el fallo; devuelve los segundos a esperar antes de reintentar o None"""
+        if self.is_backend_failure(exc):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        if attempt + 1 < attempts and self.is_backend_failure(exc):
+            self._count('retries')
+            return self.backoff_delay(attempt)
+        return None
+
+    def _after_success(self, start):
+        self.breaker.record_success()
+        self.latency.add((time.perf_counter() - start) * 1000)
+
+    def call(self, fn, method):
+        """Ejecutar fn() (un intento de petición) aplicando la política"""
+        attempts = self._attempts(method)
+        for attempt in range(attempts):
+            self._before_attempt()
+            start = time.perf_counter()
+            try:
+                if self.hedge and method in IDEMPOTENT_METHODS:
+                    result = self._hedged(fn)
+                else:
+                    result = fn()
+            except SupabaseError as e:
+                delay = self._after_failure(e, attempt, attempts)
+                if delay is None:
+                    raise
+                self.sleep(delay)
+                continue
+            self._after_success(start)
+            return result
+
+    async def acall(self, fn, method):
+        """Versión asíncrona de call() para el cliente httpx (sin hedging)"""
+        attempts = self._attempts(method)
+        for attempt in range(attempts):
+            self._before_attempt()
+            start = time.perf_counter()
+            try:
+                result = await fn()
+            except SupabaseError as e:
+                delay = self._after_failure(e, attempt, attempts)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self._after_success(start)
+            return result
+
+    def _pool(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix='supabase-hedge')
+        return self._executor
+
+    def _hedged(self, fn):
+        """Lanzar fn(); si no respondió tras el retardo de hedging, lanzar un duplicado"""
+        delay = self.hedge_delay()
+        if delay is None:
+            return fn()
+        pool = self._pool()
+        # Cada intento corre con una copia del contexto (request/g de Flask para el ledger)
+        primary = pool.submit(contextvars.copy_context().run, fn)
+        try:
+            return primary.result(timeout=delay)
+        except concurrent.futures.TimeoutError:
+            pass
+        self._count('hedges')
+        backup = pool.submit(contextvars.copy_context().run, fn)
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        self._count('hedge_wins')
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats['breaker'] = self.breaker.state
+        stats['p95_ms'] = self.latency.percentile(95)
+        return stats
+
+
+class QueryCache:
+    """Cache read-through con TTL por tabla y límite LRU para tablas de referencia.
+
+    Sólo se cachean los SELECT de las tablas configuradas. Cualquier
+    insert/update/delete que este proceso haga sobre una tabla invalida sus
+    entradas; los cambios hechos por otros workers se ven al vencer el TTL.
+    Cada invalidación sube la generación de la tabla: un SELECT que salió
+    antes de la escritura y termina después no guarda sus filas viejas.
+    """
+    def __init__(self, ttls=None, max_entries=256, max_rows=5000):
+        self.ttls = dict(ttls or {})
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_config(cls):
+        return cls(
+            ttls=parse_cache_ttls(Config.SUPABASE_CACHE_TTLS),
+            max_entries=Config.SUPABASE_CACHE_MAX_ENTRIES,
+            max_rows=Config.SUPABASE_CACHE_MAX_ROWS,
+        )
+
+    def enabled_for(self, table):
+        return self.ttls.get(table, 0) > 0
+
+    def get(self, table, query):
+        """Devolver (True, datos) si hay una entrada vigente, si no (False, None)"""
+        key = (table, query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, _copy_rows(entry[1])
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def generation(self, table):
+        """Tomar antes de enviar el SELECT y pasar a set()"""
+        with self._lock:
+            return self._epoch, self._generations.get(table, 0)
+
+    def set(self, table, query, data, generation=None):
+        if isinstance(data, list) and len(data) > self.max_rows:
+            return
+        key = (table, query)
+        with self._lock:
+            if generation is not None and generation != (self._epoch, self._generations.get(table, 0)):
+                # Hubo una escritura mientras la consulta estaba en vuelo
+                return
+            self._entries[key] = (time.monotonic() + self.ttls[table], _copy_rows(data))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, table=None):
+        """Descartar las entradas de una tabla (o todas si table es None)"""
+        with self._lock:
+            if table is None:
+                self._epoch += 1
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                self._generations[table] = self._generations.get(table, 0) + 1
+                keys = [k for k in self._entries if k[0] == table]
+                for k in keys:
+                    del self._entries[k]
+                removed = len(keys)
+            self.invalidations += removed
+            return removed
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'entries': len(self._entries),
+                'invalidations': self.invalidations,
+            }
+
+
+def parse_cache_ttls(spec):
+    """'categoria:300,cliente:60' -> {'categoria': 300.0, 'cliente': 60.0}"""
+    ttls = {}
+    for part in (spec or '').split(','):
+        if ':' in part:
+            table, ttl = part.split(':', 1)
+            ttls[table.strip()] = float(ttl)
+    return ttls
+
+
+def _copy_rows(data):
+    """Copia superficial para que el llamador no altere lo cacheado"""
+    if isinstance(data, list):
+        return [dict(r) if isinstance(r, dict) else r for r in data]
+    if isinstance(data, dict):
+        return dict(data)
+    return data
+
+
 class SupabaseClient:
     """Cliente simulado de Supabase para mantener compatibilidad"""
-    def __init__(self, url, key):
+    def __init__(self, url, key, transport=None, cache=None, policy=None):
         self.url = url
         self.key = key
+        self.transport = transport or HTTPTransport()
+        self.cache = cache if cache is not None else QueryCache.from_config()
+        self.policy = policy or ResiliencePolicy.from_config()
     
     def table(self, name):
-        return SupabaseTable(self.url, self.key, name)
+        return SupabaseTable(self, name)
     
     def rpc(self, name, params=None):
         """Atajo para RPC directamente desde el cliente"""
-        return SupabaseTable(self.url, self.key, "").rpc(name, params)
+        return SupabaseTable(self, "").rpc(name, params)
+
+    def transport_stats(self):
+        """Estadísticas del pool HTTP de este proceso"""
+        return self.transport.stats()
+
+    def invalidate(self, table=None):
+        """Invalidar manualmente el cache de una tabla (o de todas)"""
+        return self.cache.invalidate(table)
+
+    def cache_stats(self):
+        return self.cache.stats()
+
+    def resilience_stats(self):
+        """Reintentos, hedges y estado del circuit breaker"""
+        return self.policy.stats()
 
     # Permitir acceso como diccionario para compatibilidad hacia atrás
     def __getitem__(self, key):
@@ -26,66 +561,119 @@ class SupabaseClient:
         if key == 'table': return self.table
         raise KeyError(key)
 
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
 def get_db():
-    """Obtener cliente Supabase"""
-    if not url or not key:
+    """Obtener cliente Supabase (uno por proceso, comparte el pool de conexiones)"""
+    global _client, _client_pid
+    local = Config.SUPABASE_BACKEND == 'sqlite'
+    if not local and (not url or not key):
         raise Exception("Supabase credentials not configured in .env file")
-    return SupabaseClient(url, key)
+    # Tras un fork (gunicorn --preload) cada worker crea su propio pool
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                if local:
+                    from models.local_backend import LocalBackend
+                    _client = SupabaseClient(url or 'http://local', key or 'local-key', transport=LocalBackend.from_config())
+                else:
+                    _client = SupabaseClient(url, key)
+                _client_pid = pid
+    return _client
 
 class SupabaseTable:
     """Wrapper para hacer queries a Supabase via REST API"""
-    def __init__(self, url, key, table_name):
-        self.url = url
-        self.key = key
+    def __init__(self, client, table_name):
+        self.client = client
+        self.url = client.url
+        self.key = client.key
+        self.transport = client.transport
         self.table_name = table_name
         self.select_cols = '*'
-        self.filters = {}
-        self.order_col = None
-        self.order_desc = False
+        self.filters = []
+        self.orders = []
         self.limit_n = None
+        self.offset_n = None
         self.single_row = False
         self.insert_data = None
+        self.upsert_conflict = None
         self.update_data = None
         self.delete_flag = False
+        self.count_mode = None
+        self.rpc_name = None
+        self.rpc_params = None
         
     def select(self, *cols):
         if cols:
-            self.select_cols = ','.join(cols)
+            # PostgREST no necesita espacios: 'a, cliente(nombre, apellidos)' -> 'a,cliente(nombre,apellidos)'
+            self.select_cols = re.sub(r'\s+', '', ','.join(cols))
         return self
     
-    def eq(self, col, val):
-        self.filters[col] = ('eq', val)
+    def _filter(self, col, op, val):
+        """Agregar una condición; una misma columna puede repetirse (rangos)"""
+        self.filters.append((col, op, val))
         return self
     
+    def eq(self, col, val):
+        if val is None:
+            return self.is_(col, None)
+        return self._filter(col, 'eq', val)
+    
     def gte(self, col, val):
-        self.filters[col] = ('gte', val)
-        return self
+        return self._filter(col, 'gte', val)
     
     def lte(self, col, val):
-        self.filters[col] = ('lte', val)
-        return self
+        return self._filter(col, 'lte', val)
     
     def lt(self, col, val):
-        self.filters[col] = ('lt', val)
-        return self
+        return self._filter(col, 'lt', val)
     
     def gt(self, col, val):
-        self.filters[col] = ('gt', val)
-        return self
+        return self._filter(col, 'gt', val)
     
     def neq(self, col, val):
-        self.filters[col] = ('neq', val)
-        return self
+        return self._filter(col, 'neq', val)
+    
+    def like(self, col, pattern):
+        """Patrón con comodín '*' (o '%'), sensible a mayúsculas"""
+        return self._filter(col, 'like', pattern)
+    
+    def ilike(self, col, pattern):
+        """Patrón con comodín '*' (o '%'), sin distinguir mayúsculas"""
+        return self._filter(col, 'ilike', pattern)
+    
+    def in_(self, col, values):
+        """col IN (values)"""
+        return self._filter(col, 'in', list(values))
+    
+    def is_(self, col, val):
+        """IS NULL / IS TRUE / IS FALSE"""
+        return self._filter(col, 'is', val)
+    
+    def not_(self, col, op, val):
+        """Negar cualquier operador: not_('estado', 'eq', 'inactivo')"""
+        return self._filter(col, f'not.{op}', val)
+    
+    def or_(self, expression):
+        """Condición OR en sintaxis PostgREST: or_('stock.lt.5,fecha_vencimiento.lt.2026-01-01')"""
+        return self._filter('or', None, expression)
     
     def order(self, col, desc=False):
-        self.order_col = col
-        self.order_desc = desc
+        """Ordenar por una columna; llamadas sucesivas agregan criterios de desempate"""
+        self.orders.append((col, desc))
         return self
     
     def limit(self, n):
         self.limit_n = n
         return self
     
+    def offset(self, n):
+        self.offset_n = n
+        return self
+    
     def single(self):
         self.single_row = True
         return self
@@ -93,6 +681,12 @@ class SupabaseTable:
     def insert(self, data):
         self.insert_data = data
         return self
+
+    def upsert(self, data, on_conflict=None):
+        """INSERT ... ON CONFLICT DO UPDATE por `on_conflict` (columnas únicas; por defecto la PK)"""
+        self.insert_data = data
+        self.upsert_conflict = on_conflict or ''
+        return self
     
     def update(self, data):
         self.update_data = data
@@ -102,20 +696,47 @@ class SupabaseTable:
         self.delete_flag = True
         return self
     
+    @staticmethod
+    def _format_value(op, val):
+        """Serializar el valor de un filtro en la sintaxis de PostgREST"""
+        base_op = op.split('.')[-1]
+        if base_op == 'is':
+            return {None: 'null', True: 'true', False: 'false'}.get(val, str(val))
+        if base_op == 'in':
+            return '(' + ','.join(SupabaseTable._quote_list_item(v) for v in val) + ')'
+        if isinstance(val, bool):
+            return 'true' if val else 'false'
+        return str(val)
+    
+    @staticmethod
+    def _quote_list_item(val):
+        """Los elementos de in.(...) con caracteres reservados van entre comillas dobles"""
+        text = str(val)
+        if any(ch in text for ch in ',.:()" '):
+            return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+        return text
+    
     def _build_query_string(self):
-        """Construir query string para GET"""
-        query_params = f'select={self.select_cols}'
-        for col, (op, val) in self.filters.items():
-            query_params += f'&{col}={op}.{val}'
+        """Construir query string (GET/PATCH/DELETE) con los valores URL-encoded"""
+        params = [('select', self.select_cols)]
+        for col, op, val in self.filters:
+            if col == 'or' and op is None:
+                params.append(('or', f'({val})'))
+            else:
+                params.append((col, f'{op}.{self._format_value(op, val)}'))
         
-        if self.order_col:
-            order = 'desc' if self.order_desc else 'asc'
-            query_params += f'&order={self.order_col}.{order}'
+        if self.orders:
+            order = ','.join(f"{col}.{'desc' if desc else 'asc'}" for col, desc in self.orders)
+            params.append(('order', order))
         
         if self.limit_n:
-            query_params += f'&limit={self.limit_n}'
+            params.append(('limit', self.limit_n))
+        
+        if self.offset_n:
+            params.append(('offset', self.offset_n))
         
-        return query_params
+        # Mantener legibles los separadores de PostgREST; '+', '&', espacios, etc. se codifican
+        return urlencode(params, quote_via=quote, safe=_QUERY_SAFE_CHARS)
     
     def rpc(self, fn_name, params=None):
         """Ejecutar una función RPC en Supabase"""
@@ -123,85 +744,257 @@ class SupabaseTable:
         self.rpc_params = params or {}
         return self
 
-    def execute(self):
-        """Ejecutar operación (SELECT, INSERT, UPDATE, DELETE, RPC)"""
-        headers = {
+    def _copy(self):
+        """Copia independiente del builder (filtros y orden incluidos)"""
+        clone = copy.copy(self)
+        clone.filters = list(self.filters)
+        clone.orders = list(self.orders)
+        return clone
+    
+    def iter_rows(self, page_size=1000, key=None):
+        """Recorrer el resultado página a página como generador (memoria acotada).
+
+        Con `key` (columna única y ordenable, normalmente la PK) se usa
+        paginación keyset: cada página filtra `key > último visto`, así el
+        costo por página no crece con el desplazamiento. Sin `key` se pagina
+        con limit/offset sobre el orden de la consulta, que debe ser
+        determinista (agregue la PK como desempate).
+        """
+        pages = self._pages(page_size, key)
+        try:
+            page = next(pages)
+            while True:
+                rows = page.execute().data or []
+                for row in rows:
+                    yield row
+                page = pages.send(rows)
+        except StopIteration:
+            return
+
+    def _pages(self, page_size, key):
+        """Builders de cada página de iter_rows; recibe (send) las filas de la anterior.
+
+        Separado de la ejecución para que el cliente asíncrono pagine igual.
+        """
+        if page_size <= 0:
+            raise ValueError("page_size debe ser mayor que 0")
+        remaining = self.limit_n
+        base = self._copy()
+        base.limit_n = None
+        base.offset_n = None
+        base.single_row = False
+
+        if key is not None:
+            if base.orders and base.orders[0][0] != key:
+                raise ValueError(f"La paginación keyset por '{key}' requiere ordenar primero por '{key}'")
+            desc = base.orders[0][1] if base.orders else False
+            base.orders = [(key, desc)]
+
+        last_key = None
+        offset = self.offset_n or 0
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            page = base._copy()
+            page.limit(size)
+            if key is None:
+                page.offset(offset)
+            elif last_key is not None:
+                (page.lt if desc else page.gt)(key, last_key)
+
+            rows = (yield page) or []
+            if len(rows) < size:
+                return
+            if remaining is not None:
+                remaining -= len(rows)
+            offset += len(rows)
+            if key is not None:
+                last_key = rows[-1][key]
+    
+    def count_only(self, mode='exact'):
+        """Marcar la consulta para que execute() devuelva sólo el total de filas"""
+        if mode not in COUNT_MODES:
+            raise ValueError(f"Modo de conteo inválido: {mode} (use {', '.join(COUNT_MODES)})")
+        self.count_mode = mode
+        return self
+    
+    def count(self, mode='exact'):
+        """Contar las filas que cumplen los filtros sin descargar los registros.
+
+        Usa HEAD con `Prefer: count=<mode>`; PostgREST devuelve el total en
+        Content-Range. 'planned' y 'estimated' evitan el COUNT(*) completo en
+        tablas grandes a cambio de precisión.
+        """
+        return self._copy().count_only(mode).execute().data
+
+    def explain(self, analyze=False):
+        """Plan de ejecución de la consulta (EXPLAIN en JSON) sin traer las filas.
+
+        PostgREST lo devuelve con `Accept: application/vnd.pgrst.plan+json`
+        si tiene db-plan-enabled. Sólo para lecturas y RPC; con analyze=True
+        la consulta se ejecuta de verdad (una RPC de escritura escribe).
+        """
+        method, url, op, kwargs = self._request_spec()
+        if op not in ('select', 'count', 'rpc'):
+            raise ValueError("explain() sólo aplica a consultas de lectura y RPC")
+        # Los conteos se explican como el SELECT con los mismos filtros
+        headers = {k: v for k, v in kwargs['headers'].items() if k != 'Prefer'}
+        options = '; options=analyze' if analyze else ''
+        headers['Accept'] = f'application/vnd.pgrst.plan+json; for="application/json"{options}'
+        response = self._send('GET' if method == 'HEAD' else method, url,
+                              'select' if op == 'count' else op, **{**kwargs, 'headers': headers})
+        if response.status_code >= 400:
+            raise self._http_error(response)
+        return response.json()
+
+    def _request_spec(self):
+        """(método, url, op, kwargs) de la operación definida en el builder"""
+        auth = {
             'apikey': self.key,
             'Authorization': f'Bearer {self.key}',
-            'Content-Type': 'application/json',
-            'Prefer': 'return=representation'  # Forzar retorno de datos en INSERT/UPDATE/DELETE
         }
-        
+        json_headers = {**auth, 'Content-Type': 'application/json'}
+        # Forzar retorno de datos en INSERT/UPDATE/DELETE
+        write_headers = {**json_headers, 'Prefer': 'return=representation'}
+
+        # RPC (No suele necesitar Prefer)
+        if self.rpc_name:
+            return 'POST', f'{self.url}/rest/v1/rpc/{self.rpc_name}', 'rpc', {'json': self.rpc_params, 'headers': json_headers}
+        if self.insert_data and self.upsert_conflict is not None:
+            query = f"?on_conflict={quote(self.upsert_conflict, safe=',')}" if self.upsert_conflict else ''
+            headers = {**write_headers, 'Prefer': 'return=representation,resolution=merge-duplicates'}
+            return 'POST', f'{self.url}/rest/v1/{self.table_name}{query}', 'insert', {'json': self.insert_data, 'headers': headers}
+        if self.insert_data:
+            return 'POST', f'{self.url}/rest/v1/{self.table_name}', 'insert', {'json': self.insert_data, 'headers': write_headers}
+
+        url = f'{self.url}/rest/v1/{self.table_name}?{self._build_query_string()}'
+        if self.delete_flag:
+            return 'DELETE', url, 'delete', {'headers': write_headers}
+        if self.update_data:
+            return 'PATCH', url, 'update', {'json': self.update_data, 'headers': write_headers}
+        if self.count_mode:
+            return 'HEAD', url, 'count', {'headers': {**auth, 'Prefer': f'count={self.count_mode}'}}
+        return 'GET', url, 'select', {'headers': json_headers}
+
+    def _send(self, method, url, op='select', **kwargs):
+        """Enviar la petición aplicando la política de reintentos/hedging/breaker"""
+        return self.client.policy.call(lambda: self._attempt(method, url, op, **kwargs), method)
+
+    def _attempt(self, method, url, op, **kwargs):
+        """Un intento de petición; notifica a los observadores (ledger)"""
+        start = time.perf_counter()
+        response = None
         try:
-            # RPC (No suele necesitar Prefer)
-            if hasattr(self, 'rpc_name') and self.rpc_name:
-                response = requests.post(
-                    f'{self.url}/rest/v1/rpc/{self.rpc_name}',
-                    json=self.rpc_params,
-                    headers={k:v for k,v in headers.items() if k != 'Prefer'},
-                    timeout=10
-                )
-                response.raise_for_status()
-                return SupabaseResponse(response.json())
-
-            # INSERT
-            if self.insert_data:
-                response = requests.post(
-                    f'{self.url}/rest/v1/{self.table_name}',
-                    json=self.insert_data,
-                    headers=headers,
-                    timeout=10
-                )
-                response.raise_for_status()
-                data = response.json()
-                return SupabaseResponse(data if isinstance(data, list) else [data])
-            
-            # DELETE
-            elif self.delete_flag:
-                query_params = self._build_query_string()
-                response = requests.delete(
-                    f'{self.url}/rest/v1/{self.table_name}?{query_params}',
-                    headers=headers,
-                    timeout=10
-                )
-                response.raise_for_status()
-                return SupabaseResponse(response.json())
-            
-            # UPDATE
-            elif self.update_data:
-                query_params = self._build_query_string()
-                response = requests.patch(
-                    f'{self.url}/rest/v1/{self.table_name}?{query_params}',
-                    json=self.update_data,
-                    headers=headers,
-                    timeout=10
-                )
-                response.raise_for_status()
-                return SupabaseResponse(response.json())
-            
-            # SELECT (default)
-            else:
-                query_params = self._build_query_string()
-                response = requests.get(
-                    f'{self.url}/rest/v1/{self.table_name}?{query_params}',
-                    headers={k:v for k,v in headers.items() if k != 'Prefer'},
-                    timeout=10
-                )
-                response.raise_for_status()
-                
-                data = response.json()
-                if isinstance(data, list):
-                    if self.single_row:
-                        return SupabaseResponse(data[0] if data else None)
-                    return SupabaseResponse(data)
-                return SupabaseResponse(data)
-                
-        except requests.exceptions.HTTPError as e:
-            print(f"HTTP Error from Supabase: {e.response.status_code} - {e.response.text}")
-            return SupabaseResponse([] if not self.insert_data and not self.update_data else None)
+            try:
+                response = self.transport.request(method, url, op=op, **kwargs)
+            except requests.exceptions.Timeout as e:
+                raise SupabaseTimeoutError(f"Timeout en {self._target()}: {e}") from e
+            except requests.exceptions.RequestException as e:
+                raise SupabaseConnectionError(f"Error de conexión en {self._target()}: {e}") from e
+            self._raise_transient(response)
+            return response
+        finally:
+            self._record(method, url, op, response, start)
+
+    def _target(self):
+        return self.table_name or f'RPC {self.rpc_name}'
+
+    def _http_error(self, response):
+        return SupabaseHTTPError(response.status_code, getattr(response, 'text', ''), self._target())
+
+    def _raise_transient(self, response):
+        """Convertir 5xx/429/408 en excepción para que la política los reintente"""
+        if response.status_code >= 500 or response.status_code in RETRY_STATUSES:
+            raise self._http_error(response)
+
+    def _record(self, method, url, op, response, start):
+        if not _query_listeners:
+            return
+        _notify_query({
+            'table': self.table_name or f'rpc/{self.rpc_name}',
+            'method': method,
+            'op': op,
+            'query': url.split('?', 1)[1] if '?' in url else '',
+            'status': response.status_code if response is not None else None,
+            'bytes': len(getattr(response, 'content', b'') or b''),
+            'duration_ms': (time.perf_counter() - start) * 1000,
+        })
+
+    def _shape_select(self, data):
+        """Aplicar .single() sobre la lista devuelta por PostgREST"""
+        if isinstance(data, list) and self.single_row:
+            return data[0] if data else None
+        return data
+
+    def _cached(self, op, url):
+        """Respuesta desde el cache de tablas de referencia, o None"""
+        if op != 'select' or not self.client.cache.enabled_for(self.table_name):
+            return None
+        found, data = self.client.cache.get(self.table_name, url.split('?', 1)[1])
+        return SupabaseResponse(self._shape_select(data)) if found else None
+
+    def _cache_generation(self, op):
+        """Generación del cache de la tabla antes de enviar un SELECT cacheable (None si no aplica)"""
+        if op != 'select' or not self.client.cache.enabled_for(self.table_name):
+            return None
+        return self.client.cache.generation(self.table_name)
+
+    def _finish(self, op, url, response, generation=None):
+        """Convertir la respuesta HTTP en SupabaseResponse (común a sync y async)"""
+        if response.status_code >= 400:
+            raise self._http_error(response)
+
+        if op in ('insert', 'update', 'delete'):
+            self.client.cache.invalidate(self.table_name)
+        if op == 'count':
+            return SupabaseResponse(parse_content_range_total(response.headers.get('Content-Range')))
+
+        data = response.json()
+        if op == 'insert':
+            return SupabaseResponse(data if isinstance(data, list) else [data])
+        if op == 'select':
+            if self.client.cache.enabled_for(self.table_name):
+                self.client.cache.set(self.table_name, url.split('?', 1)[1], data, generation)
+            return SupabaseResponse(self._shape_select(data))
+        return SupabaseResponse(data)
+
+    def execute(self):
+        """Ejecutar operación (SELECT, INSERT, UPDATE, DELETE, RPC, conteo).
+
+        Los fallos se lanzan como SupabaseError (HTTP, timeout, conexión o
+        circuit breaker abierto) en lugar de devolver una lista vacía.
+        """
+        method, url, op, kwargs = self._request_spec()
+        try:
+            cached = self._cached(op, url)
+            if cached is not None:
+                return cached
+            generation = self._cache_generation(op)
+            response = self._send(method, url, op=op, **kwargs)
+            return self._finish(op, url, response, generation)
+        except SupabaseError:
+            raise
         except Exception as e:
-            print(f"Error executing query on {self.table_name if hasattr(self, 'table_name') else 'RPC'}: {e}")
-            return SupabaseResponse([] if not self.insert_data and not self.update_data else None)
+            raise SupabaseError(f"Error executing query on {self._target()}: {e}") from e
+
+def prefetch_first_page(rows):
+    """Pedir ya la primera página de un generador perezoso (iter_rows).
+
+    iter_rows no consulta nada hasta la primera iteración; con stream_template
+    eso ocurre cuando la respuesta ya empezó a enviarse. Llamado dentro del
+    try del controlador, un error de la base cae en su fallback en lugar de
+    cortar la página a medias. Devuelve un iterador con las mismas filas.
+    """
+    rows = iter(rows)
+    for first in rows:
+        return itertools.chain([first], rows)
+    return iter(())
+
+def parse_content_range_total(content_range):
+    """Extraer el total de un header Content-Range de PostgREST ('0-24/3573', '*/0')"""
+    if not content_range or '/' not in content_range:
+        return 0
+    total = content_range.rsplit('/', 1)[1]
+    return int(total) if total.isdigit() else 0
 
 class SupabaseResponse:
     """Response wrapper"""
@@ -214,14 +1007,15 @@ def execute_sql(sql: str):
     try:
         headers = {
             'apikey': db['key'],
-            'Authorization': f'Bearer {db['key']}',
+            'Authorization': f"Bearer {db['key']}",
             'Content-Type': 'application/json'
         }
-        response = requests.post(
+        response = db.transport.request(
+            'POST',
             f"{db['url']}/rest/v1/rpc/exec_sql",
+            op='rpc',
             json={'sql_query': sql},
-            headers=headers,
-            timeout=10
+            headers=headers
         )
         return response.status_code == 200
     except Exception as e:
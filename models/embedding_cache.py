@@ -0,0 +1,203 @@
+"""
+Cache de embeddings de consultas delante del proveedor (Cohere).
+
+Los trabajadores repiten las mismas preguntas al chatbot todo el día; cada
+una costaba un round trip a la API de embeddings antes de poder buscar. La
+clave es el texto normalizado (espacios, mayúsculas, Unicode NFC) más el
+modelo y el tipo de entrada, así 'Dosis  del Ibuprofeno' y 'dosis del
+ibuprofeno' comparten vector.
+
+Dos niveles: un LRU acotado en memoria por worker y, si EMBEDDING_CACHE_PATH
+está configurado, un archivo SQLite (modo WAL) compartido por todos los
+workers de la máquina. Los vectores del disco se guardan en float32.
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from config import Config
+
+
+def normalize_text(text):
+    """Texto canónico para la clave: NFC, minúsculas y espacios colapsados"""
+    text = unicodedata.normalize('NFC', str(text or ''))
+    return ' '.join(text.casefold().split())
+
+
+def cache_key(model, input_type, text):
+    """Clave estable (sha256) para el texto ya normalizado"""
+    raw = f'{model}\0{input_type}\0{text}'.encode('utf-8')
+    return hashlib.sha256(raw).hexdigest()
+
+
+class EmbeddingCache:
+    """LRU en memoria + nivel opcional en disco con contadores de aciertos"""
+    def __init__(self, max_entries=1024, path=None, max_disk_entries=50000):
+        self.max_entries = max_entries
+        self.path = path or None
+        self.max_disk_entries = max_disk_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._conn_pid = None
+        self._disk_lock = threading.Lock()
+        self._disk_writes = 0
+        self.memory_hits = self.disk_hits = self.misses = self.disk_errors = 0
+
+    @classmethod
+    def from_config(cls):
+        return cls(
+            max_entries=Config.EMBEDDING_CACHE_SIZE,
+            path=Config.EMBEDDING_CACHE_PATH,
+            max_disk_entries=Config.EMBEDDING_CACHE_DISK_MAX,
+        )
+
+    # --- nivel en memoria ---
+
+    def _remember(self, key, vector):
+        # Llamado con self._lock tomado
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        """Vector cacheado o None (cuenta acierto en memoria, en disco o fallo)"""
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return vector
+        vector = self._disk_get(key)
+        with self._lock:
+            if vector is not None:
+                self.disk_hits += 1
+                self._remember(key, vector)
+            else:
+                self.misses += 1
+        return vector
+
+    def put(self, key, vector):
+        vector = list(vector)
+        with self._lock:
+            self._remember(key, vector)
+        self._disk_put(key, vector)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # --- nivel en disco ---
+
+    def _connection(self):
+        # Llamado con self._disk_lock tomado; una conexión por proceso (no sobrevive a un fork)
+        if self._conn is None or self._conn_pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS query_embedding ('
+                ' key TEXT PRIMARY KEY, vector BLOB NOT NULL, used_at REAL NOT NULL)'
+            )
+            self._conn, self._conn_pid = conn, os.getpid()
+        return self._conn
+
+    def _disk_get(self, key):
+        if not self.path:
+            return None
+        try:
+            with self._disk_lock:
+                conn = self._connection()
+                row = conn.execute('SELECT vector FROM query_embedding WHERE key = ?', (key,)).fetchone()
+                if row is None:
+                    return None
+                conn.execute('UPDATE query_embedding SET used_at = ? WHERE key = ?', (time.time(), key))
+            return array('f', row[0]).tolist()
+        except sqlite3.Error as e:
+            print(f"Error leyendo cache de embeddings en disco: {e}")
+            self.disk_errors += 1
+            return None
+
+    def _disk_put(self, key, vector):
+        if not self.path:
+            return
+        try:
+            with self._disk_lock:
+                conn = self._connection()
+                conn.execute(
+                    'INSERT OR REPLACE INTO query_embedding (key, vector, used_at) VALUES (?, ?, ?)',
+                    (key, array('f', vector).tobytes(), time.time())
+                )
+                self._disk_writes += 1
+                if self._disk_writes % 100 == 0:
+                    self._prune(conn)
+        except sqlite3.Error as e:
+            print(f"Error escribiendo cache de embeddings en disco: {e}")
+            self.disk_errors += 1
+
+    def _prune(self, conn):
+        """Borrar las entradas menos usadas por encima de max_disk_entries"""
+        conn.execute(
+            'DELETE FROM query_embedding WHERE key IN ('
+            ' SELECT key FROM query_embedding ORDER BY used_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_disk_entries,)
+        )
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else None,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'disk': self.path,
+                'disk_errors': self.disk_errors,
+            }
+
+
+class CachedEmbeddings:
+    """Misma interfaz que CohereEmbeddings; embed_query pasa por el cache.
+
+    embed_documents va directo al proveedor: la indexación no repite textos.
+    """
+    def __init__(self, embeddings, cache, model=None):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model = model or getattr(embeddings, 'model', type(embeddings).__name__)
+
+    def embed_query(self, text):
+        text = normalize_text(text)
+        key = cache_key(self.model, 'search_query', text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.put(key, vector)
+        return vector
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    """Cache compartido por todas las peticiones de este proceso/worker"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache.from_config()
+    return _cache
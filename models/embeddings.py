@@ -0,0 +1,132 @@
+"""
+Proveedores de embeddings para el RAG, elegidos con EMBEDDING_PROVIDER.
+
+- 'cohere': embed-multilingual-v3.0 por la API (1024 dimensiones).
+- 'local': proyección por hashing de n-gramas de caracteres calculada con
+  NumPy, sin red. Sirve para correr el RAG offline, en tests y benchmarks,
+  y como base para comparar latencia y recall.
+
+Todos exponen `model`, `dim`, embed_query(text) y embed_documents(texts).
+Los vectores de proveedores distintos no son comparables: el indexador
+guarda el modelo en el hash de contenido, así que al cambiar de proveedor
+la siguiente corrida de scripts/index_rag.py re-embebe todo.
+"""
+import os
+import unicodedata
+from abc import ABC, abstractmethod
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from config import Config
+
+_MASK32 = np.uint64(0xFFFFFFFF)
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+class EmbeddingProvider(ABC):
+    """Interfaz común (compatible con la de LangChain)"""
+    model = None
+    dim = None
+    # False si no hay llamada de red: no vale la pena cachear sus consultas
+    remote = True
+
+    @abstractmethod
+    def embed_query(self, text):
+        """Vector de una consulta"""
+
+    @abstractmethod
+    def embed_documents(self, texts):
+        """Vectores de varios documentos, en el mismo orden"""
+
+
+class CohereEmbeddings(EmbeddingProvider):
+    """Wrapper simple para Cohere compatible con la interfaz de LangChain"""
+    model = 'embed-multilingual-v3.0'
+    dim = 1024
+
+    def __init__(self, api_key):
+        import cohere
+        self.client = cohere.Client(api_key)
+
+    def embed_query(self, text):
+        """Generar embedding para una sola cadena de texto"""
+        response = self.client.embed(
+            texts=[text],
+            model=self.model,
+            input_type='search_query'
+        )
+        return response.embeddings[0]
+
+    def embed_documents(self, texts):
+        """Generar embeddings para una lista de textos"""
+        response = self.client.embed(
+            texts=texts,
+            model=self.model,
+            input_type='search_document'
+        )
+        return response.embeddings
+
+
+def _fold(text):
+    """Minúsculas sin acentos y con espacios colapsados, con bordes de palabra"""
+    text = unicodedata.normalize('NFKD', str(text or '')).casefold()
+    text = ''.join(ch if ch.isalnum() else ' ' for ch in text if not unicodedata.combining(ch))
+    return f" {' '.join(text.split())} "
+
+
+class HashedNgramEmbeddings(EmbeddingProvider):
+    """n-gramas de caracteres (3 a 5 por defecto) proyectados por hashing a `dim` dimensiones.
+
+    Cada n-grama suma +1/-1 (signo del hash) en su posición; las frecuencias
+    se amortiguan con log1p y el vector se normaliza (coseno = producto punto).
+    Tolera errores de tipeo y acentos, pero no sabe de sinónimos.
+    """
+    remote = False
+
+    def __init__(self, dim=1024, ngram_range=(3, 5)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.model = f'local-char-ngram-{ngram_range[0]}{ngram_range[1]}-{dim}'
+        self._powers = np.array([pow(0x01000193, i, 1 << 32) for i in range(ngram_range[1])], dtype=np.uint64)
+
+    def _vector(self, text):
+        codes = np.frombuffer(_fold(text).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+        counts = np.zeros(self.dim, dtype=np.float64)
+        for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+            if len(codes) < n:
+                break
+            # Hash polinomial de cada ventana de n caracteres, mezclado para repartir bits
+            hashes = ((sliding_window_view(codes, n) * self._powers[:n]).sum(axis=1) + np.uint64(n)) & _MASK32
+            hashes = (hashes * _GOLDEN) >> np.uint64(32)
+            signs = np.where(hashes & np.uint64(1), 1.0, -1.0)
+            counts += np.bincount((hashes >> np.uint64(1)) % np.uint64(self.dim), weights=signs, minlength=self.dim)
+        vector = np.sign(counts) * np.log1p(np.abs(counts))
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).astype(np.float32)
+
+    def embed_query(self, text):
+        return self._vector(text).tolist()
+
+    def embed_documents(self, texts):
+        return [self._vector(text).tolist() for text in texts]
+
+
+PROVIDERS = ('cohere', 'local')
+
+
+def get_embeddings(provider=None):
+    """Proveedor configurado (EMBEDDING_PROVIDER); ValueError si falta la API key o no existe"""
+    provider = (provider or Config.EMBEDDING_PROVIDER).lower()
+    if provider == 'local':
+        return HashedNgramEmbeddings(dim=Config.EMBEDDING_DIM)
+    if provider == 'cohere':
+        api_key = os.getenv('COHERE_API_KEY')
+        if not api_key:
+            raise ValueError("COHERE_API_KEY no configurada")
+        return CohereEmbeddings(api_key)
+    raise ValueError(f"Proveedor de embeddings desconocido: {provider} (opciones: {', '.join(PROVIDERS)})")
+
+
+def embeddings_available(provider=None):
+    """True si el proveedor configurado puede usarse (el local siempre)"""
+    provider = (provider or Config.EMBEDDING_PROVIDER).lower()
+    return provider == 'local' or (provider == 'cohere' and bool(os.getenv('COHERE_API_KEY')))
@@ -0,0 +1,209 @@
+"""
+Bus de eventos en proceso para empujar cambios (stock) a los terminales POS.
+
+Los publicadores (ventas, edición de productos, el vigilante del catálogo)
+llaman a publish(); cada conexión SSE tiene su Subscription con un buffer
+acotado. Si un cliente lento llena su buffer se descartan los eventos más
+viejos y se le marca `overflowed` para que pida un resync completo en lugar
+de quedarse con datos incompletos. El bus guarda un historial corto para
+reanudar desde Last-Event-ID tras una reconexión.
+"""
+import time
+import threading
+from collections import deque, namedtuple
+from config import Config
+
+Event = namedtuple('Event', 'id topic data')
+
+
+class Subscription:
+    """Cola acotada de eventos de un tópico para un consumidor"""
+    def __init__(self, bus, topic, maxsize):
+        self.bus = bus
+        self.topic = topic
+        self.maxsize = maxsize
+        self.overflowed = False
+        self.dropped = 0
+        self._events = deque()
+        self._cond = threading.Condition()
+        self.closed = False
+
+    def put(self, event):
+        with self._cond:
+            if len(self._events) >= self.maxsize:
+                self._events.popleft()
+                self.dropped += 1
+                self.overflowed = True
+            self._events.append(event)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Eventos pendientes (todos los acumulados); [] si vence el timeout"""
+        with self._cond:
+            if not self._events and not self.closed:
+                self._cond.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+            return events
+
+    def take_overflow(self):
+        """True (una vez) si se descartaron eventos desde la última consulta"""
+        with self._cond:
+            overflowed, self.overflowed = self.overflowed, False
+            return overflowed
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+        self.bus._unsubscribe(self)
+
+
+class EventBus:
+    def __init__(self, history=500):
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._subscriptions = {}
+        self._listeners = {}
+        self._history = deque(maxlen=history)
+        self.published = 0
+
+    def publish(self, topic, data):
+        """Entregar `data` a los suscriptores y listeners de `topic`; devuelve el id del evento"""
+        with self._lock:
+            event = Event(self._next_id, topic, data)
+            self._next_id += 1
+            self._history.append(event)
+            self.published += 1
+            subscriptions = list(self._subscriptions.get(topic, ()))
+            listeners = list(self._listeners.get(topic, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"Error en listener de eventos '{topic}': {e}")
+        return event.id
+
+    def subscribe(self, topic, maxsize=100, last_event_id=None):
+        """Nueva suscripción; con last_event_id repone lo publicado desde entonces (o marca resync)"""
+        subscription = Subscription(self, topic, maxsize)
+        with self._lock:
+            self._subscriptions.setdefault(topic, set()).add(subscription)
+            if last_event_id is not None:
+                missed = [e for e in self._history if e.topic == topic and e.id > last_event_id]
+                oldest = self._history[0].id if self._history else self._next_id
+                if last_event_id + 1 < oldest:
+                    # El historial ya no cubre la desconexión
+                    subscription.overflowed = True
+                for event in missed:
+                    subscription.put(event)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.get(subscription.topic, set()).discard(subscription)
+
+    def add_listener(self, topic, fn):
+        """Callback síncrono (en el hilo del publicador) para `topic`"""
+        with self._lock:
+            if fn not in self._listeners.setdefault(topic, []):
+                self._listeners[topic].append(fn)
+
+    def remove_listener(self, topic, fn):
+        with self._lock:
+            if fn in self._listeners.get(topic, []):
+                self._listeners[topic].remove(fn)
+
+    def subscriber_count(self, topic):
+        with self._lock:
+            return len(self._subscriptions.get(topic, ()))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'published': self.published,
+                'subscribers': {topic: len(subs) for topic, subs in self._subscriptions.items()},
+                'last_id': self._next_id - 1,
+            }
+
+
+class StockWatcher:
+    """Publica en el bus los cambios de stock hechos por otros workers o fuera de la app.
+
+    Sólo consulta los cambios del catálogo (catalog_sync) mientras haya terminales
+    suscritos; los cambios hechos en este proceso ya se publican al instante.
+    """
+    def __init__(self, bus, db_getter, interval=5.0):
+        self.bus = bus
+        self.db_getter = db_getter
+        self.interval = interval
+        self.cursor = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        if self.interval <= 0:
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='stock-watcher', daemon=True)
+                self._thread.start()
+
+    def poll(self):
+        """Una pasada: publicar las filas con version > cursor"""
+        from models.catalog_sync import catalog_version, changes_since
+        db = self.db_getter()
+        if self.cursor is None:
+            self.cursor = catalog_version(db, 'articulo', lag=Config.CATALOG_SYNC_LAG)
+            return 0
+        published = 0
+        has_more = True
+        while has_more:
+            result = changes_since(db, 'articulo', self.cursor, limit=500, columns='idarticulo, stock, version')
+            deltas = [{'idarticulo': r['idarticulo'], 'stock': r['stock']} for r in result['changes']]
+            deltas += [{'idarticulo': i, 'stock': 0, 'deleted': True} for i in result['deleted']]
+            if deltas:
+                self.bus.publish('stock', deltas)
+                published += len(deltas)
+            self.cursor, has_more = result['cursor'], result['has_more']
+        return published
+
+    def _run(self):
+        while True:
+            if self.bus.subscriber_count('stock'):
+                try:
+                    self.poll()
+                except Exception as e:
+                    print(f"Error vigilando cambios de stock: {e}")
+            else:
+                # Sin terminales: el próximo arranque parte de la versión actual
+                self.cursor = None
+            time.sleep(self.interval)
+
+
+bus = EventBus(history=Config.EVENT_BUS_HISTORY)
+
+
+def publish_stock(deltas):
+    """Publicar cambios de stock [{'idarticulo', 'stock'}, ...] (no falla si está vacío)"""
+    deltas = [{'idarticulo': d['idarticulo'], 'stock': d.get('stock'), **({'deleted': True} if d.get('deleted') else {})}
+              for d in deltas or [] if d.get('idarticulo') is not None]
+    if deltas:
+        bus.publish('stock', deltas)
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def get_stock_watcher():
+    """Vigilante del catálogo de este worker (arranca con el primer terminal suscrito)"""
+    global _watcher
+    if _watcher is None:
+        with _watcher_lock:
+            if _watcher is None:
+                from models.db import get_db
+                _watcher = StockWatcher(bus, get_db, Config.STOCK_STREAM_POLL)
+    return _watcher
@@ -0,0 +1,705 @@
+import os
+import re
+import json
+import math
+import time
+import random
+import sqlite3
+import threading
+from urllib.parse import urlsplit, parse_qsl
+from config import Config
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'schema.sql')
+
+# Timestamp local con el mismo formato que comparan los controladores ('YYYY-MM-DD HH:MM:SS')
+_NOW_SQL = "(strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'))"
+_TABLE_RE = re.compile(r'CREATE TABLE IF NOT EXISTS (\w+)\s*\((.*?)\n\);', re.S | re.I)
+_DEFAULT_RE = re.compile(r"DEFAULT\s+('(?:[^']|'')*'|-?[\d.]+|NOW\(\)|CURRENT_TIMESTAMP|CURRENT_DATE|TRUE|FALSE)", re.I)
+_REFERENCES_RE = re.compile(r'REFERENCES\s+(\w+)\s*\((\w+)\)', re.I)
+_INDEX_RE = re.compile(r'CREATE\s+(UNIQUE\s+)?INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)\s+ON\s+(\w+)\s*'
+                       r'(?:USING\s+(\w+)\s*)?\(([^;]*?)\)\s*(WHERE\s+[^;]+)?;', re.S | re.I)
+_INDEX_COLUMNS_RE = re.compile(r'^\w+(\s+(ASC|DESC))?(\s*,\s*\w+(\s+(ASC|DESC))?)*$', re.I)
+_OPERATORS = {'eq': '=', 'neq': '<>', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<='}
+
+# Triggers de schema.sql reescritos para SQLite (plpgsql no se traduce automáticamente)
+_VENTA_DIARIA_UPSERT = '''INSERT INTO venta_diaria (fecha, idtrabajador, cantidad, total)
+        VALUES (substr({row}.fecha_hora, 1, 10), COALESCE({row}.idtrabajador, 0), {sign}, {sign} * COALESCE({row}.total_venta, 0))
+        ON CONFLICT (fecha, idtrabajador) DO UPDATE
+        SET cantidad = cantidad + excluded.cantidad, total = round(total + excluded.total, 2);'''
+_SQLITE_TRIGGERS = {
+    ('venta', 'venta_diaria'): [
+        f'''CREATE TRIGGER IF NOT EXISTS venta_diaria_insert AFTER INSERT ON venta BEGIN
+        {_VENTA_DIARIA_UPSERT.format(row='NEW', sign=1)}
+    END''',
+        f'''CREATE TRIGGER IF NOT EXISTS venta_diaria_delete AFTER DELETE ON venta BEGIN
+        {_VENTA_DIARIA_UPSERT.format(row='OLD', sign=-1)}
+    END''',
+        f'''CREATE TRIGGER IF NOT EXISTS venta_diaria_update AFTER UPDATE OF fecha_hora, idtrabajador, total_venta ON venta BEGIN
+        {_VENTA_DIARIA_UPSERT.format(row='OLD', sign=-1)}
+        {_VENTA_DIARIA_UPSERT.format(row='NEW', sign=1)}
+    END''',
+    ],
+}
+
+# catalogo_version_seq: AUTOINCREMENT hace de secuencia; last_insert_rowid() es su nextval
+_CATALOG_SEQUENCE = 'CREATE TABLE IF NOT EXISTS catalogo_version_seq (n INTEGER PRIMARY KEY AUTOINCREMENT)'
+_CATALOG_TRIGGERS = '''CREATE TRIGGER IF NOT EXISTS {table}_version_insert AFTER INSERT ON {table} BEGIN
+        INSERT INTO catalogo_version_seq (n) VALUES (NULL);
+        UPDATE {table} SET version = last_insert_rowid() WHERE {pk} = NEW.{pk};
+    END
+    ;;CREATE TRIGGER IF NOT EXISTS {table}_version_update AFTER UPDATE ON {table} WHEN NEW.version IS OLD.version BEGIN
+        INSERT INTO catalogo_version_seq (n) VALUES (NULL);
+        UPDATE {table} SET version = last_insert_rowid(), updated_at = {now} WHERE {pk} = NEW.{pk};
+    END
+    ;;CREATE TRIGGER IF NOT EXISTS {table}_borrado AFTER DELETE ON {table} BEGIN
+        INSERT INTO catalogo_version_seq (n) VALUES (NULL);
+        INSERT INTO catalogo_borrado (tabla, id, version, borrado_en) VALUES ('{table}', OLD.{pk}, last_insert_rowid(), {now})
+        ON CONFLICT (tabla, id) DO UPDATE SET version = excluded.version, borrado_en = excluded.borrado_en;
+    END'''
+for _table, _pk in (('articulo', 'idarticulo'), ('cliente', 'idcliente')):
+    _SQLITE_TRIGGERS[(_table, 'catalogo_borrado')] = [_CATALOG_SEQUENCE] + \
+        _CATALOG_TRIGGERS.format(table=_table, pk=_pk, now=_NOW_SQL).split('\n    ;;')
+
+# documents_version_seq: misma técnica; los borrados dejan lápida en documents_borrado
+_SQLITE_TRIGGERS[('documents', 'documents_borrado')] = [
+    'CREATE TABLE IF NOT EXISTS documents_version_seq (n INTEGER PRIMARY KEY AUTOINCREMENT)',
+    '''CREATE TRIGGER IF NOT EXISTS documents_version_insert AFTER INSERT ON documents BEGIN
+        INSERT INTO documents_version_seq (n) VALUES (NULL);
+        UPDATE documents SET version = last_insert_rowid() WHERE id = NEW.id;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS documents_version_update AFTER UPDATE ON documents WHEN NEW.version IS OLD.version BEGIN
+        INSERT INTO documents_version_seq (n) VALUES (NULL);
+        UPDATE documents SET version = last_insert_rowid(), updated_at = {_NOW_SQL} WHERE id = NEW.id;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS documents_borrado AFTER DELETE ON documents BEGIN
+        INSERT INTO documents_version_seq (n) VALUES (NULL);
+        INSERT INTO documents_borrado (id, version, borrado_en) VALUES (OLD.id, last_insert_rowid(), {_NOW_SQL})
+        ON CONFLICT (id) DO UPDATE SET version = excluded.version, borrado_en = excluded.borrado_en;
+    END''',
+]
+
+
+class LocalBackendError(Exception):
+    """Error con el formato de PostgREST (status HTTP, código y mensaje)"""
+    def __init__(self, status, message, code='PGRST100'):
+        self.status = status
+        self.code = code
+        self.message = message
+        super().__init__(message)
+
+
+class LocalRPCError(LocalBackendError):
+    """Equivalente al RAISE EXCEPTION de una función plpgsql"""
+    def __init__(self, message):
+        super().__init__(400, message, code='P0001')
+
+
+def _sqlite_column(rest):
+    """Traducir el tipo y las restricciones de una columna Postgres a SQLite"""
+    upper = rest.upper()
+    if "NEXTVAL(" in upper:
+        # Columnas de secuencia: las completa un trigger local (ver _SQLITE_TRIGGERS)
+        return 'INTEGER', False
+    if 'IDENTITY' in upper or upper.startswith('SERIAL'):
+        return 'INTEGER PRIMARY KEY AUTOINCREMENT', False
+    base = upper.split()[0]
+    is_json = base.startswith(('JSON', 'VECTOR'))
+    if base.startswith(('BIGINT', 'INT', 'SMALLINT', 'BOOLEAN')):
+        sql_type = 'INTEGER'
+    elif base.startswith(('DECIMAL', 'NUMERIC', 'REAL', 'FLOAT', 'DOUBLE')):
+        sql_type = 'REAL'
+    else:
+        sql_type = 'TEXT'
+
+    parts = [sql_type]
+    if 'PRIMARY KEY' in upper:
+        parts.append('PRIMARY KEY')
+    if 'NOT NULL' in upper:
+        parts.append('NOT NULL')
+    if 'UNIQUE' in upper:
+        parts.append('UNIQUE')
+    default = _DEFAULT_RE.search(rest)
+    if default:
+        value = default.group(1)
+        if value.upper() in ('NOW()', 'CURRENT_TIMESTAMP'):
+            value = _NOW_SQL
+        elif value.upper() == 'CURRENT_DATE':
+            value = "(date('now', 'localtime'))"
+        elif value.upper() in ('TRUE', 'FALSE'):
+            value = '1' if value.upper() == 'TRUE' else '0'
+        parts.append(f'DEFAULT {value}')
+    reference = _REFERENCES_RE.search(rest)
+    if reference:
+        parts.append(f'REFERENCES {reference.group(1)}({reference.group(2)})')
+    return ' '.join(parts), is_json
+
+
+def translate_schema(sql):
+    """Traducir los CREATE TABLE de schema.sql a SQLite.
+
+    Devuelve (ddl, meta) donde meta[tabla] tiene 'columns', 'pk', 'fks'
+    ({columna: (tabla, columna)}) y 'json' (columnas jsonb/vector que se
+    guardan serializadas). Los índices btree sobre columnas (parciales
+    incluidos) se crean igual; funciones, extensiones y los índices
+    gin/ivfflat se ignoran.
+    """
+    ddl, meta = [], {}
+    for table, body in _TABLE_RE.findall(sql):
+        info = {'columns': [], 'pk': None, 'fks': {}, 'json': set()}
+        columns = []
+        for line in body.split('\n'):
+            line = line.split('--', 1)[0].strip().rstrip(',')
+            if line.upper().startswith(('PRIMARY KEY', 'UNIQUE')):
+                # Claves compuestas: la sintaxis es la misma en SQLite
+                columns.append(line)
+                if line.upper().startswith('PRIMARY KEY'):
+                    info['pk'] = line[line.index('(') + 1:line.rindex(')')]
+                continue
+            if not line or line.upper().startswith(('FOREIGN KEY', 'CONSTRAINT', 'CHECK')):
+                continue
+            name, rest = line.split(None, 1)
+            definition, is_json = _sqlite_column(rest)
+            columns.append(f'{name} {definition}')
+            info['columns'].append(name)
+            if 'PRIMARY KEY' in definition:
+                info['pk'] = name
+            if is_json:
+                info['json'].add(name)
+            reference = _REFERENCES_RE.search(rest)
+            if reference:
+                info['fks'][name] = (reference.group(1), reference.group(2))
+        ddl.append(f'CREATE TABLE IF NOT EXISTS {table} (\n    ' + ',\n    '.join(columns) + '\n)')
+        meta[table] = info
+    for unique, name, table, using, columns, where in _INDEX_RE.findall(sql):
+        if table not in meta or (using and using.lower() != 'btree') or not _INDEX_COLUMNS_RE.match(columns.strip()):
+            continue
+        ddl.append(f"CREATE {unique.upper()}INDEX IF NOT EXISTS {name} ON {table} ({columns.strip()}) {where.strip()}".rstrip())
+    return ddl, meta
+
+
+def _split_top_level(expr, sep=','):
+    """Separar por comas fuera de paréntesis y comillas"""
+    parts, depth, quoted, current = [], 0, False, ''
+    for ch in expr:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == '(':
+            depth += 1
+        elif not quoted and ch == ')':
+            depth -= 1
+        if ch == sep and depth == 0 and not quoted:
+            parts.append(current)
+            current = ''
+        else:
+            current += ch
+    if current:
+        parts.append(current)
+    return parts
+
+
+def parse_select(expr):
+    """'*,cliente(nombre),detalle_venta(*,articulo(nombre))' -> árbol de columnas/embeds"""
+    nodes = []
+    for item in _split_top_level(expr or '*'):
+        item = item.strip()
+        if not item:
+            continue
+        alias = None
+        if ':' in item.split('(', 1)[0] and '::' not in item.split('(', 1)[0]:
+            alias, item = item.split(':', 1)
+        if '(' in item:
+            name = item[:item.index('(')].split('!', 1)[0]
+            children = parse_select(item[item.index('(') + 1:item.rindex(')')])
+            nodes.append(('embed', alias or name, name, children))
+        else:
+            name = item.split('::', 1)[0]
+            nodes.append(('col', alias or name, name, None))
+    return nodes
+
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"')
+    return value
+
+
+def _encode(value):
+    """Valores de la API -> SQLite (jsonb y listas se guardan como texto JSON)"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+class LocalResponse:
+    """Respuesta con la interfaz que usa SupabaseTable (status_code, headers, json)"""
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = json.dumps(payload, default=str).encode() if payload is not None else b''
+        self.text = self.content.decode()
+
+    def json(self):
+        return json.loads(self.content) if self.content else None
+
+
+# Funciones RPC implementadas en Python (equivalentes a las de schema.sql)
+_RPCS = {}
+
+def local_rpc(name):
+    """Registrar fn(backend, params) como la RPC `name` de todos los LocalBackend"""
+    def decorator(fn):
+        _RPCS[name] = fn
+        return fn
+    return decorator
+
+
+class LocalBackend:
+    """Sustituto de PostgREST sobre SQLite en proceso, para tests y benchmarks.
+
+    Se usa como transporte de SupabaseClient: recibe las mismas URL que
+    armaría SupabaseTable (filtros, or/not/in/is, order, limit/offset,
+    embeds por FK como `cliente(nombre)` o `detalle_venta(*)`, conteos con
+    HEAD) y devuelve respuestas con el formato de PostgREST. Las RPC se
+    implementan en Python con @local_rpc. `latency_ms` simula el round trip.
+    """
+    def __init__(self, path=':memory:', schema_path=SCHEMA_PATH, latency_ms=0, jitter_ms=0):
+        self.path = path
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.pool_size = 1
+        self.rpcs = dict(_RPCS)
+        self._lock = threading.RLock()
+        self._requests = 0
+
+        with open(schema_path, encoding='utf-8') as f:
+            ddl, self.meta = translate_schema(f.read())
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA case_sensitive_like = ON')
+        with self.conn:
+            for statement in ddl:
+                self.conn.execute(statement)
+            for tables, triggers in _SQLITE_TRIGGERS.items():
+                if all(t in self.meta for t in tables):
+                    for trigger in triggers:
+                        self.conn.execute(trigger)
+
+    @classmethod
+    def from_config(cls):
+        return cls(path=Config.SUPABASE_SQLITE_PATH, latency_ms=Config.SUPABASE_LOCAL_LATENCY_MS)
+
+    def register_rpc(self, name, fn):
+        self.rpcs[name] = fn
+
+    # ---- interfaz de transporte ----
+
+    def request(self, method, url, op='select', **kwargs):
+        """Atender una petición PostgREST (misma firma que HTTPTransport.request)"""
+        with self._lock:
+            self._requests += 1
+        self._simulate_latency()
+        parts = urlsplit(url)
+        path = parts.path.split('/rest/v1/', 1)[-1]
+        params = parse_qsl(parts.query, keep_blank_values=True)
+        headers = kwargs.get('headers') or {}
+        try:
+            with self._lock:
+                if path.startswith('rpc/'):
+                    return self._rpc(path[4:], kwargs.get('json') or {})
+                return self._table_request(method, path, params, headers, kwargs.get('json'))
+        except LocalBackendError as e:
+            return LocalResponse(e.status, {'code': e.code, 'message': e.message, 'details': None, 'hint': None})
+        except sqlite3.IntegrityError as e:
+            return LocalResponse(409, {'code': '23505', 'message': str(e), 'details': None, 'hint': None})
+        except sqlite3.Error as e:
+            return LocalResponse(400, {'code': 'PGRST100', 'message': str(e), 'details': None, 'hint': None})
+
+    def stats(self):
+        with self._lock:
+            return {'requests': self._requests, 'connections_opened': 0,
+                    'connections_reused': self._requests, 'pool_size': self.pool_size}
+
+    def close(self):
+        self.conn.close()
+
+    def _simulate_latency(self):
+        if not self.latency_ms and not self.jitter_ms:
+            return
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    # ---- carga directa (seeds, generadores de datos) ----
+
+    def bulk_insert(self, table, rows, batch_size=1000):
+        """Insertar filas sin pasar por HTTP; devuelve la cantidad insertada"""
+        info = self._table(table)
+        total = 0
+        with self._lock, self.conn:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                cols = [c for c in info['columns'] if any(c in r for r in batch)]
+                sql = f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})"
+                self.conn.executemany(sql, [[_encode(r.get(c)) for c in cols] for r in batch])
+                total += len(batch)
+        return total
+
+    # ---- tablas ----
+
+    def _table(self, name):
+        if name not in self.meta:
+            raise LocalBackendError(404, f'relation "public.{name}" does not exist', code='42P01')
+        return self.meta[name]
+
+    def _column(self, table, col):
+        if col not in self._table(table)['columns']:
+            raise LocalBackendError(400, f'column {table}.{col} does not exist', code='42703')
+        return col
+
+    def _table_request(self, method, table, params, headers, body):
+        info = self._table(table)
+        query = {'select': '*', 'order': None, 'limit': None, 'offset': None, 'on_conflict': None}
+        filters = []
+        for name, value in params:
+            if name in query:
+                query[name] = value
+            else:
+                filters.append((name, value))
+        where, args = self._where(table, filters)
+        prefer = headers.get('Prefer', '')
+
+        if method == 'POST':
+            return self._insert(table, body, query['on_conflict'], prefer)
+        if method == 'PATCH':
+            assignments = ', '.join(f'{self._column(table, c)} = ?' for c in body)
+            with self.conn:
+                rows = self.conn.execute(f'UPDATE {table} SET {assignments} WHERE {where} RETURNING *',
+                                         [_encode(v) for v in body.values()] + args).fetchall()
+            return LocalResponse(200, self._shape(table, rows, parse_select(query['select'])))
+        if method == 'DELETE':
+            with self.conn:
+                rows = self.conn.execute(f'DELETE FROM {table} WHERE {where} RETURNING *', args).fetchall()
+            return LocalResponse(200, self._shape(table, rows, parse_select(query['select'])))
+
+        headers_out = {}
+        count = re.search(r'count=(exact|planned|estimated)', prefer)
+        if count:
+            total = self.conn.execute(f'SELECT COUNT(*) FROM {table} WHERE {where}', args).fetchone()[0]
+            headers_out['Content-Range'] = f'*/{total}'
+        if method == 'HEAD':
+            return LocalResponse(200, None, headers_out)
+
+        sql = f'SELECT * FROM {table} WHERE {where}{self._order_by(table, query["order"])}'
+        if query['limit'] is not None or query['offset'] is not None:
+            sql += f" LIMIT {int(query['limit'] if query['limit'] is not None else -1)} OFFSET {int(query['offset'] or 0)}"
+        if 'vnd.pgrst.plan' in headers.get('Accept', ''):
+            # Los embeds se resuelven con una búsqueda por tabla: también entran al plan
+            embeds = list(self._embed_queries(table, parse_select(query['select'])))
+            return LocalResponse(200, self._plan([(sql, args)] + embeds))
+        rows = self.conn.execute(sql, args).fetchall()
+        data = self._shape(table, rows, parse_select(query['select']))
+        if count:
+            start = int(query['offset'] or 0)
+            headers_out['Content-Range'] = f"{start}-{start + len(data) - 1}/{total}" if data else f'*/{total}'
+        return LocalResponse(200, data, headers_out)
+
+    def _plan(self, statements):
+        """EXPLAIN QUERY PLAN de SQLite con la forma del plan JSON de Postgres"""
+        root = {'Node Type': 'Result', 'Plans': []}
+        for sql, args in statements:
+            self._plan_statement(root, sql, args)
+        return [{'Plan': root}]
+
+    def _plan_statement(self, root, sql, args):
+        nodes = {0: root}
+        for row in self.conn.execute(f'EXPLAIN QUERY PLAN {sql}', args).fetchall():
+            detail = row['detail']
+            scan = re.match(r'(SCAN|SEARCH) (\w+)(?: USING (COVERING )?INDEX (\w+)| USING (INTEGER PRIMARY KEY))?', detail)
+            if scan and (scan.group(1) == 'SEARCH' or scan.group(4)):
+                node = {'Node Type': 'Index Only Scan' if scan.group(3) else 'Index Scan',
+                        'Relation Name': scan.group(2), 'Index Name': scan.group(4) or f'{scan.group(2)}_pkey'}
+            elif scan:
+                node = {'Node Type': 'Seq Scan', 'Relation Name': scan.group(2)}
+            elif detail.startswith('USE TEMP B-TREE'):
+                node = {'Node Type': 'Sort'}
+            else:
+                node = {'Node Type': detail}
+            node['Plans'] = []
+            nodes[row['id']] = node
+            nodes.get(row['parent'], nodes[0])['Plans'].append(node)
+
+    def _insert(self, table, body, on_conflict, prefer):
+        info = self._table(table)
+        rows = body if isinstance(body, list) else [body]
+        if not rows:
+            return LocalResponse(201, [])
+        cols = [self._column(table, c) for c in dict.fromkeys(c for r in rows for c in r)]
+        sql = f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})"
+        if 'resolution=' in prefer:
+            target = [self._column(table, c.strip()) for c in (on_conflict or info['pk']).split(',')]
+            if 'ignore-duplicates' in prefer:
+                sql += f" ON CONFLICT ({', '.join(target)}) DO NOTHING"
+            else:
+                updates = [c for c in cols if c not in target]
+                action = f"DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in updates)}" if updates else 'DO NOTHING'
+                sql += f" ON CONFLICT ({', '.join(target)}) {action}"
+        inserted = []
+        with self.conn:
+            for row in rows:
+                inserted.extend(self.conn.execute(sql + ' RETURNING *', [_encode(row.get(c)) for c in cols]).fetchall())
+        return LocalResponse(201, self._shape(table, inserted, parse_select('*')))
+
+    # ---- filtros ----
+
+    def _where(self, table, filters):
+        clauses, args = [], []
+        for name, value in filters:
+            if name in ('or', 'and'):
+                sql, params = self._logic(table, name, value)
+            elif name in ('not.or', 'not.and'):
+                sql, params = self._logic(table, name[4:], value)
+                sql = f'NOT ({sql})'
+            else:
+                sql, params = self._condition(table, name, value)
+            clauses.append(sql)
+            args.extend(params)
+        return (' AND '.join(clauses) or '1 = 1'), args
+
+    def _logic(self, table, kind, value):
+        """or=(a.eq.1,and(b.gt.2,c.is.null))"""
+        clauses, args = [], []
+        for item in _split_top_level(value.strip()[1:-1]):
+            item = item.strip()
+            negate = item.startswith('not.')
+            if negate:
+                item = item[4:]
+            if item.startswith(('or(', 'and(')):
+                inner_kind, inner = item.split('(', 1)
+                sql, params = self._logic(table, inner_kind, '(' + inner)
+            else:
+                col, expr = item.split('.', 1)
+                sql, params = self._condition(table, col, expr)
+            clauses.append(f'NOT ({sql})' if negate else sql)
+            args.extend(params)
+        return '(' + f' {kind.upper()} '.join(clauses) + ')', args
+
+    def _condition(self, table, col, expr):
+        col = self._column(table, col)
+        negate = expr.startswith('not.')
+        if negate:
+            expr = expr[4:]
+        op, _, value = expr.partition('.')
+        if op in _OPERATORS:
+            sql, args = f'{col} {_OPERATORS[op]} ?', [_unquote(value)]
+        elif op in ('like', 'ilike'):
+            pattern = _unquote(value).replace('*', '%')
+            sql = f'{col} LIKE ?' if op == 'like' else f'lower({col}) LIKE lower(?)'
+            args = [pattern]
+        elif op == 'in':
+            items = [_unquote(v.strip()) for v in _split_top_level(value.strip()[1:-1])]
+            sql, args = f"{col} IN ({', '.join('?' * len(items))})", items
+        elif op == 'is':
+            keyword = value.lower()
+            if keyword == 'null':
+                sql, args = f'{col} IS NULL', []
+            elif keyword in ('true', 'false'):
+                sql, args = f'{col} = ?', [1 if keyword == 'true' else 0]
+            else:
+                raise LocalBackendError(400, f'operador is.{value} no soportado')
+        else:
+            raise LocalBackendError(400, f'operador "{op}" no soportado por el backend local')
+        return (f'NOT ({sql})' if negate else sql), args
+
+    def _order_by(self, table, order):
+        if not order:
+            return ''
+        terms = []
+        for item in order.split(','):
+            parts = item.strip().split('.')
+            col = self._column(table, parts[0])
+            desc = 'desc' in parts[1:]
+            # Igual que Postgres: NULL al final en ASC y al principio en DESC
+            nulls_first = 'nullsfirst' in parts[1:] or (desc and 'nullslast' not in parts[1:])
+            terms.append(f"({col} IS NULL) {'DESC' if nulls_first else 'ASC'}, {col} {'DESC' if desc else 'ASC'}")
+        return ' ORDER BY ' + ', '.join(terms)
+
+    # ---- proyección y embeds ----
+
+    def _decode(self, table, row):
+        json_cols = self.meta[table]['json']
+        return {k: (json.loads(row[k]) if k in json_cols and row[k] is not None else row[k]) for k in row.keys()}
+
+    def _shape(self, table, rows, nodes):
+        """Aplicar el select (columnas y embeds) a las filas crudas de SQLite"""
+        decoded = [self._decode(table, r) for r in rows]
+        out = [{} for _ in rows]
+        for kind, alias, name, children in nodes:
+            if kind == 'col' and name == '*':
+                for target, row in zip(out, decoded):
+                    target.update(row)
+            elif kind == 'col':
+                self._column(table, name)
+                for target, row in zip(out, decoded):
+                    target[alias] = row[name]
+            else:
+                for target, value in zip(out, self._embed(table, decoded, name, children)):
+                    target[alias] = value
+        return out
+
+    def _fetch_sql(self, table, col, n):
+        return f"SELECT * FROM {table} WHERE {col} IN ({', '.join('?' * n)}) ORDER BY {self.meta[table]['pk']}"
+
+    def _fetch_in(self, table, col, keys):
+        """Filas de `table` con `col` en keys, en lotes (un query por lote, no por fila)"""
+        keys = [k for k in dict.fromkeys(keys) if k is not None]
+        rows = []
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows.extend(self.conn.execute(self._fetch_sql(table, col, len(chunk)), chunk).fetchall())
+        return rows
+
+    def _relationship(self, table, name):
+        """(many_to_one, columna de la fila padre, columna buscada en `name`) del embed"""
+        target = self._table(name)
+        info = self.meta[table]
+        many_to_one = [col for col, (ref, _) in info['fks'].items() if ref == name]
+        if many_to_one:
+            fk = many_to_one[0]
+            return True, fk, info['fks'][fk][1]
+        one_to_many = [col for col, (ref, _) in target['fks'].items() if ref == table]
+        if one_to_many:
+            fk = one_to_many[0]
+            return False, target['fks'][fk][1], fk
+        raise LocalBackendError(400, f"Could not find a relationship between '{table}' and '{name}'", code='PGRST200')
+
+    def _embed(self, table, rows, name, children):
+        """Valores del embed `name` para cada fila (objeto si es N:1, lista si es 1:N)"""
+        many_to_one, parent_col, col = self._relationship(table, name)
+        fetched = self._fetch_in(name, col, [r[parent_col] for r in rows])
+        shaped = self._shape(name, fetched, children)
+        if many_to_one:
+            by_key = {raw[col]: value for raw, value in zip(fetched, shaped)}
+            return [by_key.get(r[parent_col]) for r in rows]
+        grouped = {}
+        for raw, value in zip(fetched, shaped):
+            grouped.setdefault(raw[col], []).append(value)
+        return [grouped.get(r[parent_col], []) for r in rows]
+
+    def _embed_queries(self, table, select):
+        """SQL de las búsquedas que hacen los embeds del select, para planearlas"""
+        for kind, _, name, children in select:
+            if kind == 'embed':
+                _, _, col = self._relationship(table, name)
+                yield self._fetch_sql(name, col, 1), [None]
+                yield from self._embed_queries(name, children)
+
+    # ---- RPC ----
+
+    def _rpc(self, name, params):
+        fn = self.rpcs.get(name)
+        if fn is None:
+            raise LocalBackendError(404, f'Could not find the function public.{name}', code='PGRST202')
+        with self.conn:
+            result = fn(self, params)
+        return LocalResponse(200, result)
+
+
+@local_rpc('register_sale')
+def _register_sale(backend, params):
+    """Misma lógica que register_sale en schema.sql, en la transacción de la RPC"""
+    items = params.get('p_items') or []
+    if not items:
+        raise LocalRPCError('No hay items en la venta')
+    conn = backend.conn
+
+    pedido = {}
+    for item in items:
+        pedido[int(item['idarticulo'])] = pedido.get(int(item['idarticulo']), 0) + int(item['cantidad'])
+    ids = sorted(pedido)
+    stocks = dict(conn.execute(
+        f"SELECT idarticulo, stock FROM articulo WHERE idarticulo IN ({', '.join('?' * len(ids))})", ids).fetchall())
+    if len(stocks) != len(ids):
+        raise LocalRPCError('La venta contiene artículos inexistentes')
+    sin_stock = [i for i in ids if (stocks[i] or 0) - pedido[i] < 0]
+    if sin_stock:
+        raise LocalRPCError(f'Stock insuficiente para el artículo {sin_stock[0]}')
+
+    total = round(sum(float(item['subtotal']) for item in items), 2)
+    idventa = conn.execute(
+        "INSERT INTO venta (idcliente, idtrabajador, total_venta, estado) VALUES (?, ?, ?, 'completada')",
+        (params.get('p_idcliente'), params.get('p_idtrabajador'), total)).lastrowid
+    conn.executemany(
+        'INSERT INTO detalle_venta (idventa, idarticulo, cantidad, precio_unitario, subtotal) VALUES (?, ?, ?, ?, ?)',
+        [(idventa, int(i['idarticulo']), int(i['cantidad']), float(i['precio']), float(i['subtotal'])) for i in items])
+    nuevos = [((stocks[i] or 0) - pedido[i], i) for i in ids]
+    conn.executemany('UPDATE articulo SET stock = ? WHERE idarticulo = ?', nuevos)
+    return {'idventa': idventa, 'total_venta': total,
+            'stocks': [{'idarticulo': i, 'stock': stock} for stock, i in nuevos]}
+
+
+@local_rpc('backfill_venta_diaria')
+def _backfill_venta_diaria(backend, params):
+    """Recalcular venta_diaria desde venta (todo o el rango p_desde..p_hasta)"""
+    desde, hasta = params.get('p_desde'), params.get('p_hasta')
+    backend.conn.execute(
+        'DELETE FROM venta_diaria WHERE (? IS NULL OR fecha >= ?) AND (? IS NULL OR fecha <= ?)',
+        (desde, desde, hasta, hasta))
+    cursor = backend.conn.execute(
+        '''INSERT INTO venta_diaria (fecha, idtrabajador, cantidad, total)
+           SELECT substr(fecha_hora, 1, 10), COALESCE(idtrabajador, 0), COUNT(*), round(COALESCE(SUM(total_venta), 0), 2)
+           FROM venta
+           WHERE (? IS NULL OR substr(fecha_hora, 1, 10) >= ?) AND (? IS NULL OR substr(fecha_hora, 1, 10) <= ?)
+           GROUP BY 1, 2''',
+        (desde, desde, hasta, hasta))
+    return cursor.rowcount
+
+
+@local_rpc('sales_report')
+def _sales_report(backend, params):
+    """Mismos agregados que sales_report en schema.sql, leídos de venta_diaria"""
+    rango = ('FROM venta_diaria vd LEFT JOIN trabajador t ON t.idtrabajador = vd.idtrabajador '
+             'WHERE vd.fecha BETWEEN ? AND ? AND vd.cantidad <> 0')
+    args = (params.get('p_desde'), params.get('p_hasta'))
+    cantidad, total = backend.conn.execute(
+        f'SELECT COALESCE(SUM(vd.cantidad), 0), COALESCE(SUM(vd.total), 0) {rango}', args).fetchone()
+    por_dia = backend.conn.execute(
+        f'SELECT vd.fecha, SUM(vd.cantidad) AS cantidad, round(SUM(vd.total), 2) AS total {rango} '
+        'GROUP BY vd.fecha ORDER BY vd.fecha', args).fetchall()
+    por_trabajador = backend.conn.execute(
+        f'SELECT vd.idtrabajador, t.usuario, SUM(vd.cantidad) AS cantidad, round(SUM(vd.total), 2) AS total {rango} '
+        'GROUP BY vd.idtrabajador, t.usuario ORDER BY total DESC', args).fetchall()
+    return {
+        'total_ventas': cantidad,
+        'total_monto': round(total, 2),
+        'ticket_promedio': round(total / cantidad, 2) if cantidad else 0,
+        'por_dia': [dict(row) for row in por_dia],
+        'por_trabajador': [dict(row) for row in por_trabajador],
+    }
+
+
+@local_rpc('search_documents')
+def _search_documents(backend, params):
+    """Búsqueda por similitud coseno (sin índice; suficiente para tests y benchmarks)"""
+    query = params.get('query_embedding') or []
+    threshold = float(params.get('similarity_threshold', 0))
+    query_norm = math.sqrt(sum(x * x for x in query)) or 1.0
+    matches = []
+    for row in backend.conn.execute('SELECT id, content, embedding, metadata FROM documents WHERE embedding IS NOT NULL'):
+        embedding = json.loads(row['embedding'])
+        norm = math.sqrt(sum(x * x for x in embedding)) or 1.0
+        similarity = sum(a * b for a, b in zip(query, embedding)) / (query_norm * norm)
+        if similarity > threshold:
+            metadata = json.loads(row['metadata']) if row['metadata'] else None
+            matches.append({'id': row['id'], 'content': row['content'], 'similarity': similarity, 'metadata': metadata})
+    matches.sort(key=lambda m: m['similarity'], reverse=True)
+    return matches[:int(params.get('match_count', 10))]
+
+
+def create_local_client(path=':memory:', latency_ms=0, jitter_ms=0, **client_kwargs):
+    """SupabaseClient sobre un LocalBackend nuevo (tests, benchmarks, scripts offline)"""
+    from models.db import SupabaseClient, QueryCache
+    backend = LocalBackend(path=path, latency_ms=latency_ms, jitter_ms=jitter_ms)
+    client_kwargs.setdefault('cache', QueryCache())
+    return SupabaseClient('http://local', 'local-key', transport=backend, **client_kwargs)
@@ -0,0 +1,205 @@
+"""
+Índice en memoria de productos para el POS: búsqueda exacta por código de
+barras, typeahead por prefijo sobre nombres sin acentos y ranking top-K.
+
+Cada worker mantiene su propio índice. Se reconstruye desde la base cuando
+pasa PRODUCT_LOOKUP_TTL o cuando este proceso escribe en `articulo` (listener
+de consultas); los cambios de stock del bus de eventos (ventas, otros
+workers) se aplican en el lugar con apply_stocks().
+"""
+import time
+import heapq
+import threading
+import unicodedata
+from config import Config
+from models.db import get_db, add_query_listener
+from models.event_bus import bus
+
+LOOKUP_FIELDS = 'idarticulo, codigo, nombre, stock, precio_venta'
+
+
+def fold(text):
+    """Minúsculas sin acentos ni signos: 'Ibuprofeno 400mg (Caja)' -> 'ibuprofeno 400mg caja'"""
+    text = unicodedata.normalize('NFKD', str(text or '')).lower()
+    text = ''.join(ch if ch.isalnum() else ' ' for ch in text if not unicodedata.combining(ch))
+    return ' '.join(text.split())
+
+
+class _TrieNode:
+    __slots__ = ('children', 'ids')
+
+    def __init__(self):
+        self.children = {}
+        self.ids = set()
+
+
+class ProductLookupIndex:
+    """Índice inmutable: se construye completo y se reemplaza de una vez"""
+    def __init__(self, products):
+        self.products = {}
+        self.by_code = {}
+        self.root = _TrieNode()
+        self._names = {}
+        for product in products:
+            pid = product['idarticulo']
+            self.products[pid] = dict(product)
+            code = str(product.get('codigo') or '').strip().lower()
+            if code:
+                self.by_code[code] = pid
+            name = fold(product.get('nombre'))
+            self._names[pid] = name
+            for word in set(name.split()) | ({fold(code)} if code else set()):
+                self._insert(word, pid)
+        # Orden estable para consultas vacías y desempates
+        self._alphabetical = sorted(self.products, key=lambda pid: (self._names[pid], pid))
+
+    def __len__(self):
+        return len(self.products)
+
+    def _insert(self, word, pid):
+        node = self.root
+        for ch in word:
+            node = node.children.setdefault(ch, _TrieNode())
+            node.ids.add(pid)
+
+    def _prefix(self, prefix):
+        node = self.root
+        for ch in prefix:
+            node = node.children.get(ch)
+            if node is None:
+                return set()
+        return node.ids
+
+    def get_by_code(self, code):
+        """Producto con ese código/código de barras exacto, o None"""
+        pid = self.by_code.get(str(code or '').strip().lower())
+        return self.products.get(pid) if pid is not None else None
+
+    def search(self, query, limit=10, in_stock=True):
+        """Top-`limit` productos para el texto tecleado (código exacto primero)"""
+        available = (lambda p: (p.get('stock') or 0) > 0) if in_stock else (lambda p: True)
+        exact = self.get_by_code(query)
+        tokens = fold(query).split()
+        if not tokens:
+            return [self.products[pid] for pid in self._alphabetical if available(self.products[pid])][:limit]
+
+        # Todos los términos deben ser prefijo de alguna palabra; se intersecta empezando por el más raro
+        sets = sorted((self._prefix(token) for token in tokens), key=len)
+        candidates = set(sets[0])
+        for ids in sets[1:]:
+            candidates &= ids
+            if not candidates:
+                break
+
+        phrase = ' '.join(tokens)
+
+        def rank(pid):
+            name = self._names[pid]
+            return (
+                0 if name.startswith(phrase) else 1 if f' {phrase}' in name else 2,
+                len(name),
+                name,
+                pid,
+            )
+
+        ranked = heapq.nsmallest(limit + 1, (pid for pid in candidates if available(self.products[pid])), key=rank)
+        results = [self.products[pid] for pid in ranked]
+        if exact is not None and available(exact):
+            results = [exact] + [p for p in results if p is not exact]
+        return results[:limit]
+
+    def apply_stocks(self, stocks):
+        """Actualizar el stock tras una venta: [{'idarticulo', 'stock'}, ...]"""
+        for row in stocks or []:
+            product = self.products.get(row.get('idarticulo'))
+            if product is not None:
+                product['stock'] = row['stock']
+
+
+LOOKUP_PAGE_SIZE = 1000
+
+
+def lookup_query(db):
+    """Productos activos con los campos que necesita el POS (sin ejecutar)"""
+    return db.table('articulo').select(LOOKUP_FIELDS).eq('estado', 'activo').order('idarticulo')
+
+
+def load_products(db=None):
+    """Productos activos con los campos que necesita el POS"""
+    return lookup_query(db or get_db()).iter_rows(key='idarticulo', page_size=LOOKUP_PAGE_SIZE)
+
+
+class ProductLookupService:
+    """Índice del worker con recarga por TTL o invalidación (una sola carga a la vez)"""
+    def __init__(self, loader=load_products, ttl=60, clock=time.monotonic):
+        self.loader = loader
+        self.ttl = ttl
+        self.clock = clock
+        self._index = None
+        self._loaded_at = 0.0
+        # Cada invalidación sube la generación; el índice vale mientras coincida con la cargada
+        self._generation = 0
+        self._loaded_generation = -1
+        self._loading = False
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    @classmethod
+    def from_config(cls):
+        return cls(ttl=Config.PRODUCT_LOOKUP_TTL)
+
+    def _stale(self):
+        return (self._index is None or self._loaded_generation != self._generation
+                or self.clock() - self._loaded_at > self.ttl)
+
+    def get_index(self):
+        index = self._index
+        if not self._stale():
+            return index
+        with self._lock:
+            if self._stale():
+                # Lo que se invalide durante la carga sube la generación y fuerza otra recarga
+                generation = self._generation
+                self._loading = True
+                try:
+                    self._index = ProductLookupIndex(self.loader())
+                finally:
+                    self._loading = False
+                self._loaded_generation = generation
+                self._loaded_at = self.clock()
+                self.loads += 1
+            return self._index
+
+    def search(self, query, limit=10):
+        return self.get_index().search(query, limit)
+
+    def invalidate(self):
+        self._generation += 1
+
+    def apply_stocks(self, stocks):
+        if self._loading:
+            # La carga en curso puede haber leído el stock anterior: recargar al terminar
+            self.invalidate()
+        if self._index is not None:
+            self._index.apply_stocks(stocks)
+
+    def on_query(self, record):
+        """Listener de consultas: cualquier escritura en articulo invalida el índice"""
+        if record['table'] == 'articulo' and record['op'] in ('insert', 'update', 'delete'):
+            self.invalidate()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_product_lookup():
+    """Servicio compartido por todas las peticiones de este proceso/worker"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = ProductLookupService.from_config()
+                add_query_listener(_service.on_query)
+                bus.add_listener('stock', lambda event: _service.apply_stocks(event.data))
+    return _service
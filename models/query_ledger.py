@@ -0,0 +1,102 @@
+import re
+from collections import Counter
+from flask import g, request, has_request_context, current_app
+from models.db import add_query_listener
+from config import Config
+
+# Parámetros de PostgREST que definen la forma de la consulta (no son valores)
+_SHAPE_KEYS = ('select', 'order', 'limit', 'offset', 'on_conflict', 'columns')
+
+
+class NPlusOneError(AssertionError):
+    """Una petición repitió la misma forma de consulta más veces de lo permitido"""
+    pass
+
+
+def query_shape(record):
+    """Forma de la consulta sin valores: 'GET articulo?select=stock&idarticulo=eq.?'"""
+    parts = []
+    for pair in record['query'].split('&') if record['query'] else []:
+        name, _, value = pair.partition('=')
+        if name not in _SHAPE_KEYS:
+            # Conservar el operador (eq, in, not.eq, ...) y ocultar el valor
+            value = re.sub(r'^((?:not\.)?[a-z]+)\..*$', r'\1.?', value)
+        parts.append(f'{name}={value}')
+    return f"{record['method']} {record['table']}?{'&'.join(parts)}"
+
+
+class QueryLedger:
+    """Registro de las consultas a PostgREST hechas durante una petición Flask.
+
+    Las páginas que iter_rows() pide mientras se emite una respuesta en
+    streaming llegan después de after_request y no quedan registradas.
+    """
+    def __init__(self):
+        self.records = []
+
+    def add(self, record):
+        self.records.append(record)
+
+    @property
+    def count(self):
+        return len(self.records)
+
+    @property
+    def total_ms(self):
+        return sum(r['duration_ms'] for r in self.records)
+
+    @property
+    def total_bytes(self):
+        return sum(r['bytes'] for r in self.records)
+
+    def repeated_shapes(self, threshold):
+        """Formas de consulta ejecutadas más de `threshold` veces (sospechosas de N+1)"""
+        counts = Counter(query_shape(r) for r in self.records)
+        return {shape: n for shape, n in counts.items() if n > threshold}
+
+    def server_timing(self):
+        """Valor del header Server-Timing con los totales de la petición"""
+        return f'db;dur={self.total_ms:.1f};desc="{self.count} queries, {self.total_bytes} B"'
+
+
+def get_ledger():
+    """Ledger de la petición actual (None fuera de una petición)"""
+    if has_request_context():
+        return g.get('_query_ledger')
+    return None
+
+
+def _record_query(record):
+    ledger = get_ledger()
+    if ledger is not None:
+        ledger.add(record)
+
+
+def init_app(app):
+    """Activar el ledger por petición, el detector N+1 y el header Server-Timing"""
+    app.config.setdefault('QUERY_LEDGER_ENABLED', Config.QUERY_LEDGER_ENABLED)
+    app.config.setdefault('QUERY_LEDGER_N1_THRESHOLD', Config.QUERY_LEDGER_N1_THRESHOLD)
+    app.config.setdefault('QUERY_LEDGER_STRICT', Config.QUERY_LEDGER_STRICT)
+    add_query_listener(_record_query)
+
+    @app.before_request
+    def _start_ledger():
+        if current_app.config['QUERY_LEDGER_ENABLED']:
+            g._query_ledger = QueryLedger()
+
+    @app.after_request
+    def _finish_ledger(response):
+        ledger = g.pop('_query_ledger', None)
+        if ledger is None:
+            return response
+
+        response.headers['Server-Timing'] = ledger.server_timing()
+
+        repeated = ledger.repeated_shapes(current_app.config['QUERY_LEDGER_N1_THRESHOLD'])
+        for shape, n in repeated.items():
+            message = f"Posible N+1 en {request.endpoint or request.path}: {n}x {shape}"
+            if current_app.config['QUERY_LEDGER_STRICT']:
+                raise NPlusOneError(message)
+            current_app.logger.warning(message)
+        return response
+
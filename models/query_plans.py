@@ -0,0 +1,71 @@
+"""
+Chequeo de planes de ejecución para las consultas calientes.
+
+hot_queries() reproduce las formas de consulta que arman los controladores
+(mismos filtros y orden, valores de ejemplo); las que viven en los modelos se
+piden a sus propios builders para que la lista no quede desactualizada. check_query_plans() pide el
+plan de cada una con SupabaseTable.explain() y reporta los Seq Scan sobre
+tablas con más de `min_rows` filas (conteo 'planned', sin COUNT(*)).
+"""
+from datetime import datetime, timedelta
+from models.catalog_sync import change_queries
+from models.product_lookup import lookup_query, LOOKUP_PAGE_SIZE
+from models.sale_service import invoice_query
+
+
+def hot_queries(db, today=None):
+    """Consultas filtradas de los controladores: nombre -> builder sin ejecutar"""
+    today = today or datetime.now().strftime('%Y-%m-%d')
+    week_ago = (datetime.strptime(today, '%Y-%m-%d') - timedelta(days=6)).strftime('%Y-%m-%d')
+    in_30_days = (datetime.strptime(today, '%Y-%m-%d') + timedelta(days=30)).strftime('%Y-%m-%d')
+    catalog_rows, catalog_deleted = change_queries(db, 'articulo', since=0)
+    return {
+        'sales.lookup productos': lookup_query(db).limit(LOOKUP_PAGE_SIZE),
+        'catalog changes filas': catalog_rows,
+        'catalog changes borrados': catalog_deleted,
+        'dashboard stock bajo': db.table('articulo').lte('stock', 10).count_only(),
+        'dashboard venta_diaria': db.table('venta_diaria').select('fecha, cantidad, total').gte('fecha', week_ago),
+        'reports.sales detalle': db.table('venta').select(
+            '*, cliente(nombre, apellidos), trabajador(usuario)'
+        ).gte('fecha_hora', f'{week_ago} 00:00:00').lte('fecha_hora', f'{today} 23:59:59')
+         .order('fecha_hora', desc=True).order('idventa', desc=True).limit(50),
+        'reports.inventory stock bajo': db.table('articulo').lt('stock', 10).count_only(),
+        'reports.inventory sin stock': db.table('articulo').eq('stock', 0).count_only(),
+        'sales.invoice venta': invoice_query(db, 1),
+        'chatbot vencidos': db.table('articulo').select('nombre').lt('fecha_vencimiento', today)
+            .eq('estado', 'activo').order('fecha_vencimiento').limit(3),
+        'rag próximos a vencer': db.table('articulo').select('nombre, fecha_vencimiento')
+            .gte('fecha_vencimiento', today).lte('fecha_vencimiento', in_30_days)
+            .eq('estado', 'activo').order('fecha_vencimiento').limit(3),
+        'cliente por nombre': db.table('cliente').select('idcliente, nombre, apellidos').ilike('nombre', '*juan*').limit(10),
+    }
+
+
+def iter_plan_nodes(plan):
+    """Recorrer todos los nodos de un plan EXPLAIN (FORMAT JSON)"""
+    if isinstance(plan, list):
+        for item in plan:
+            yield from iter_plan_nodes(item)
+        return
+    node = plan.get('Plan', plan)
+    yield node
+    for child in node.get('Plans', []):
+        yield from iter_plan_nodes(child)
+
+
+def seq_scans(plan):
+    """Tablas recorridas con Seq Scan en el plan"""
+    return [n['Relation Name'] for n in iter_plan_nodes(plan) if n.get('Node Type') == 'Seq Scan']
+
+
+def check_query_plans(db, min_rows=1000, queries=None):
+    """Seq Scans sobre tablas grandes: lista de {'query', 'table', 'rows'}"""
+    queries = queries if queries is not None else hot_queries(db)
+    sizes, problems = {}, []
+    for name, query in queries.items():
+        for table in seq_scans(query.explain()):
+            if table not in sizes:
+                sizes[table] = db.table(table).count('planned')
+            if sizes[table] > min_rows:
+                problems.append({'query': name, 'table': table, 'rows': sizes[table]})
+    return problems
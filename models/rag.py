@@ -1,8 +1,14 @@
-import os
 from models.db import get_db
+from models.venta_diaria import day_totals
+from models.embedding_cache import CachedEmbeddings, get_embedding_cache
+from models.embeddings import CohereEmbeddings, get_embeddings
+from models.vector_index import get_vector_store, matches
 from config import Config
 import json
 
+# Similitud mínima para usar un documento como contexto
+SIMILARITY_THRESHOLD = 0.4  # Umbral bajo para mejorar el recall
+
 # Intentar importaciones opcionales de LangChain; si no están disponibles,
 # marcamos que RAG no está disponible pero no rompemos la importación del módulo.
 try:
@@ -22,47 +28,23 @@ except Exception:
     RetrievalQA = None
     LANGCHAIN_AVAILABLE = False
 
-class CohereEmbeddings:
-    """Wrapper simple para Cohere compatible con la interfaz de LangChain"""
-    def __init__(self, api_key):
-        import cohere
-        self.client = cohere.Client(api_key)
-        
-    def embed_query(self, text):
-        """Generar embedding para una sola cadena de texto"""
-        response = self.client.embed(
-            texts=[text],
-            model='embed-multilingual-v3.0',
-            input_type='search_query'
-        )
-        return response.embeddings[0]
-        
-    def embed_documents(self, texts):
-        """Generar embeddings para una lista de textos"""
-        response = self.client.embed(
-            texts=texts,
-            model='embed-multilingual-v3.0',
-            input_type='search_document'
-        )
-        return response.embeddings
-
 class RAGManager:
     def __init__(self):
         # Nota: Ya no dependemos estrictamente de LangChain para la inferencia básica
         # pero mantenemos la estructura por si se reactiva el uso de cadenas complejas.
         
-        self.cohere_key = os.getenv('COHERE_API_KEY')
-        if not self.cohere_key:
-            # Fallback para desarrollo o si no está configurado
-            print("⚠️ COHERE_API_KEY no encontrada, RAG no funcionará correctamente")
-            
+        # Proveedor según EMBEDDING_PROVIDER ('cohere' o 'local', sin red)
         try:
-            self.embeddings = CohereEmbeddings(self.cohere_key)
+            provider = get_embeddings()
+            # Las preguntas repetidas no vuelven a llamar a la API
+            self.embeddings = CachedEmbeddings(provider, get_embedding_cache()) if provider.remote else provider
         except Exception as e:
-            print(f"Error inicializando Cohere: {e}")
+            print(f"⚠️ Embeddings no disponibles, RAG no funcionará correctamente: {e}")
             self.embeddings = None
 
         self.db = get_db()
+        # Índice vectorial local del worker (None = búsqueda con la RPC search_documents)
+        self.vector_store = get_vector_store() if Config.RAG_LOCAL_INDEX else None
         self.knowledge_base_path = "docs/knowledge_base"
     
     def index_documents(self):
@@ -87,23 +69,25 @@ class RAGManager:
             )
             split_docs = splitter.split_documents(docs)
             
-            # Generar embeddings
+            # Generar embeddings (upsert por fuente y posición: reindexar no duplica)
             for i, doc in enumerate(split_docs):
                 try:
                     if not self.embeddings:
                         raise ValueError("Embeddings no inicializados")
                         
-                    embedding_vector = self.embeddings.embed_query(doc.page_content)
+                    embedding_vector = self.embeddings.embed_documents([doc.page_content])[0]
+                    source = doc.metadata.get('source', 'unknown')
                     
                     # Guardar en Supabase
-                    self.db.table('documents').insert({
+                    self.db.table('documents').upsert({
+                        'source_key': f'kb:{source}:{i}',
                         'content': doc.page_content,
                         'embedding': embedding_vector,
                         'metadata': {
-                            'source': doc.metadata.get('source', 'unknown'),
+                            'source': source,
                             'page': i
                         }
-                    }).execute()
+                    }, on_conflict='source_key').execute()
                     
                     if (i + 1) % 10 == 0:
                         print(f"✓ Indexados {i + 1}/{len(split_docs)} documentos")
@@ -119,8 +103,8 @@ class RAGManager:
             print(f"Error en indexación: {e}")
             return False
     
-    def search_relevant_docs(self, query, top_k=3):
-        """Búsqueda vectorial de documentos relevantes"""
+    def search_relevant_docs(self, query, top_k=3, where=None):
+        """Búsqueda vectorial de documentos relevantes (`where`: filtro por igualdad sobre metadata)"""
         try:
             if not self.embeddings:
                  print("⚠️ Embeddings no inicializados")
@@ -128,18 +112,25 @@ class RAGManager:
 
             # Generar embedding de la consulta
             query_embedding = self.embeddings.embed_query(query)
-            
+
+            if self.vector_store is not None:
+                return self.vector_store.search(query_embedding, top_k, SIMILARITY_THRESHOLD, where)
+
             # Búsqueda en Supabase con pgvector
             results = self.db.rpc(
                 'search_documents',
                 {
                     'query_embedding': query_embedding,
-                    'similarity_threshold': 0.4,  # Lower threshold to improve recall
+                    'similarity_threshold': SIMILARITY_THRESHOLD,
                     'match_count': top_k
                 }
             ).execute()
-            
-            return results.data if results.data else []
+
+            docs = results.data if results.data else []
+            if where:
+                # La RPC no filtra por metadata: se filtra sobre el top-k devuelto
+                docs = [d for d in docs if matches(d.get('metadata'), where)]
+            return docs
             
         except Exception as e:
             print(f"Error en búsqueda vectorial: {e}")
@@ -169,7 +160,7 @@ class RAGManager:
                         context += f"- {p['nombre']}: {p['stock']} un., Bs. {p['precio_venta']} (Vence: {venc})\n"
             
             # Alertas Críticas (Stock < 5)
-            bajo_stock = self.db.table('articulo').select('nombre, stock').lt('stock', 5).eq('estado', 'activo').execute()
+            bajo_stock = self.db.table('articulo').select('nombre, stock').lt('stock', 5).eq('estado', 'activo').order('stock').limit(3).execute()
             if bajo_stock.data:
                 context += f"\n⚠️ ALERTA STOCK CRÍTICO:\n"
                 for p in bajo_stock.data[:3]:
@@ -178,7 +169,7 @@ class RAGManager:
             # Próximos a vencer (30 días)
             proximos_vencer = self.db.table('articulo').select(
                 'nombre, fecha_vencimiento'
-            ).gte('fecha_vencimiento', hoy_str).lte('fecha_vencimiento', en_30_dias).eq('estado', 'activo').execute()
+            ).gte('fecha_vencimiento', hoy_str).lte('fecha_vencimiento', en_30_dias).eq('estado', 'activo').order('fecha_vencimiento').limit(3).execute()
             
             if proximos_vencer.data:
                 context += f"\n🟡 PRÓXIMOS A VENCER (30 días):\n"
@@ -187,15 +178,12 @@ class RAGManager:
             
             # Información de ventas si es consulta de ventas
             if any(word in query_lower for word in ['venta', 'vendido', 'total', 'cuanto']):
-                ventas = self.db.table('venta').select('total_venta').gte(
-                    'fecha_hora', hoy_str
-                ).execute()
+                cantidad, total = day_totals(self.db, hoy_str)
                 
-                if ventas.data:
-                    total = sum(float(v['total_venta']) for v in ventas.data)
+                if cantidad:
                     context += f"\n💰 VENTAS DE HOY:\n"
                     context += f"- Total: Bs. {total:.2f}\n"
-                    context += f"- Transacciones: {len(ventas.data)}\n"
+                    context += f"- Transacciones: {cantidad}\n"
             
         except Exception as e:
             print(f"Error obteniendo contexto de BD en RAG: {e}")
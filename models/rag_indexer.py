@@ -0,0 +1,304 @@
+"""
+Indexador incremental de la tabla documents para el RAG.
+
+Cada documento tiene una clave estable (source_key: 'articulo:12',
+'categoria:3', ...) y el sha256 de su contenido. En cada corrida se arman
+los documentos desde la base, se comparan los hashes con los guardados y
+sólo los nuevos o modificados se embeben, en lotes del tamaño máximo del
+proveedor y en paralelo bajo un limitador de tasa adaptativo. Cada lote se
+guarda con upsert apenas termina, así una corrida interrumpida retoma donde
+quedó. Los documentos cuyo origen ya no existe se borran.
+"""
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import Config
+
+DOCUMENT_FIELDS = 'id, source_key, content_hash'
+PRODUCT_FIELDS = ('idarticulo, nombre, descripcion, stock, precio_venta, fecha_vencimiento, estado, '
+                  'categoria(nombre), presentacion(nombre)')
+
+
+# --- documentos por origen ---
+
+def _product_document(p):
+    cat = (p.get('categoria') or {}).get('nombre') or 'General'
+    pres = (p.get('presentacion') or {}).get('nombre') or 'Unidad'
+    content = (
+        f"PRODUCTO: {p['nombre']}\n"
+        f"CATEGORÍA: {cat}\n"
+        f"PRESENTACIÓN: {pres}\n"
+        f"DESCRIPCIÓN: {p.get('descripcion') or 'Sin descripción'}\n"
+        f"PRECIO: {p['precio_venta']} Bs\n"
+        f"STOCK ACTUAL: {p['stock']}\n"
+        f"VENCIMIENTO: {p.get('fecha_vencimiento') or 'N/A'}"
+    )
+    return {
+        'source_key': f"articulo:{p['idarticulo']}",
+        'content': content,
+        'metadata': {'source': 'articulo', 'tipo': 'producto', 'id': p['idarticulo'], 'nombre': p['nombre']},
+    }
+
+
+def product_documents(db, ids=None):
+    """Productos activos (todos, o sólo los de `ids`)"""
+    query = db.table('articulo').select(PRODUCT_FIELDS).eq('estado', 'activo')
+    if ids is not None:
+        query = query.in_('idarticulo', sorted(ids))
+    for p in query.order('idarticulo').iter_rows(page_size=500, key='idarticulo'):
+        yield _product_document(p)
+
+
+def category_documents(db, ids=None):
+    query = db.table('categoria').select('idcategoria, nombre, descripcion')
+    if ids is not None:
+        query = query.in_('idcategoria', sorted(ids))
+    for cat in query.order('idcategoria').iter_rows(key='idcategoria'):
+        nombre = cat.get('nombre') or 'Sin nombre'
+        yield {
+            'source_key': f"categoria:{cat['idcategoria']}",
+            'content': (f"Categoría Farmacéutica: {nombre}\n"
+                        f"Descripción: {cat.get('descripcion') or 'Sin descripción'}\n"
+                        f"Tipo: Clasificación de productos"),
+            'metadata': {'source': 'categoria', 'tipo': 'categoria', 'id': cat['idcategoria'], 'nombre': nombre},
+        }
+
+
+def supplier_documents(db, ids=None):
+    query = db.table('proveedor').select('idproveedor, nombre, contacto, telefono')
+    if ids is not None:
+        query = query.in_('idproveedor', sorted(ids))
+    for p in query.order('idproveedor').iter_rows(key='idproveedor'):
+        nombre = p.get('nombre') or 'Sin nombre'
+        yield {
+            'source_key': f"proveedor:{p['idproveedor']}",
+            'content': (f"Proveedor: {nombre}\n"
+                        f"Contacto: {p.get('contacto') or ''}\n"
+                        f"Teléfono: {p.get('telefono') or ''}\n"
+                        f"Tipo: Proveedor de medicamentos"),
+            'metadata': {'source': 'proveedor', 'tipo': 'proveedor', 'id': p['idproveedor'], 'nombre': nombre},
+        }
+
+
+def client_documents(db, ids=None, limit=50):
+    """Clientes (los primeros `limit`, o los de `ids`)"""
+    query = db.table('cliente').select('idcliente, nombre, apellidos, telefono, email')
+    if ids is not None:
+        query = query.in_('idcliente', sorted(ids))
+    else:
+        query = query.limit(limit)
+    for c in query.order('idcliente').iter_rows(key='idcliente'):
+        nombre = ' '.join(filter(None, [c.get('nombre'), c.get('apellidos')])) or 'Sin nombre'
+        yield {
+            'source_key': f"cliente:{c['idcliente']}",
+            'content': (f"Cliente: {nombre}\n"
+                        f"Teléfono: {c.get('telefono') or ''}\n"
+                        f"Email: {c.get('email') or ''}\n"
+                        f"Tipo: Cliente registrado"),
+            'metadata': {'source': 'cliente', 'tipo': 'cliente', 'id': c['idcliente'], 'nombre': nombre},
+        }
+
+
+# Origen -> generador de documentos; el nombre es el prefijo de source_key
+SOURCES = {
+    'articulo': product_documents,
+    'categoria': category_documents,
+    'proveedor': supplier_documents,
+    'cliente': client_documents,
+}
+
+
+def content_hash(document, model):
+    """sha256 de modelo + contenido + metadata: cambiar de modelo obliga a re-embeber"""
+    raw = json.dumps([model, document['content'], document.get('metadata')], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+# --- limitador de tasa ---
+
+def is_rate_limited(exc):
+    """429 / rate limit del proveedor de embeddings"""
+    status = getattr(exc, 'status_code', None) or getattr(getattr(exc, 'response', None), 'status_code', None)
+    return status == 429 or 'rate limit' in str(exc).lower() or 'too many requests' in str(exc).lower()
+
+
+class AdaptiveRateLimiter:
+    """Llamadas por segundo con AIMD: sube de a poco con cada éxito y se reduce a la mitad ante un 429"""
+    def __init__(self, rate=2.0, max_rate=20.0, min_rate=0.2, step=0.5, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.step = step
+        self.clock = clock
+        self.sleep = sleep
+        self._next = 0.0
+        self._lock = threading.Lock()
+        self.throttled = 0
+
+    @classmethod
+    def from_config(cls):
+        return cls(rate=Config.RAG_EMBED_RATE, max_rate=Config.RAG_EMBED_RATE_MAX)
+
+    def acquire(self):
+        """Esperar el turno de la próxima llamada"""
+        with self._lock:
+            now = self.clock()
+            slot = max(now, self._next)
+            self._next = slot + 1.0 / self.rate
+        if slot > now:
+            self.sleep(slot - now)
+
+    def success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.step / self.rate)
+
+    def throttle(self):
+        """El proveedor rechazó por tasa: bajar a la mitad y dejar pasar un intervalo"""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._next = max(self._next, self.clock()) + 1.0 / self.rate
+            self.throttled += 1
+
+
+# --- indexador ---
+
+class RAGIndexer:
+    def __init__(self, db, embeddings, batch_size=90, concurrency=4, limiter=None, retries=5, model=None):
+        self.db = db
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.limiter = limiter or AdaptiveRateLimiter()
+        self.retries = retries
+        self.model = model or getattr(embeddings, 'model', type(embeddings).__name__)
+
+    @classmethod
+    def from_config(cls, db, embeddings):
+        return cls(db, embeddings, batch_size=Config.RAG_INDEX_BATCH_SIZE,
+                   concurrency=Config.RAG_INDEX_CONCURRENCY, limiter=AdaptiveRateLimiter.from_config())
+
+    def existing_hashes(self, prefixes=None):
+        """({source_key: content_hash}, ids sin clave) de lo ya indexado para esos orígenes"""
+        hashes, legacy = {}, []
+        rows = self.db.table('documents').select(DOCUMENT_FIELDS).order('id').iter_rows(page_size=1000, key='id')
+        for row in rows:
+            key = row['source_key']
+            if not key:
+                legacy.append(row['id'])
+            elif prefixes is None or key.split(':', 1)[0] in prefixes:
+                hashes[key] = row['content_hash']
+        return hashes, legacy
+
+    def hashes_for(self, keys, chunk=200):
+        """{source_key: content_hash} de esas claves"""
+        keys, hashes = sorted(keys), {}
+        for i in range(0, len(keys), chunk):
+            rows = self.db.table('documents').select('source_key, content_hash') \
+                .in_('source_key', keys[i:i + chunk]).execute().data or []
+            hashes.update({row['source_key']: row['content_hash'] for row in rows})
+        return hashes
+
+    def _embed_batch(self, batch):
+        """Embeber un lote respetando el limitador; reintenta los 429"""
+        texts = [doc['content'] for doc in batch]
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            try:
+                vectors = self.embeddings.embed_documents(texts)
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == self.retries:
+                    raise
+                self.limiter.throttle()
+                continue
+            self.limiter.success()
+            return vectors
+
+    def _index_batch(self, batch):
+        vectors = self._embed_batch(batch)
+        self.db.table('documents').upsert([
+            {'source_key': doc['source_key'], 'content': doc['content'], 'content_hash': doc['content_hash'],
+             'metadata': doc.get('metadata'), 'embedding': list(vector)}
+            for doc, vector in zip(batch, vectors)
+        ], on_conflict='source_key').execute()
+        return len(batch)
+
+    def pending(self, documents, existing):
+        """Documentos nuevos o con hash distinto al guardado (les asigna content_hash)"""
+        changed = []
+        for doc in documents:
+            doc['content_hash'] = content_hash(doc, self.model)
+            if existing.get(doc['source_key']) != doc['content_hash']:
+                changed.append(doc)
+        return changed
+
+    def upsert_batches(self, documents):
+        """Embeber y guardar en lotes concurrentes: (guardados, lotes fallidos)"""
+        batches = [documents[i:i + self.batch_size] for i in range(0, len(documents), self.batch_size)]
+        saved, failed = 0, 0
+        with ThreadPoolExecutor(max_workers=max(1, self.concurrency)) as pool:
+            futures = [pool.submit(self._index_batch, batch) for batch in batches]
+            for future in as_completed(futures):
+                try:
+                    saved += future.result()
+                except Exception as e:
+                    print(f"Error indexando lote de documentos: {e}")
+                    failed += 1
+        return saved, failed
+
+    def delete_keys(self, keys, chunk=200):
+        keys = sorted(keys)
+        for i in range(0, len(keys), chunk):
+            self.db.table('documents').delete().in_('source_key', keys[i:i + chunk]).execute()
+        return len(keys)
+
+    def refresh(self, source, ids):
+        """Reindexar sólo esos ids de un origen (los que ya no existen se borran)"""
+        keys = {f'{source}:{i}' for i in ids}
+        documents = list(SOURCES[source](self.db, ids=ids))
+        existing = self.hashes_for(keys)
+        embedded, failed = self.upsert_batches(self.pending(documents, existing))
+        if failed:
+            raise RuntimeError(f"{failed} lotes de '{source}' no se pudieron indexar")
+        deleted = self.delete_keys(set(existing) - {doc['source_key'] for doc in documents})
+        return {'documents': len(documents), 'embedded': embedded, 'deleted': deleted}
+
+    def run(self, sources=None, prune=True, prune_legacy=False, dry_run=False):
+        """Sincronizar documents con los orígenes pedidos; devuelve contadores"""
+        sources = list(sources or SOURCES)
+        unknown = [s for s in sources if s not in SOURCES]
+        if unknown:
+            raise ValueError(f"Orígenes desconocidos: {', '.join(unknown)}")
+        existing, legacy = self.existing_hashes(sources)
+        documents = {}
+        for source in sources:
+            for doc in SOURCES[source](self.db):
+                documents[doc['source_key']] = doc
+        orphans = set(existing) - set(documents) if prune else set()
+
+        changed = self.pending(documents.values(), existing)
+        stats = {'documents': len(documents), 'unchanged': len(documents) - len(changed),
+                 'embedded': 0, 'failed_batches': 0, 'deleted': 0, 'legacy_deleted': 0}
+        if dry_run:
+            return {**stats, 'pending': len(changed), 'orphans': len(orphans), 'legacy': len(legacy)}
+
+        stats['embedded'], stats['failed_batches'] = self.upsert_batches(changed)
+        stats['deleted'] = self.delete_keys(orphans)
+        if prune_legacy and legacy:
+            for i in range(0, len(legacy), 200):
+                self.db.table('documents').delete().in_('id', legacy[i:i + 200]).execute()
+            stats['legacy_deleted'] = len(legacy)
+        return stats
+
+
+def build_indexer(db=None, embeddings=None):
+    """Indexador con el proveedor de embeddings (EMBEDDING_PROVIDER) y la configuración de la app"""
+    from models.db import get_db
+    from models.embeddings import get_embeddings
+    return RAGIndexer.from_config(db or get_db(), embeddings or get_embeddings())
+
+
+def run_indexer(sources=None, db=None, embeddings=None, **options):
+    """Corrida completa sobre los orígenes pedidos; usado por los scripts"""
+    return build_indexer(db, embeddings).run(sources, **options)
@@ -0,0 +1,170 @@
+"""
+Cola de refresco del RAG alimentada por las escrituras de productos y ventas.
+
+Los documentos de productos incluyen stock y precio, que cambian con cada
+venta y cada edición. Los caminos de escritura ya publican el tópico 'stock'
+del bus de eventos (ventas, products, products_api); la cola escucha ese
+tópico, junta los idarticulo sucios y un hilo los reindexa en lotes cuando
+pasan RAG_REFRESH_DEBOUNCE segundos sin cambios nuevos (o RAG_REFRESH_MAX_DELAY
+desde el cambio más viejo, para que una racha de ventas no lo posponga
+siempre). El hash de contenido evita re-embeber lo que no cambió, así que
+varios workers encolando el mismo producto no duplican trabajo.
+"""
+import time
+import threading
+from config import Config
+from models.event_bus import bus
+
+
+class RAGRefreshQueue:
+    """Ids sucios con debounce; run_once() reindexa un lote coalescido"""
+    def __init__(self, refresher, debounce=5.0, max_delay=60.0, batch_size=90, clock=time.monotonic):
+        self.refresher = refresher
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.batch_size = batch_size
+        self.clock = clock
+        self._pending = {}
+        self._last_change = 0.0
+        self._retry_at = 0.0
+        self._failures = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self.marked = self.flushed = self.embedded = self.batches = self.errors = 0
+        self.last_lag_s = self.max_lag_s = None
+
+    @classmethod
+    def from_config(cls, refresher):
+        return cls(refresher, debounce=Config.RAG_REFRESH_DEBOUNCE, max_delay=Config.RAG_REFRESH_MAX_DELAY,
+                   batch_size=Config.RAG_INDEX_BATCH_SIZE)
+
+    def mark(self, ids):
+        """Encolar idarticulo modificados (se guarda la hora del primer cambio para medir el lag)"""
+        now = self.clock()
+        with self._cond:
+            for pid in ids:
+                self._pending.setdefault(pid, now)
+                self.marked += 1
+            self._last_change = now
+            self._cond.notify()
+
+    def on_stock_event(self, event):
+        """Listener del bus: cada delta de stock marca su producto"""
+        self.mark([d['idarticulo'] for d in event.data])
+
+    def _due_in(self):
+        # Llamado con self._cond tomado; segundos hasta que toque procesar (None = nada pendiente)
+        if not self._pending:
+            return None
+        now = self.clock()
+        due = min(self._last_change + self.debounce, min(self._pending.values()) + self.max_delay)
+        return max(due, self._retry_at) - now
+
+    def run_once(self, force=False):
+        """Reindexar un lote si ya toca (o siempre, con force); devuelve cuántos ids procesó"""
+        with self._cond:
+            due_in = self._due_in()
+            if due_in is None or (due_in > 0 and not force):
+                return 0
+            oldest = sorted(self._pending, key=self._pending.get)[:self.batch_size]
+            batch = {pid: self._pending.pop(pid) for pid in oldest}
+        try:
+            result = self.refresher(sorted(batch))
+        except Exception as e:
+            print(f"Error refrescando documentos del RAG: {e}")
+            with self._cond:
+                for pid, since in batch.items():
+                    self._pending[pid] = min(since, self._pending.get(pid, since))
+                self._failures += 1
+                self._retry_at = self.clock() + min(300, self.debounce * 2 ** self._failures)
+                self.errors += 1
+            return 0
+        lag = self.clock() - min(batch.values())
+        with self._cond:
+            self._failures = 0
+            self._retry_at = 0.0
+            self.flushed += len(batch)
+            self.embedded += (result or {}).get('embedded', 0)
+            self.batches += 1
+            self.last_lag_s = round(lag, 3)
+            self.max_lag_s = max(self.max_lag_s or 0, self.last_lag_s)
+        return len(batch)
+
+    def drain(self):
+        """Procesar todo lo pendiente sin esperar el debounce"""
+        while self.run_once(force=True):
+            pass
+
+    def ensure_started(self):
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='rag-refresh', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                due_in = self._due_in()
+                while due_in is None or due_in > 0:
+                    self._cond.wait(due_in)
+                    due_in = self._due_in()
+            self.run_once()
+
+    def stats(self):
+        with self._cond:
+            now = self.clock()
+            return {
+                'pending': len(self._pending),
+                'oldest_pending_s': round(now - min(self._pending.values()), 3) if self._pending else None,
+                'marked': self.marked,
+                'flushed': self.flushed,
+                'embedded': self.embedded,
+                'batches': self.batches,
+                'errors': self.errors,
+                'last_lag_s': self.last_lag_s,
+                'max_lag_s': self.max_lag_s,
+            }
+
+
+_indexer = None
+
+
+def refresh_products(ids):
+    """Reindexar los documentos de esos productos con el indexador incremental"""
+    global _indexer
+    if _indexer is None:
+        from models.rag_indexer import build_indexer
+        _indexer = build_indexer()
+    result = _indexer.refresh('articulo', ids)
+    if Config.RAG_LOCAL_INDEX:
+        from models.vector_index import get_vector_store
+        get_vector_store().invalidate()
+    return result
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def _on_stock(event):
+    _queue.on_stock_event(event)
+    # El hilo arranca con el primer cambio (también en cada worker tras el fork)
+    _queue.ensure_started()
+
+
+def get_rag_refresh_queue():
+    """Cola de este proceso/worker (None si no está habilitada)"""
+    return _queue
+
+
+def init_rag_refresh():
+    """Registrar la cola en el bus si está habilitada y hay proveedor de embeddings"""
+    global _queue
+    from models.embeddings import embeddings_available
+    if not Config.RAG_REFRESH_ENABLED or not embeddings_available():
+        return None
+    with _queue_lock:
+        if _queue is None:
+            _queue = RAGRefreshQueue.from_config(refresh_products)
+            bus.add_listener('stock', _on_stock)
+    return _queue
@@ -0,0 +1,63 @@
+from models.db import get_db, SupabaseHTTPError
+from models.dashboard_stats import invalidate_dashboard_stats
+from models.event_bus import publish_stock
+
+# Cabecera y detalle de una venta en un solo round trip (embedding de detalle_venta)
+INVOICE_FIELDS = '*, cliente(nombre, apellidos, telefono), trabajador(usuario), detalle_venta(*, articulo(nombre, codigo))'
+
+
+def invoice_query(db, idventa):
+    """Venta con cliente, vendedor y detalle para el recibo (sin ejecutar)"""
+    return db.table('venta').select(INVOICE_FIELDS).eq('idventa', idventa)
+
+
+class SaleError(Exception):
+    """Error de negocio al registrar una venta"""
+    pass
+
+
+class SaleService:
+    """Registro de ventas en una sola transacción mediante la RPC register_sale.
+
+    La cabecera, el detalle y el descuento de stock (con bloqueo de filas) se
+    confirman del lado de Postgres en un único round trip, en lugar de las
+    3N+1 llamadas secuenciales que hacía el controlador.
+    """
+    def __init__(self, db=None):
+        self.db = db or get_db()
+
+    @staticmethod
+    def normalize_items(items):
+        """Dejar sólo los campos que espera la RPC, con sus tipos"""
+        normalized = []
+        for item in items:
+            normalized.append({
+                'idarticulo': int(item['idarticulo']),
+                'cantidad': int(item['cantidad']),
+                'precio': float(item['precio']),
+                'subtotal': float(item['subtotal'])
+            })
+        return normalized
+
+    def register(self, items, idcliente=None, idtrabajador=None):
+        """Registrar la venta y devolver {'idventa', 'total_venta', 'stocks'}"""
+        if not items:
+            raise SaleError('No hay items en la venta')
+
+        params = {
+            'p_items': self.normalize_items(items),
+            'p_idcliente': int(idcliente) if idcliente else None,
+            'p_idtrabajador': int(idtrabajador) if idtrabajador else None
+        }
+        try:
+            result = self.db.rpc('register_sale', params).execute().data
+        except SupabaseHTTPError as e:
+            if e.transient:
+                raise
+            # Stock insuficiente / artículo inexistente: RAISE EXCEPTION de la RPC
+            raise SaleError(e.message) from e
+        if not result or not result.get('idventa'):
+            raise SaleError('No se pudo registrar la venta')
+        invalidate_dashboard_stats()
+        publish_stock(result.get('stocks'))
+        return result
@@ -0,0 +1,327 @@
+"""
+Índice vectorial en proceso que replica la tabla documents.
+
+search_documents filtra por `1 - (embedding <=> q) > umbral`, lo que impide
+usar el índice ivfflat: la base recorre todas las filas en cada pregunta.
+El corpus (productos, categorías, extras) cabe en memoria, así que con
+RAG_LOCAL_INDEX cada worker guarda los embeddings normalizados en una matriz
+NumPy (float32, o int8 con una escala por fila) y resuelve el top-k coseno
+con un producto matriz-vector.
+
+La matriz se refresca de forma incremental: filas y lápidas
+(documents_borrado) con version > cursor, ambas de documents_version_seq
+(ver migration_documents_version.sql); nunca se recorre la tabla entera.
+Como en el catálogo (models/catalog_sync.py), las versiones se toman al
+escribir y pueden confirmarse fuera de orden: todo lo visible se aplica,
+pero el cursor sólo avanza sobre lo escrito hace más de RAG_INDEX_SYNC_LAG. Con RAG_INDEX_PATH el índice se guarda como snapshot .npy y
+los workers lo abren con mmap al arrancar, compartiendo las páginas.
+"""
+import os
+import json
+import time
+import shutil
+import threading
+import numpy as np
+from config import Config
+
+INDEX_DTYPES = ('float32', 'int8')
+SNAPSHOT_FILE = 'index.json'
+
+
+def parse_embedding(value):
+    """PostgREST devuelve vector como texto '[0.1,...]'; el backend local como lista"""
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+
+def matches(metadata, where):
+    """Filtro por igualdad sobre metadata; una lista/tupla/conjunto acepta cualquiera de sus valores"""
+    metadata = metadata or {}
+    for key, expected in (where or {}).items():
+        value = metadata.get(key)
+        if isinstance(expected, (list, tuple, set, frozenset)):
+            if value not in expected:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+def _encode(vectors, dtype):
+    """Normalizar filas (coseno = producto punto) y cuantizar si es int8"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1, norms)
+    if dtype == 'float32':
+        return vectors, None
+    scales = np.abs(vectors).max(axis=1) / 127
+    scales[scales == 0] = 1
+    return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+
+class VectorIndex:
+    """Índice inmutable: apply() devuelve uno nuevo y se reemplaza de una vez"""
+    def __init__(self, ids, matrix, scales, contents, metadata, version=0, dtype='float32'):
+        if dtype not in INDEX_DTYPES:
+            raise ValueError(f"dtype no soportado: {dtype}")
+        self.ids = ids
+        self.matrix = matrix
+        self.scales = scales
+        self.contents = contents
+        self.metadata = metadata
+        self.version = version
+        self.dtype = dtype
+        self._masks = {}
+
+    @classmethod
+    def empty(cls, dtype='float32'):
+        return cls(np.zeros(0, dtype=np.int64), None, None, [], [], 0, dtype)
+
+    @classmethod
+    def from_rows(cls, rows, dtype='float32', version=0):
+        return cls.empty(dtype).apply(rows, version=version)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def dim(self):
+        return self.matrix.shape[1] if self.matrix is not None else None
+
+    def apply(self, rows, deleted_ids=(), version=None):
+        """Nuevo índice con `rows` insertadas/reemplazadas y `deleted_ids` quitados"""
+        rows = [r for r in rows if r.get('embedding') is not None]
+        removed = {int(i) for i in deleted_ids} | {int(r['id']) for r in rows}
+        keep = ~np.isin(self.ids, list(removed)) if removed else np.ones(len(self.ids), dtype=bool)
+        version = max([version or 0, self.version] + [r.get('version') or 0 for r in rows])
+
+        ids = self.ids[keep]
+        contents = [c for c, k in zip(self.contents, keep) if k]
+        metadata = [m for m, k in zip(self.metadata, keep) if k]
+        matrix = self.matrix[keep] if self.matrix is not None else None
+        scales = self.scales[keep] if self.scales is not None else None
+        if rows:
+            new_matrix, new_scales = _encode([parse_embedding(r['embedding']) for r in rows], self.dtype)
+            if matrix is not None and matrix.shape[1] != new_matrix.shape[1]:
+                raise ValueError(f"Dimensión {new_matrix.shape[1]} distinta a la del índice ({matrix.shape[1]})")
+            ids = np.concatenate([ids, np.array([r['id'] for r in rows], dtype=np.int64)])
+            matrix = new_matrix if matrix is None else np.concatenate([matrix, new_matrix])
+            if new_scales is not None:
+                scales = new_scales if scales is None else np.concatenate([scales, new_scales])
+            contents += [r.get('content') for r in rows]
+            metadata += [r.get('metadata') for r in rows]
+        if not len(ids):
+            matrix = scales = None
+        return VectorIndex(ids, matrix, scales, contents, metadata, version, self.dtype)
+
+    def _mask(self, where):
+        key = json.dumps(where, sort_keys=True, default=sorted)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = np.fromiter((matches(m, where) for m in self.metadata), dtype=bool, count=len(self.metadata))
+            self._masks[key] = mask
+        return mask
+
+    def search(self, query, top_k=3, threshold=0.0, where=None):
+        """Top-k por similitud coseno: [{'id', 'content', 'similarity', 'metadata'}] como search_documents"""
+        if self.matrix is None or top_k <= 0:
+            return []
+        query = np.asarray(query, dtype=np.float32)
+        if query.shape[0] != self.dim:
+            raise ValueError(f"Dimensión de la consulta {query.shape[0]} distinta a la del índice ({self.dim})")
+        query = query / (np.linalg.norm(query) or 1)
+        scores = self.matrix @ query
+        if self.scales is not None:
+            scores = scores * self.scales
+        if where:
+            scores = np.where(self._mask(where), scores, -np.inf)
+        k = min(top_k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [
+            {'id': int(self.ids[i]), 'content': self.contents[i], 'similarity': float(scores[i]),
+             'metadata': self.metadata[i]}
+            for i in best if scores[i] > threshold
+        ]
+
+    def save(self, path):
+        """Escribir el snapshot en su propio subdirectorio de `path` e index.json (reemplazado atómicamente).
+
+        Se conservan el snapshot nuevo y el que index.json apuntaba antes (otro
+        worker puede estar abriéndolo); los anteriores se borran. Quien ya los
+        tenga abiertos con mmap los sigue leyendo.
+        """
+        os.makedirs(path, exist_ok=True)
+        directory = f'snapshot-{self.version}-{os.getpid()}-{time.time_ns()}'
+        os.makedirs(os.path.join(path, directory))
+        files = {}
+        for name, array in (('ids', self.ids), ('matrix', self.matrix), ('scales', self.scales)):
+            if array is not None:
+                files[name] = f'{directory}/{name}.npy'
+                np.save(os.path.join(path, files[name]), np.ascontiguousarray(array))
+        previous = _snapshot_directory(path)
+        tmp = os.path.join(path, f'{SNAPSHOT_FILE}.{os.getpid()}.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.version, 'dtype': self.dtype, 'directory': directory, 'files': files,
+                       'contents': self.contents, 'metadata': self.metadata}, f)
+        os.replace(tmp, os.path.join(path, SNAPSHOT_FILE))
+        keep = {directory, previous}
+        for entry in os.listdir(path):
+            if entry.startswith('snapshot-') and entry not in keep:
+                shutil.rmtree(os.path.join(path, entry), ignore_errors=True)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Abrir un snapshot; None si no existe o está incompleto/corrupto (se reconstruye desde la base)"""
+        try:
+            with open(os.path.join(path, SNAPSHOT_FILE), encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Snapshot del índice vectorial ilegible, se reconstruye desde la base: {e}")
+            return None
+        try:
+            arrays = {name: np.load(os.path.join(path, filename), mmap_mode='r' if mmap else None)
+                      for name, filename in snapshot['files'].items()}
+            index = cls(arrays.get('ids', np.zeros(0, dtype=np.int64)), arrays.get('matrix'), arrays.get('scales'),
+                        snapshot['contents'], snapshot['metadata'], snapshot['version'], snapshot['dtype'])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Snapshot del índice vectorial inválido, se reconstruye desde la base: {e}")
+            return None
+        rows = len(index.ids)
+        if (len(index.contents) != rows or len(index.metadata) != rows
+                or (index.matrix is not None and index.matrix.shape[0] != rows)
+                or (index.scales is not None and index.scales.shape[0] != rows)):
+            print("Snapshot del índice vectorial inconsistente, se reconstruye desde la base")
+            return None
+        return index
+
+
+def _snapshot_directory(path):
+    """Subdirectorio al que apunta el index.json actual (None si no hay o no se puede leer)"""
+    try:
+        with open(os.path.join(path, SNAPSHOT_FILE), encoding='utf-8') as f:
+            return json.load(f).get('directory')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class LocalVectorStore:
+    """Índice del worker: snapshot al arrancar y refresco incremental cada `refresh_interval` segundos"""
+    def __init__(self, db_getter, dtype='float32', path=None, refresh_interval=60, lag=0, clock=time.monotonic):
+        self.db_getter = db_getter
+        self.dtype = dtype
+        self.path = path or None
+        self.refresh_interval = refresh_interval
+        self.lag = lag
+        self.clock = clock
+        self._index = None
+        self._refreshed_at = 0.0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.refreshes = 0
+        self.rows_applied = 0
+        self.from_snapshot = False
+        self.last_refresh_ms = None
+
+    @classmethod
+    def from_config(cls):
+        from models.db import get_db
+        return cls(get_db, dtype=Config.RAG_INDEX_DTYPE, path=Config.RAG_INDEX_PATH,
+                   refresh_interval=Config.RAG_INDEX_REFRESH, lag=Config.RAG_INDEX_SYNC_LAG)
+
+    def _due(self):
+        return self._index is None or self._dirty or self.clock() - self._refreshed_at > self.refresh_interval
+
+    def get_index(self):
+        if not self._due():
+            return self._index
+        with self._lock:
+            if self._due():
+                self._refresh()
+            return self._index
+
+    def _refresh(self):
+        # Llamado con self._lock tomado
+        started = time.perf_counter()
+        if self._index is None:
+            snapshot = VectorIndex.load(self.path) if self.path else None
+            if snapshot is not None and snapshot.dtype == self.dtype:
+                self._index, self.from_snapshot = snapshot, True
+            else:
+                self._index = VectorIndex.empty(self.dtype)
+        self._dirty = False
+        index = self._index
+        db = self.db_getter()
+        rows = list(db.table('documents').select('id, content, embedding, metadata, version, updated_at')
+                    .gt('version', index.version).order('version').iter_rows(page_size=500, key='version'))
+        tombstones = list(db.table('documents_borrado').select('id, version, borrado_en')
+                          .gt('version', index.version).order('version').iter_rows(page_size=500, key='version'))
+        cursor = self._stable_cursor(index.version, rows, tombstones)
+        deleted = {t['id'] for t in tombstones}
+        # Los ids no se reutilizan: una fila con lápida ya no existe aunque se haya editado antes
+        rows = [r for r in rows if r['id'] not in deleted]
+        if rows or deleted:
+            # Lo posterior al cursor se vuelve a pedir (y a aplicar, es idempotente) en el próximo refresco
+            self._index = index.apply(rows, deleted)
+            self._index.version = cursor
+            self.rows_applied += len(rows) + len(deleted)
+            if self.path:
+                try:
+                    self._index.save(self.path)
+                except OSError as e:
+                    print(f"Error guardando snapshot del índice vectorial: {e}")
+        self._refreshed_at = self.clock()
+        self.refreshes += 1
+        self.last_refresh_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    def _stable_cursor(self, since, rows, tombstones):
+        """Última versión del prefijo (en orden de versión) escrito hace más de `lag` segundos"""
+        from models.catalog_sync import _cutoff, _is_stable
+        events = sorted([(r['version'], r.get('updated_at')) for r in rows] +
+                        [(t['version'], t.get('borrado_en')) for t in tombstones])
+        if not self.lag:
+            return events[-1][0] if events else since
+        cutoff = _cutoff(self.lag)
+        cursor = since
+        for version, stamp in events:
+            if not _is_stable(stamp, cutoff):
+                # Puede haber versiones menores todavía sin confirmar
+                break
+            cursor = version
+        return cursor
+
+    def search(self, query_embedding, top_k=3, threshold=0.0, where=None):
+        return self.get_index().search(query_embedding, top_k, threshold, where)
+
+    def invalidate(self):
+        """La próxima búsqueda trae los cambios de documents sin esperar el intervalo"""
+        self._dirty = True
+
+    def stats(self):
+        index = self._index
+        return {
+            'documents': len(index) if index is not None else 0,
+            'dtype': self.dtype,
+            'version': index.version if index is not None else None,
+            'refreshes': self.refreshes,
+            'rows_applied': self.rows_applied,
+            'from_snapshot': self.from_snapshot,
+            'last_refresh_ms': self.last_refresh_ms,
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_vector_store():
+    """Índice compartido por todas las peticiones de este proceso/worker"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = LocalVectorStore.from_config()
+    return _store
@@ -0,0 +1,37 @@
+"""
+Lectura del resumen diario de ventas (tabla venta_diaria).
+
+La tabla la mantiene el trigger venta_diaria_sync en cada INSERT, UPDATE o
+DELETE de venta (ver database/migration_venta_diaria.sql), así que los totales
+del dashboard y del chatbot salen de unas pocas filas por día en lugar de
+recorrer todas las ventas del período.
+"""
+
+
+def rollup_query(db, desde, hasta=None):
+    """Consulta (sin ejecutar) de las filas de venta_diaria entre dos fechas 'YYYY-MM-DD'"""
+    query = db.table('venta_diaria').select('fecha, cantidad, total').gte('fecha', desde)
+    if hasta:
+        query = query.lte('fecha', hasta)
+    return query
+
+
+def totals_by_day(rows):
+    """Agrupar las filas (una por trabajador) en {fecha: {'cantidad', 'total'}}"""
+    days = {}
+    for row in rows or []:
+        day = days.setdefault(str(row['fecha'])[:10], {'cantidad': 0, 'total': 0.0})
+        day['cantidad'] += int(row.get('cantidad') or 0)
+        day['total'] += float(row.get('total') or 0)
+    return days
+
+
+def day_totals(db, fecha):
+    """(cantidad, total) de ventas de un día"""
+    day = totals_by_day(rollup_query(db, fecha, fecha).execute().data).get(fecha)
+    return (day['cantidad'], day['total']) if day else (0, 0.0)
+
+
+def backfill(db, desde=None, hasta=None):
+    """Reconstruir el resumen desde venta (todo o el rango indicado); devuelve las filas escritas"""
+    return db.rpc('backfill_venta_diaria', {'p_desde': desde, 'p_hasta': hasta}).execute().data
@@ -0,0 +1,37 @@
+"""
+Script para reconstruir el resumen diario de ventas (venta_diaria) desde la
+tabla venta. Ejecutar una vez tras aplicar migration_venta_diaria.sql, o sobre
+un rango si se corrigieron ventas a mano con el trigger desactivado:
+
+    python scripts/backfill_venta_diaria.py
+    python scripts/backfill_venta_diaria.py --desde 2026-01-01 --hasta 2026-01-31
+"""
+import os
+import sys
+import argparse
+# Fix para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from models.db import get_db
+from models.venta_diaria import backfill
+
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--desde', help='fecha inicial YYYY-MM-DD (por defecto, todo el historial)')
+    parser.add_argument('--hasta', help='fecha final YYYY-MM-DD, inclusive')
+    args = parser.parse_args()
+
+    try:
+        filas = backfill(get_db(), args.desde, args.hasta)
+        print(f"✅ venta_diaria reconstruida: {filas} filas")
+    except Exception as e:
+        print(f"❌ Error reconstruyendo venta_diaria: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
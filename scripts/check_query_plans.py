@@ -0,0 +1,54 @@
+"""
+Script para verificar que las consultas calientes usan índices.
+
+Pide a PostgREST el plan (EXPLAIN) de cada forma de consulta de los
+controladores y sale con código 1 si alguna hace Seq Scan sobre una tabla
+con más de --min-rows filas. Requiere db-plan-enabled en PostgREST (ver
+database/migration_indexes.sql). Con SUPABASE_BACKEND=sqlite usa el plan
+de SQLite sobre los índices btree de schema.sql.
+
+    python scripts/check_query_plans.py --min-rows 1000
+"""
+import os
+import sys
+import argparse
+# Fix para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from models.db import get_db
+from models.query_plans import hot_queries, check_query_plans, iter_plan_nodes
+
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--min-rows', type=int, default=1000, help='tamaño de tabla a partir del cual un Seq Scan falla')
+    parser.add_argument('--verbose', action='store_true', help='imprimir los nodos del plan de cada consulta')
+    args = parser.parse_args()
+
+    db = get_db()
+    queries = hot_queries(db)
+    if args.verbose:
+        for name, query in queries.items():
+            nodes = [f"{n['Node Type']}({n.get('Index Name') or n.get('Relation Name', '')})"
+                     for n in iter_plan_nodes(query.explain()) if 'Relation Name' in n]
+            print(f"  {name}: {', '.join(nodes) or '-'}")
+
+    try:
+        problems = check_query_plans(db, args.min_rows, queries)
+    except Exception as e:
+        print(f"❌ No se pudo obtener el plan: {e}")
+        sys.exit(2)
+
+    if not problems:
+        print(f"✅ {len(queries)} consultas sin Seq Scan sobre tablas de más de {args.min_rows} filas")
+        return
+    for p in problems:
+        print(f"❌ {p['query']}: Seq Scan sobre {p['table']} ({p['rows']} filas)")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""
+Generador de datos sintéticos a escala de producción para el esquema de
+database/schema.sql (trabajador, categoria, presentacion, cliente,
+articulo, venta, detalle_venta).
+
+Distribuciones:
+  - ventas repartidas en --days días con horario de farmacia (picos a media
+    mañana y a la tarde), más movimiento el sábado, menos el domingo y una
+    tendencia de crecimiento; idventa crece con fecha_hora
+  - popularidad de productos tipo Zipf (pocos productos concentran ventas)
+  - carritos de 1 a 15 líneas (media ~2.5), ~30% a "Cliente General"
+  - vencimientos: mayoría a 6-36 meses, ~5% en los próximos 30 días,
+    ~3% ya vencidos y algunos sin fecha
+
+Destinos:
+  csv     archivos CSV por tabla + load.sql con \\copy y reajuste de identidades
+  sqlite  archivo SQLite del backend local (models/local_backend.py)
+  db      inserciones por lotes a través de get_db() (Supabase o backend local)
+
+    python scripts/generate_dataset.py --target csv --out data/prod --ventas 5000000
+    python scripts/generate_dataset.py --target sqlite --out data/prod.sqlite --scale 0.01
+"""
+import os
+import sys
+import csv
+import json
+import random
+import bisect
+import argparse
+from datetime import datetime, timedelta
+# Fix para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash
+
+# Volúmenes de referencia (producción)
+DEFAULT_COUNTS = {'trabajadores': 25, 'articulos': 50000, 'clientes': 200000, 'ventas': 5000000}
+
+# Orden de carga (padres antes que hijos)
+TABLES = ['trabajador', 'categoria', 'presentacion', 'cliente', 'articulo', 'venta', 'detalle_venta']
+COLUMNS = {
+    'trabajador': ['idtrabajador', 'nombre', 'apellidos', 'usuario', 'password', 'acceso', 'estado'],
+    'categoria': ['idcategoria', 'nombre', 'descripcion'],
+    'presentacion': ['idpresentacion', 'nombre', 'descripcion'],
+    'cliente': ['idcliente', 'nombre', 'apellidos', 'telefono', 'email'],
+    'articulo': ['idarticulo', 'codigo', 'nombre', 'descripcion', 'stock', 'precio_venta', 'idcategoria',
+                 'idpresentacion', 'estado', 'tipo_venta', 'fecha_vencimiento'],
+    'venta': ['idventa', 'idcliente', 'idtrabajador', 'fecha_hora', 'total_venta', 'estado'],
+    'detalle_venta': ['iddetalle', 'idventa', 'idarticulo', 'cantidad', 'precio_unitario', 'subtotal'],
+}
+PRIMARY_KEYS = {t: cols[0] for t, cols in COLUMNS.items()}
+
+CATEGORIAS = [
+    ('Antibióticos', 'Medicamentos para combatir infecciones bacterianas'),
+    ('Analgésicos', 'Medicamentos para aliviar el dolor'),
+    ('Antiinflamatorios', 'Para reducir la inflamación'),
+    ('Vitaminas', 'Suplementos vitamínicos y minerales'),
+    ('Cuidado Personal', 'Productos de higiene y belleza'),
+    ('Cardiología', 'Medicamentos para el corazón'),
+    ('Gastroenterología', 'Para el sistema digestivo'),
+    ('Pediatría', 'Medicamentos de uso pediátrico'),
+    ('Dermatología', 'Tratamientos para la piel'),
+    ('Respiratorio', 'Antigripales, antitusivos y broncodilatadores'),
+]
+PRESENTACIONES = [
+    ('Caja x 10', 'Caja con 10 unidades/tiras'),
+    ('Caja x 30', 'Caja con 30 unidades para tratamiento mensual'),
+    ('Jarabe 120ml', 'Frasco de jarabe'),
+    ('Inyectable', 'Ampolla inyectable'),
+    ('Crema 50g', 'Tubo de crema tópica'),
+    ('Unidad', 'Venta por unidad suelta'),
+]
+PRINCIPIOS = ['Paracetamol', 'Ibuprofeno', 'Amoxicilina', 'Omeprazol', 'Loratadina', 'Metformina', 'Losartán',
+              'Azitromicina', 'Cetirizina', 'Diclofenaco', 'Naproxeno', 'Ciprofloxacino', 'Atorvastatina',
+              'Enalapril', 'Ranitidina', 'Salbutamol', 'Vitamina C', 'Complejo B', 'Clotrimazol', 'Dexametasona']
+CONCENTRACIONES = ['100mg', '250mg', '400mg', '500mg', '850mg', '1g', '5mg', '10mg', '20mg', '50mg']
+FORMAS = ['Tabletas', 'Cápsulas', 'Jarabe', 'Suspensión', 'Crema', 'Gotas', 'Inyectable']
+LABORATORIOS = ['Bagó', 'Inti', 'Vita', 'Cofar', 'Terbol', 'Sigma', 'Genfar', 'MK']
+NOMBRES = ['Juan', 'María', 'Carlos', 'Ana', 'Luis', 'Rosa', 'Jorge', 'Carmen', 'Pedro', 'Lucía', 'Miguel',
+           'Sofía', 'José', 'Elena', 'Diego', 'Paola', 'Fernando', 'Gabriela', 'Ricardo', 'Daniela']
+APELLIDOS = ['Pérez', 'Gómez', 'Rodríguez', 'Fernández', 'López', 'Martínez', 'Sánchez', 'Quispe', 'Mamani',
+             'Flores', 'Vargas', 'Rojas', 'Gutiérrez', 'Choque', 'Torrez', 'Mendoza', 'Castro', 'Ramos']
+
+# Peso relativo de ventas por hora (farmacia abierta de 7 a 22) y por día (lunes=0)
+HOUR_WEIGHTS = [0, 0, 0, 0, 0, 0, 0, 1, 4, 7, 9, 9, 7, 5, 5, 6, 7, 8, 9, 8, 6, 3, 0, 0]
+WEEKDAY_WEIGHTS = [1.0, 0.95, 0.95, 1.0, 1.1, 1.25, 0.6]
+
+
+class WeightedSampler:
+    """Muestreo O(log n) sobre pesos acumulados"""
+    def __init__(self, weights, rng):
+        self.cumulative = []
+        total = 0
+        for w in weights:
+            total += w
+            self.cumulative.append(total)
+        self.total = total
+        self.rng = rng
+
+    def sample(self):
+        return bisect.bisect_right(self.cumulative, self.rng.random() * self.total)
+
+
+def zipf_weights(n, s=1.07):
+    return [1 / (rank ** s) for rank in range(1, n + 1)]
+
+
+def gen_trabajadores(n):
+    password = generate_password_hash('cambiar123')
+    yield {'idtrabajador': 1, 'nombre': 'Admin', 'apellidos': 'User', 'usuario': 'admin', 'password': password,
+           'acceso': 'Administrador', 'estado': 'activo'}
+    for i in range(2, n + 1):
+        yield {'idtrabajador': i, 'nombre': NOMBRES[i % len(NOMBRES)], 'apellidos': APELLIDOS[i % len(APELLIDOS)],
+               'usuario': f'cajero{i:03d}', 'password': password, 'acceso': 'Usuario',
+               'estado': 'activo' if i % 12 else 'inactivo'}
+
+
+def gen_catalogos():
+    for i, (nombre, descripcion) in enumerate(CATEGORIAS, 1):
+        yield 'categoria', {'idcategoria': i, 'nombre': nombre, 'descripcion': descripcion}
+    for i, (nombre, descripcion) in enumerate(PRESENTACIONES, 1):
+        yield 'presentacion', {'idpresentacion': i, 'nombre': nombre, 'descripcion': descripcion}
+
+
+def gen_clientes(n, rng):
+    yield {'idcliente': 1, 'nombre': 'Cliente', 'apellidos': 'General', 'telefono': '0000000',
+           'email': 'general@email.com'}
+    for i in range(2, n + 1):
+        nombre, apellido = rng.choice(NOMBRES), f'{rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}'
+        yield {'idcliente': i, 'nombre': nombre, 'apellidos': apellido,
+               'telefono': f'7{rng.randint(0, 9999999):07d}' if rng.random() < 0.8 else None,
+               'email': f'{nombre.lower()}.{i}@email.com' if rng.random() < 0.4 else None}
+
+
+def gen_articulos(n, rng, today, precios):
+    """Artículos; registra cada precio en `precios` para que el detalle de venta lo use"""
+    for i in range(1, n + 1):
+        principio = rng.choice(PRINCIPIOS)
+        r = rng.random()
+        if r < 0.03:
+            vencimiento = today - timedelta(days=rng.randint(1, 180))
+        elif r < 0.08:
+            vencimiento = today + timedelta(days=rng.randint(0, 30))
+        elif r < 0.10:
+            vencimiento = None
+        else:
+            vencimiento = today + timedelta(days=rng.randint(180, 1095))
+        stock = int(rng.lognormvariate(4, 1.1))
+        precios[i] = round(min(rng.lognormvariate(2.3, 0.8), 2000), 2)
+        yield {
+            'idarticulo': i,
+            'codigo': f'{principio[:3].upper()}{i:06d}',
+            'nombre': f'{principio} {rng.choice(CONCENTRACIONES)} {rng.choice(FORMAS)} {rng.choice(LABORATORIOS)}',
+            'descripcion': f'{principio} - presentación comercial',
+            'stock': stock if rng.random() > 0.05 else rng.randint(0, 9),
+            'precio_venta': precios[i],
+            'idcategoria': rng.randint(1, len(CATEGORIAS)),
+            'idpresentacion': rng.randint(1, len(PRESENTACIONES)),
+            'estado': 'activo' if rng.random() > 0.04 else 'inactivo',
+            'tipo_venta': rng.choice(['COMPLETO', 'COMPLETO', 'TIRAS', 'UNIDAD']),
+            'fecha_vencimiento': vencimiento.strftime('%Y-%m-%d') if vencimiento else None,
+        }
+
+
+def sale_timestamps(n, days, rng, end):
+    """n timestamps ordenados en los últimos `days` días con perfil horario/semanal y crecimiento"""
+    start = (end - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    day_weights = []
+    for d in range(days):
+        day = start + timedelta(days=d)
+        growth = 1 + 0.5 * d / max(days - 1, 1)
+        day_weights.append(WEEKDAY_WEIGHTS[day.weekday()] * growth)
+    total = sum(day_weights)
+    hours = WeightedSampler(HOUR_WEIGHTS, rng)
+    # Reparto por día (redondeo acumulado para sumar exactamente n) y orden dentro del día
+    assigned, cumulative = 0, 0.0
+    for d, weight in enumerate(day_weights):
+        cumulative += weight
+        count = round(n * cumulative / total) - assigned
+        assigned += count
+        day = start + timedelta(days=d)
+        seconds = sorted(hours.sample() * 3600 + rng.randint(0, 3599) for _ in range(count))
+        for s in seconds:
+            yield day + timedelta(seconds=s)
+
+
+def gen_ventas(n, counts, rng, end, days, precios):
+    """Ventas con su detalle: (venta, [detalles]); total_venta = suma de subtotales"""
+    productos = WeightedSampler(zipf_weights(counts['articulos']), rng)
+    # Mezclar ranking de popularidad e idarticulo para que los populares no sean los primeros ids
+    popularidad = list(range(1, counts['articulos'] + 1))
+    rng.shuffle(popularidad)
+    clientes = WeightedSampler(zipf_weights(max(counts['clientes'] - 1, 1), 0.6), rng)
+    iddetalle = 0
+    for idventa, fecha in enumerate(sale_timestamps(n, days, rng, end), 1):
+        lineas = min(1 + int(rng.expovariate(1 / 1.5)), 15)
+        detalle, total = [], 0.0
+        for _ in range(lineas):
+            idarticulo = popularidad[productos.sample()]
+            precio = precios[idarticulo]
+            cantidad = 1 + int(rng.expovariate(1 / 0.8))
+            subtotal = round(precio * cantidad, 2)
+            iddetalle += 1
+            total += subtotal
+            detalle.append({'iddetalle': iddetalle, 'idventa': idventa, 'idarticulo': idarticulo,
+                            'cantidad': cantidad, 'precio_unitario': precio, 'subtotal': subtotal})
+        idcliente = 1 if rng.random() < 0.3 or counts['clientes'] < 2 else 2 + clientes.sample()
+        venta = {'idventa': idventa, 'idcliente': idcliente,
+                 'idtrabajador': rng.randint(1, counts['trabajadores']),
+                 'fecha_hora': fecha.strftime('%Y-%m-%d %H:%M:%S'), 'total_venta': round(total, 2),
+                 'estado': 'completada' if rng.random() > 0.01 else 'anulada'}
+        yield venta, detalle
+
+
+class CSVWriter:
+    """Un CSV por tabla + load.sql (\\copy) para cargar con psql"""
+    def __init__(self, out):
+        self.out = out
+        os.makedirs(out, exist_ok=True)
+        self.files, self.writers, self.counts = {}, {}, {}
+
+    def write(self, table, rows):
+        if table not in self.writers:
+            f = open(os.path.join(self.out, f'{table}.csv'), 'w', newline='', encoding='utf-8')
+            self.files[table] = f
+            self.writers[table] = csv.DictWriter(f, fieldnames=COLUMNS[table])
+            self.writers[table].writeheader()
+            self.counts[table] = 0
+        self.writers[table].writerows(rows)
+        self.counts[table] += len(rows)
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        with open(os.path.join(self.out, 'load.sql'), 'w', encoding='utf-8') as f:
+            f.write('-- Cargar con: psql "$DATABASE_URL" -f load.sql (desde este directorio)\n')
+            f.write('BEGIN;\n')
+            for table in TABLES:
+                if table in self.counts:
+                    f.write(f"\\copy {table} ({', '.join(COLUMNS[table])}) FROM '{table}.csv' WITH (FORMAT csv, HEADER true)\n")
+            for table in TABLES:
+                if table in self.counts:
+                    pk = PRIMARY_KEYS[table]
+                    f.write(f"SELECT setval(pg_get_serial_sequence('{table}', '{pk}'), "
+                            f"(SELECT COALESCE(MAX({pk}), 1) FROM {table}));\n")
+            f.write('COMMIT;\nANALYZE;\n')
+
+
+class BatchWriter:
+    """Inserción por lotes: LocalBackend.bulk_insert o POST masivo vía el cliente de db"""
+    def __init__(self, batch_size, backend=None, db=None):
+        self.batch_size = batch_size
+        self.backend = backend
+        self.db = db
+        self.buffers = {}
+        self.counts = {}
+
+    def write(self, table, rows):
+        # Volcar antes las tablas padre (orden de TABLES) para respetar las FK
+        for parent in TABLES[:TABLES.index(table)]:
+            self.flush(parent)
+        buffer = self.buffers.setdefault(table, [])
+        buffer.extend(rows)
+        if len(buffer) >= self.batch_size:
+            self.flush(table)
+
+    def flush(self, table):
+        rows = self.buffers.get(table)
+        if not rows:
+            return
+        if self.backend is not None:
+            self.backend.bulk_insert(table, rows, batch_size=self.batch_size)
+        else:
+            for start in range(0, len(rows), self.batch_size):
+                self.db.table(table).insert(rows[start:start + self.batch_size]).execute()
+        self.counts[table] = self.counts.get(table, 0) + len(rows)
+        self.buffers[table] = []
+
+    def close(self):
+        for table in TABLES:
+            self.flush(table)
+        if self.db is not None:
+            from models.db import execute_sql
+            # Las identidades no avanzan con ids explícitos; requiere la RPC exec_sql
+            for table in TABLES:
+                pk = PRIMARY_KEYS[table]
+                if not execute_sql(f"SELECT setval(pg_get_serial_sequence('{table}', '{pk}'), "
+                                   f"(SELECT COALESCE(MAX({pk}), 1) FROM {table}))"):
+                    print(f"⚠️ No se pudo reajustar la secuencia de {table}; ejecute setval manualmente")
+                    break
+
+
+def generate(writer, counts, seed_value=42, days=730, progress_every=100000):
+    rng = random.Random(seed_value)
+    end = datetime.now()
+    today = end.date()
+
+    writer.write('trabajador', list(gen_trabajadores(counts['trabajadores'])))
+    for table, row in gen_catalogos():
+        writer.write(table, [row])
+    precios = {}
+    for table, name, rows in (('cliente', 'clientes', gen_clientes(counts['clientes'], rng)),
+                              ('articulo', 'articulos', gen_articulos(counts['articulos'], rng, today, precios))):
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= 5000:
+                writer.write(table, chunk)
+                chunk = []
+        writer.write(table, chunk)
+        print(f"✓ {table}: {counts[name]} filas")
+
+    ventas, detalles = [], []
+    for i, (venta, detalle) in enumerate(gen_ventas(counts['ventas'], counts, rng, end, days, precios), 1):
+        ventas.append(venta)
+        detalles.extend(detalle)
+        if len(ventas) >= 5000:
+            writer.write('venta', ventas)
+            writer.write('detalle_venta', detalles)
+            ventas, detalles = [], []
+        if i % progress_every == 0:
+            print(f"  ventas: {i}/{counts['ventas']}")
+    writer.write('venta', ventas)
+    writer.write('detalle_venta', detalles)
+    writer.close()
+    return writer.counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', choices=['csv', 'sqlite', 'db'], default='csv')
+    parser.add_argument('--out', default='data/synthetic', help='directorio (csv) o archivo (sqlite)')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplicador de los volúmenes por defecto')
+    parser.add_argument('--articulos', type=int)
+    parser.add_argument('--clientes', type=int)
+    parser.add_argument('--ventas', type=int)
+    parser.add_argument('--trabajadores', type=int)
+    parser.add_argument('--days', type=int, default=730, help='días de historial de ventas')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    counts = {name: max(1, int(value * args.scale)) for name, value in DEFAULT_COUNTS.items()}
+    for name in counts:
+        if getattr(args, name) is not None:
+            counts[name] = getattr(args, name)
+
+    print(f"🏭 Generando {json.dumps(counts)} -> {args.target}:{args.out}")
+    if args.target == 'csv':
+        writer = CSVWriter(args.out)
+    elif args.target == 'sqlite':
+        from models.local_backend import LocalBackend
+        writer = BatchWriter(args.batch_size, backend=LocalBackend(path=args.out))
+    else:
+        from models.db import get_db
+        writer = BatchWriter(args.batch_size, db=get_db())
+
+    written = generate(writer, counts, seed_value=args.seed, days=args.days)
+    print("✅ Filas escritas: " + ', '.join(f'{t}={n}' for t, n in written.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Indexador incremental de la base de conocimiento del RAG (tabla documents).
+
+Arma los documentos desde articulo, categoria, proveedor y cliente, embebe
+sólo los nuevos o modificados (hash de contenido), hace upsert por
+source_key y borra los que ya no tienen origen. Se puede cortar y volver a
+correr: retoma con lo que falte.
+
+    python scripts/index_rag.py
+    python scripts/index_rag.py --sources articulo,categoria --dry-run
+    python scripts/index_rag.py --prune-legacy   # borra filas antiguas sin source_key
+"""
+import os
+import sys
+import argparse
+# Fix para imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from models.rag_indexer import SOURCES, run_indexer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sources', default=','.join(SOURCES), help='orígenes separados por coma')
+    parser.add_argument('--dry-run', action='store_true', help='sólo mostrar cuántos documentos cambiarían')
+    parser.add_argument('--no-prune', action='store_true', help='no borrar documentos sin origen')
+    parser.add_argument('--prune-legacy', action='store_true', help='borrar filas sin source_key (cargas antiguas)')
+    args = parser.parse_args()
+
+    sources = [s.strip() for s in args.sources.split(',') if s.strip()]
+    try:
+        stats = run_indexer(sources, prune=not args.no_prune, prune_legacy=args.prune_legacy, dry_run=args.dry_run)
+    except Exception as e:
+        print(f"❌ Error indexando documentos: {e}")
+        sys.exit(1)
+
+    if args.dry_run:
+        print(f"📋 {stats['documents']} documentos: {stats['pending']} por embeber, "
+              f"{stats['orphans']} sin origen, {stats['legacy']} filas antiguas sin source_key")
+        return
+    print(f"✅ {stats['documents']} documentos: {stats['embedded']} embebidos, {stats['unchanged']} sin cambios, "
+          f"{stats['deleted']} borrados")
+    if stats['legacy_deleted']:
+        print(f"🧹 {stats['legacy_deleted']} filas antiguas sin source_key borradas")
+    if stats['failed_batches']:
+        print(f"⚠️ {stats['failed_batches']} lotes fallaron; vuelva a ejecutar para completarlos")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class _PostgRESTHandler(BaseHTTPRequestHandler):
+    """Servidor mínimo con keep-alive que responde como PostgREST"""
+    protocol_version = 'HTTP/1.1'
+
+    def _reply(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        if self.path.startswith('/rest/v1/no_existe'):
+            self._reply({'code': '42P01', 'message': 'relation "no_existe" does not exist'}, status=404)
+            return
+        self._reply([{'idarticulo': 1, 'stock': 5}])
+
+    def do_HEAD(self):
+        self.server.paths.append(self.path)
+        self.server.prefer.append(self.headers.get('Prefer'))
+        self.send_response(200)
+        self.send_header('Content-Range', '*/1234')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        self.server.paths.append(self.path)
+        self._reply({'ok': True})
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def postgrest():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _PostgRESTHandler)
+    server.paths = []
+    server.prefer = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def local_db():
+    """Cliente sobre el backend SQLite local con un catálogo mínimo"""
+    from models.local_backend import create_local_client
+    client = create_local_client()
+    backend = client.transport
+    backend.bulk_insert('categoria', [{'nombre': 'Analgésicos'}, {'nombre': 'Vitaminas'}])
+    backend.bulk_insert('cliente', [{'nombre': 'Juan', 'apellidos': 'Pérez'}])
+    backend.bulk_insert('trabajador', [{'nombre': 'Admin', 'apellidos': 'User', 'usuario': 'admin', 'password': 'x'}])
+    backend.bulk_insert('articulo', [
+        {'codigo': 'ANA001', 'nombre': 'Paracetamol 500mg', 'stock': 50, 'precio_venta': 2.0, 'idcategoria': 1,
+         'estado': 'activo', 'fecha_vencimiento': '2030-01-01'},
+        {'codigo': 'ANT001', 'nombre': 'Amoxicilina 500mg', 'stock': 4, 'precio_venta': 5.5, 'idcategoria': 1,
+         'estado': 'activo', 'fecha_vencimiento': None},
+        {'codigo': 'VIT001', 'nombre': 'Vitamina C', 'stock': 0, 'precio_venta': 8.0, 'idcategoria': 2,
+         'estado': 'inactivo', 'fecha_vencimiento': '2020-01-01'},
+    ])
+    yield client
+    backend.close()
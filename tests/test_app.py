@@ -18,3 +18,32 @@ def test_index_redirect(client):
     response = client.get('/')
     assert response.status_code == 302
     assert '/dashboard' in response.location or response.location.endswith('/')
+
+def _raising(error):
+    def view():
+        raise error
+    return view
+
+def test_database_errors_map_to_status(app):
+    from models.db import SupabaseHTTPError, SupabaseTimeoutError, CircuitOpenError
+    errors = {
+        'conflict': SupabaseHTTPError(409, '{"message": "duplicate key value violates unique constraint"}'),
+        'bad-filter': SupabaseHTTPError(400, '{"message": "failed to parse filter"}'),
+        'backend': SupabaseHTTPError(502, 'Bad Gateway'),
+        'timeout': SupabaseTimeoutError('timeout'),
+        'circuit': CircuitOpenError(12),
+        'auth': SupabaseHTTPError(401, '{"message": "invalid JWT"}'),
+    }
+    for name, error in errors.items():
+        app.add_url_rule(f'/api/fail/{name}', f'fail_{name}', _raising(error))
+    client = app.test_client()
+
+    conflict = client.get('/api/fail/conflict')
+    assert conflict.status_code == 409
+    assert conflict.get_json()['error'] == 'duplicate key value violates unique constraint'
+    assert client.get('/api/fail/bad-filter').status_code == 400
+    assert client.get('/api/fail/backend').status_code == 503
+    assert client.get('/api/fail/timeout').status_code == 503
+    circuit = client.get('/api/fail/circuit')
+    assert circuit.status_code == 503 and circuit.headers['Retry-After'] == '12'
+    assert client.get('/api/fail/auth').status_code == 500
@@ -0,0 +1,157 @@
+import pytest
+import threading
+from flask import Flask, g
+from models.db import SupabaseClient, HTTPTransport, QueryCache, add_query_listener, remove_query_listener
+from models.async_db import gather_queries
+
+
+def test_gather_queries_over_httpx_keeps_order(postgrest):
+    client = SupabaseClient(f'http://127.0.0.1:{postgrest.server_port}', 'test-key', transport=HTTPTransport(), cache=QueryCache())
+
+    total, rows = gather_queries(
+        client.table('articulo').lte('stock', 10).count_only('planned'),
+        client.table('articulo').select('idarticulo, stock').eq('idarticulo', 1),
+    )
+
+    assert total.data == 1234
+    assert rows.data == [{'idarticulo': 1, 'stock': 5}]
+    assert sorted(postgrest.paths) == ['/rest/v1/articulo?select=*&stock=lte.10',
+                                       '/rest/v1/articulo?select=idarticulo,stock&idarticulo=eq.1']
+
+
+
+@pytest.mark.parametrize('backend', ['httpx', 'local'])
+def test_gather_queries_can_return_failures_in_place(backend, request):
+    from models.db import SupabaseHTTPError
+    if backend == 'httpx':
+        server = request.getfixturevalue('postgrest')
+        client = SupabaseClient(f'http://127.0.0.1:{server.server_port}', 'test-key', transport=HTTPTransport(), cache=QueryCache())
+    else:
+        client = request.getfixturevalue('local_db')
+
+    queries = (client.table('articulo').select('idarticulo').limit(1), client.table('no_existe'))
+    ok, failed = gather_queries(*queries, return_exceptions=True)
+
+    assert ok.data[0]['idarticulo'] == 1
+    assert isinstance(failed, SupabaseHTTPError) and failed.status == 404
+    with pytest.raises(SupabaseHTTPError):
+        gather_queries(*queries)
+
+
+def test_database_context_skips_only_the_failed_section(local_db):
+    from controllers.chatbot import get_database_context
+    local_db.transport.conn.execute('DROP TABLE categoria')
+
+    context = get_database_context('stock y categorias de medicamentos', local_db)
+
+    assert 'PRODUCTOS ACTIVOS' in context and 'Paracetamol 500mg' in context
+    assert 'CATEGORÍAS' not in context
+
+
+class _BarrierTransport:
+    """Sólo responde cuando todas las consultas están en vuelo a la vez"""
+    def __init__(self, parties):
+        self.barrier = threading.Barrier(parties, timeout=5)
+
+    def request(self, method, url, op='select', **kwargs):
+        self.barrier.wait()
+
+        class _Response:
+            status_code = 200
+            headers = {}
+            content = b'[]'
+            def raise_for_status(self):
+                pass
+            def json(self):
+                return [{'url': url}]
+        return _Response()
+
+
+def test_gather_queries_runs_other_transports_in_threads_with_request_context():
+    client = SupabaseClient('http://db', 'key', transport=_BarrierTransport(3), cache=QueryCache())
+    seen = []
+
+    def listener(record):
+        seen.append(g.get('marker'))
+
+    add_query_listener(listener)
+    try:
+        with Flask(__name__).test_request_context('/'):
+            g.marker = 'dashboard'
+            results = gather_queries(*(client.table(name) for name in ('articulo', 'cliente', 'venta')))
+    finally:
+        remove_query_listener(listener)
+
+    assert [r.data[0]['url'].split('?')[0] for r in results] == [
+        'http://db/rest/v1/articulo', 'http://db/rest/v1/cliente', 'http://db/rest/v1/venta']
+    assert seen == ['dashboard'] * 3
+
+
+class _AsyncPagedTransport:
+    """Transporte asíncrono que pagina una lista en memoria por keyset sobre idventa"""
+    pool_size = 2
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.urls = []
+
+    async def request(self, method, url, op='select', **kwargs):
+        from urllib.parse import urlsplit, parse_qs
+        self.urls.append(url)
+        qs = parse_qs(urlsplit(url).query)
+        rows = self.rows
+        if 'idventa' in qs:
+            bound = int(qs['idventa'][0].split('.')[1])
+            rows = [r for r in rows if r['idventa'] > bound]
+        page = rows[:int(qs['limit'][0])]
+
+        class _Response:
+            status_code = 200
+            headers = {}
+            content = b'[]'
+            def raise_for_status(self):
+                pass
+            def json(self):
+                return page
+        return _Response()
+
+
+def test_async_iter_rows_pages_like_the_sync_client():
+    import asyncio
+    from models.async_db import AsyncSupabaseClient
+    transport = _AsyncPagedTransport([{'idventa': i} for i in range(1, 24)])
+    client = AsyncSupabaseClient('http://db', 'key', transport=transport, cache=QueryCache())
+
+    async def collect():
+        return [row['idventa'] async for row in client.table('venta').order('idventa').iter_rows(page_size=10, key='idventa')]
+
+    assert asyncio.run(collect()) == list(range(1, 24))
+    assert len(transport.urls) == 3 and 'idventa=gt.10' in transport.urls[1]
+
+
+def test_async_client_is_created_once_under_concurrency(monkeypatch):
+    import time
+    import models.async_db as async_db
+    created = []
+
+    class _SlowTransport:
+        def __init__(self, pool_size=None):
+            time.sleep(0.05)
+            created.append(self)
+
+    monkeypatch.setattr(async_db, 'AsyncHTTPTransport', _SlowTransport)
+    client = SupabaseClient('http://db', 'key', transport=HTTPTransport(), cache=QueryCache())
+    barrier = threading.Barrier(8)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(async_db._async_client_for(client))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(created) == 1 and len({id(r) for r in results}) == 1
@@ -0,0 +1,90 @@
+import pytest
+import models.db as db_module
+from config import Config
+from models.catalog_sync import catalog_version, changes_since
+
+
+@pytest.fixture(autouse=True)
+def no_sync_lag(monkeypatch):
+    # Las escrituras de los tests son instantáneas: sin margen de transacciones en curso
+    monkeypatch.setattr(Config, 'CATALOG_SYNC_LAG', 0)
+
+
+def test_changes_since_returns_updates_and_tombstones_in_version_order(local_db):
+    cursor = catalog_version(local_db, 'articulo')
+    assert cursor > 0
+
+    local_db.table('articulo').update({'stock': 99}).eq('codigo', 'ANA001').execute()
+    local_db.table('articulo').delete().eq('codigo', 'VIT001').execute()
+    local_db.table('articulo').insert({'codigo': 'NEW001', 'nombre': 'Nuevo'}).execute()
+
+    first = changes_since(local_db, 'articulo', cursor, limit=2)
+    assert [r['codigo'] for r in first['changes']] == ['ANA001'] and first['deleted'] == [3]
+    assert first['has_more'] is True
+
+    rest = changes_since(local_db, 'articulo', first['cursor'], limit=2)
+    assert [r['codigo'] for r in rest['changes']] == ['NEW001'] and rest['deleted'] == []
+    assert rest['cursor'] == catalog_version(local_db, 'articulo')
+    assert changes_since(local_db, 'articulo', rest['cursor'])['changes'] == []
+    with pytest.raises(ValueError):
+        changes_since(local_db, 'venta', 0)
+
+
+def test_changes_since_has_more_when_rows_and_tombstones_exceed_limit(local_db):
+    cursor = catalog_version(local_db, 'articulo')
+    for pid in (1, 2, 3):
+        local_db.table('articulo').update({'stock': 10}).eq('idarticulo', pid).execute()
+    for codigo in ('TMP001', 'TMP002', 'TMP003'):
+        local_db.table('articulo').insert({'codigo': codigo, 'nombre': codigo}).execute()
+        local_db.table('articulo').delete().eq('codigo', codigo).execute()
+
+    # 3 filas + 3 lápidas, ninguna consulta llena su página de 5 pero juntas se recortan
+    first = changes_since(local_db, 'articulo', cursor, limit=5)
+    assert len(first['changes']) == 3 and len(first['deleted']) == 2
+    assert first['has_more'] is True
+
+    rest = changes_since(local_db, 'articulo', first['cursor'], limit=5)
+    assert rest['changes'] == [] and len(rest['deleted']) == 1 and rest['has_more'] is False
+    assert set(first['deleted'] + rest['deleted']) == {4, 5, 6}
+
+def test_cursor_stays_behind_recent_writes(local_db):
+    conn = local_db.transport.conn
+
+    def stamp(base, recent):
+        # version = base + idarticulo (cambiarla evita el trigger); `recent` recién escritos, el resto hace mucho
+        ids = ','.join(str(i) for i in recent)
+        with conn:
+            conn.execute(f"UPDATE articulo SET version = {base} + idarticulo, updated_at = CASE WHEN idarticulo IN ({ids}) "
+                         f"THEN datetime('now', 'localtime') ELSE '2000-01-01 00:00:00' END")
+
+    stamp(0, recent=[3])
+    assert catalog_version(local_db, 'articulo') == 3
+    assert catalog_version(local_db, 'articulo', lag=60) == 2
+    first = changes_since(local_db, 'articulo', 0, lag=60)
+    assert [r['version'] for r in first['changes']] == [1, 2] and first['cursor'] == 2
+    assert first['has_more'] is False
+
+    # La versión 2 todavía puede estar en una transacción: no se salta aunque la 3 ya sea estable
+    stamp(10, recent=[2])
+    assert changes_since(local_db, 'articulo', 11, lag=60) == {'cursor': 11, 'changes': [], 'deleted': [],
+                                                              'has_more': False}
+    assert [r['version'] for r in changes_since(local_db, 'articulo', 11, lag=0)['changes']] == [12, 13]
+
+def test_snapshot_etag_and_changes_endpoint(local_db, monkeypatch):
+    import os
+    from app import create_app
+    monkeypatch.setattr(Config, 'SUPABASE_BACKEND', 'sqlite')
+    monkeypatch.setattr(db_module, '_client', local_db)
+    monkeypatch.setattr(db_module, '_client_pid', os.getpid())
+    client = create_app().test_client()
+
+    snapshot = client.get('/api/products/snapshot')
+    body = snapshot.get_json()
+    assert len(body['products']) == 3
+    assert client.get('/api/products/snapshot', headers={'If-None-Match': snapshot.headers['ETag']}).status_code == 304
+
+    local_db.table('articulo').update({'precio_venta': 3.0}).eq('idarticulo', 1).execute()
+    assert client.get('/api/products', headers={'If-None-Match': snapshot.headers['ETag']}).status_code == 200
+    delta = client.get(f"/api/products/changes?since={body['version']}").get_json()
+    assert [p['precio_venta'] for p in delta['changes']] == [3.0]
+    assert client.get('/api/products/changes').status_code == 400
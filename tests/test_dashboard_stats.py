@@ -0,0 +1,62 @@
+import threading
+from models.dashboard_stats import DashboardSnapshot, load_dashboard_stats
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _snapshot(loader, clock, **kwargs):
+    return DashboardSnapshot(loader, ttl=10, max_stale=100, clock=clock, today=lambda: '2026-01-01', **kwargs)
+
+
+def test_serves_stale_snapshot_and_refreshes_once_in_background():
+    clock, calls = _Clock(), []
+    release = threading.Event()
+
+    def loader():
+        calls.append(1)
+        if len(calls) > 1:
+            release.wait(5)
+        return {'day': '2026-01-01', 'n': len(calls)}
+
+    snapshot = _snapshot(loader, clock)
+    assert snapshot.get()['n'] == 1
+    clock.now = 20
+    # Vencido: se devuelve el valor anterior sin esperar y sólo arranca un refresco
+    assert [snapshot.get()['n'] for _ in range(5)] == [1] * 5
+    assert snapshot.stats()['refreshing'] is True
+    release.set()
+    for _ in range(100):
+        if not snapshot.stats()['refreshing']:
+            break
+        threading.Event().wait(0.01)
+    assert len(calls) == 2
+    assert snapshot.get()['n'] == 2
+
+
+def test_invalidate_and_day_change_force_reload():
+    clock, days = _Clock(), ['2026-01-01']
+    snapshot = DashboardSnapshot(lambda: {'day': days[0]}, ttl=10, max_stale=100, clock=clock, today=lambda: days[0])
+    snapshot.get()
+    snapshot.invalidate()
+    assert snapshot._fresh() is False
+
+    days[0] = '2026-01-02'
+    assert snapshot.get() == {'day': '2026-01-02'}
+    assert snapshot.stats()['loads'] == 2
+
+
+def test_load_dashboard_stats_from_rollup(local_db):
+    from models.sale_service import SaleService
+    SaleService(local_db).register([{'idarticulo': 1, 'cantidad': 2, 'precio': 2.5, 'subtotal': 5.0}])
+
+    stats = load_dashboard_stats(local_db)
+
+    assert (stats['count_prod'], stats['count_client'], stats['count_stock']) == (3, 1, 2)
+    assert (stats['count_sales'], stats['total_sales_today']) == (1, 5.0)
+    assert stats['chart_values'][-1] == 5.0 and len(stats['chart_labels']) == 7
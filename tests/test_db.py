@@ -0,0 +1,264 @@
+import pytest
+from models.db import SupabaseClient, HTTPTransport, prefetch_first_page
+
+
+def test_tables_and_rpc_share_pooled_connection(postgrest):
+    client = SupabaseClient(f'http://127.0.0.1:{postgrest.server_port}', 'test-key', transport=HTTPTransport(pool_size=2))
+
+    for _ in range(4):
+        res = client.table('articulo').select('idarticulo, stock').eq('idarticulo', 1).execute()
+        assert res.data == [{'idarticulo': 1, 'stock': 5}]
+    client.rpc('search_documents', {'match_count': 1}).execute()
+
+    stats = client.transport_stats()
+    assert stats['requests'] == 5
+    assert stats['connections_opened'] == 1
+    assert stats['connections_reused'] == 4
+    assert postgrest.paths[-1] == '/rest/v1/rpc/search_documents'
+
+
+def test_operation_timeouts():
+    transport = HTTPTransport(connect_timeout=1, timeouts={'rpc': 42})
+    assert transport.timeout_for('rpc') == (1, 42)
+    assert transport.timeout_for('select')[0] == 1
+
+
+def test_repeated_column_filters_are_kept():
+    query = SupabaseClient('http://db', 'key', transport=HTTPTransport()).table('venta') \
+        .select('*, cliente(nombre, apellidos)') \
+        .gte('fecha_hora', '2026-01-01 00:00:00') \
+        .lte('fecha_hora', '2026-01-31 23:59:59') \
+        ._build_query_string()
+
+    assert query == ('select=*,cliente(nombre,apellidos)'
+                     '&fecha_hora=gte.2026-01-01%2000:00:00'
+                     '&fecha_hora=lte.2026-01-31%2023:59:59')
+
+
+def test_set_null_negation_and_or_filters():
+    query = SupabaseClient('http://db', 'key', transport=HTTPTransport()).table('articulo') \
+        .in_('codigo', ['ANT001', 'A,B']) \
+        .is_('fecha_vencimiento', None) \
+        .not_('estado', 'eq', 'inactivo') \
+        .ilike('nombre', '*para*') \
+        .or_('stock.lt.5,precio_venta.gt.100') \
+        .eq('tipo_venta', 'C&D+1') \
+        ._build_query_string()
+
+    assert query == ('select=*'
+                     '&codigo=in.(ANT001,%22A,B%22)'
+                     '&fecha_vencimiento=is.null'
+                     '&estado=not.eq.inactivo'
+                     '&nombre=ilike.*para*'
+                     '&or=(stock.lt.5,precio_venta.gt.100)'
+                     '&tipo_venta=eq.C%26D%2B1')
+
+
+def test_count_uses_head_without_row_bodies(postgrest):
+    client = SupabaseClient(f'http://127.0.0.1:{postgrest.server_port}', 'test-key', transport=HTTPTransport())
+
+    total = client.table('articulo').lte('stock', 10).count(mode='planned')
+
+    assert total == 1234
+    assert postgrest.paths[-1] == '/rest/v1/articulo?select=*&stock=lte.10'
+    assert postgrest.prefer[-1] == 'count=planned'
+    with pytest.raises(ValueError):
+        client.table('articulo').count(mode='fast')
+
+
+class _PagedTransport:
+    """Devuelve páginas de una lista en memoria según el keyset pedido"""
+    def __init__(self, rows):
+        self.rows = rows
+        self.urls = []
+
+    def request(self, method, url, op='select', **kwargs):
+        from urllib.parse import urlsplit, parse_qs
+        self.urls.append(url)
+        qs = parse_qs(urlsplit(url).query)
+        rows = self.rows
+        if 'idventa' in qs:
+            bound = int(qs['idventa'][0].split('.')[1])
+            rows = [r for r in rows if r['idventa'] < bound]
+        limit = int(qs['limit'][0])
+
+        class _Response:
+            status_code = 200
+            headers = {}
+            def raise_for_status(self):
+                pass
+            def json(self_inner):
+                return rows[:limit]
+        return _Response()
+
+
+def test_iter_rows_uses_keyset_pages():
+    transport = _PagedTransport([{'idventa': i} for i in range(25, 0, -1)])
+    query = SupabaseClient('http://db', 'key', transport=transport).table('venta').order('idventa', desc=True)
+
+    ids = [row['idventa'] for row in query.iter_rows(page_size=10, key='idventa')]
+
+    assert ids == list(range(25, 0, -1))
+    assert len(transport.urls) == 3
+    assert 'idventa=lt.16' in transport.urls[1] and 'offset' not in transport.urls[1]
+    with pytest.raises(ValueError):
+        next(query.order('fecha_hora').iter_rows(key='fecha_hora'))
+
+
+def test_prefetch_first_page_queries_before_streaming():
+    transport = _PagedTransport([{'idventa': i} for i in range(25, 0, -1)])
+    query = SupabaseClient('http://db', 'key', transport=transport).table('venta').order('idventa', desc=True)
+
+    rows = prefetch_first_page(query.iter_rows(page_size=10, key='idventa'))
+    assert len(transport.urls) == 1
+    assert [row['idventa'] for row in rows] == list(range(25, 0, -1))
+    assert list(prefetch_first_page(iter([]))) == []
+
+    class _Failing:
+        def request(self, *args, **kwargs):
+            raise ConnectionError('sin red')
+    failing = SupabaseClient('http://db', 'key', transport=_Failing()).table('venta')
+    with pytest.raises(Exception):
+        prefetch_first_page(failing.iter_rows())
+
+class _CountingTransport:
+    def __init__(self):
+        self.calls = []
+
+    def request(self, method, url, op='select', **kwargs):
+        self.calls.append((method, url))
+
+        class _Response:
+            status_code = 200
+            headers = {}
+            def raise_for_status(self):
+                pass
+            def json(self):
+                return [{'idcategoria': 1, 'nombre': 'Vitaminas'}]
+        return _Response()
+
+
+def test_reference_tables_are_cached_and_invalidated_on_write():
+    from models.db import QueryCache
+    transport = _CountingTransport()
+    client = SupabaseClient('http://db', 'key', transport=transport, cache=QueryCache({'categoria': 60}))
+
+    first = client.table('categoria').select('*').execute().data
+    first[0]['nombre'] = 'mutado'
+    second = client.table('categoria').select('*').execute().data
+    client.table('articulo').select('*').execute()
+    client.table('articulo').select('*').execute()
+
+    assert second == [{'idcategoria': 1, 'nombre': 'Vitaminas'}]
+    assert len(transport.calls) == 3
+    assert client.cache_stats()['hits'] == 1
+
+    client.table('categoria').insert({'nombre': 'Nueva'}).execute()
+    client.table('categoria').select('*').execute()
+    assert len(transport.calls) == 5
+    assert client.cache_stats()['misses'] == 2
+
+
+def test_select_in_flight_during_write_is_not_cached():
+    from models.db import QueryCache
+    client = None
+
+    class _WriteDuringSelect(_CountingTransport):
+        def request(self, method, url, op='select', **kwargs):
+            response = super().request(method, url, op, **kwargs)
+            if op == 'select' and len(self.calls) == 1:
+                # Otra petición escribe después de que la base leyó las filas y antes de guardarlas
+                client.table('categoria').update({'nombre': 'Nueva'}).eq('idcategoria', 1).execute()
+            return response
+
+    transport = _WriteDuringSelect()
+    client = SupabaseClient('http://db', 'key', transport=transport, cache=QueryCache({'categoria': 60}))
+
+    client.table('categoria').select('*').execute()
+    client.table('categoria').select('*').execute()
+    assert [method for method, _ in transport.calls] == ['GET', 'PATCH', 'GET']
+    assert client.cache_stats()['entries'] == 1
+
+class _FlakyTransport:
+    """Responde con los status indicados, en orden; luego 200"""
+    def __init__(self, statuses, delays=None):
+        self.statuses = list(statuses)
+        self.delays = list(delays or [])
+        self.calls = []
+
+    def request(self, method, url, op='select', **kwargs):
+        import time
+        self.calls.append(method)
+        if self.delays:
+            time.sleep(self.delays.pop(0))
+        status = self.statuses.pop(0) if self.statuses else 200
+        attempt = len(self.calls)
+
+        class _Response:
+            status_code = status
+            headers = {}
+            text = '{"message": "Stock insuficiente"}'
+            def json(self):
+                return [{'attempt': attempt}]
+        return _Response()
+
+
+def _client_with(transport, **policy):
+    from models.db import ResiliencePolicy, QueryCache
+    policy.setdefault('sleep', lambda s: None)
+    return SupabaseClient('http://db', 'key', transport=transport, cache=QueryCache(),
+                          policy=ResiliencePolicy(**policy))
+
+
+def test_reads_are_retried_but_writes_are_not():
+    from models.db import SupabaseHTTPError
+    transport = _FlakyTransport([503, 502])
+    client = _client_with(transport, retries=2)
+
+    assert client.table('articulo').select('*').execute().data == [{'attempt': 3}]
+    assert client.resilience_stats()['retries'] == 2
+
+    transport.statuses = [503]
+    with pytest.raises(SupabaseHTTPError) as exc:
+        client.table('articulo').insert({'nombre': 'X'}).execute()
+    assert exc.value.status == 503
+    assert transport.calls[-1] == 'POST' and len(transport.calls) == 4
+
+
+def test_client_errors_surface_without_retry():
+    from models.db import SupabaseHTTPError
+    transport = _FlakyTransport([400])
+    client = _client_with(transport, retries=3)
+
+    with pytest.raises(SupabaseHTTPError) as exc:
+        client.table('articulo').select('*').execute()
+    assert exc.value.message == 'Stock insuficiente'
+    assert len(transport.calls) == 1
+
+
+def test_circuit_breaker_fails_fast_then_probes():
+    from models.db import CircuitBreaker, CircuitOpenError, SupabaseHTTPError
+    now = [0.0]
+    breaker = CircuitBreaker(threshold=2, reset_timeout=30, clock=lambda: now[0])
+    transport = _FlakyTransport([503, 503])
+    client = _client_with(transport, retries=0, breaker=breaker)
+
+    for _ in range(2):
+        with pytest.raises(SupabaseHTTPError):
+            client.table('articulo').execute()
+    with pytest.raises(CircuitOpenError):
+        client.table('articulo').execute()
+    assert len(transport.calls) == 2
+
+    now[0] = 31
+    assert client.table('articulo').execute().data
+    assert breaker.state == 'closed'
+
+
+def test_slow_read_is_hedged():
+    transport = _FlakyTransport([], delays=[0.5, 0])
+    client = _client_with(transport, hedge=True, hedge_delay_ms=20)
+
+    assert client.table('articulo').select('*').execute().data
+    stats = client.resilience_stats()
+    assert stats['hedges'] == 1 and stats['hedge_wins'] == 1
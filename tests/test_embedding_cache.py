@@ -0,0 +1,56 @@
+from models.embedding_cache import CachedEmbeddings, EmbeddingCache, normalize_text
+
+
+class CountingEmbeddings:
+    model = 'test-model'
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_query(self, text):
+        self.calls.append(text)
+        return [float(len(text)), 0.5, -1.0]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+
+def test_normalize_text():
+    assert normalize_text('  Dosis   del\tIBUPROFENO \n') == 'dosis del ibuprofeno'
+
+
+def test_repeated_questions_skip_the_provider():
+    provider = CountingEmbeddings()
+    embeddings = CachedEmbeddings(provider, EmbeddingCache(max_entries=2))
+
+    first = embeddings.embed_query('Dosis del Ibuprofeno')
+    assert embeddings.embed_query('dosis  del ibuprofeno ') == first
+    assert provider.calls == ['dosis del ibuprofeno']
+
+    # LRU acotado: la entrada menos usada sale
+    embeddings.embed_query('a')
+    embeddings.embed_query('b')
+    embeddings.embed_query('dosis del ibuprofeno')
+    assert len(provider.calls) == 4
+
+    stats = embeddings.cache.stats()
+    assert stats['memory_hits'] == 1 and stats['misses'] == 4
+    assert stats['size'] == 2 and stats['hit_rate'] == 0.2
+
+
+def test_disk_tier_is_shared_between_caches(tmp_path):
+    path = str(tmp_path / 'cache' / 'embeddings.sqlite')
+    provider = CountingEmbeddings()
+    CachedEmbeddings(provider, EmbeddingCache(path=path)).embed_query('precio paracetamol')
+
+    # Otro worker con su propio LRU vacío encuentra el vector en disco
+    other = CachedEmbeddings(provider, EmbeddingCache(path=path))
+    assert other.embed_query('Precio Paracetamol') == [18.0, 0.5, -1.0]
+    assert other.embed_query('precio paracetamol') == [18.0, 0.5, -1.0]
+    assert len(provider.calls) == 1
+    stats = other.cache.stats()
+    assert (stats['disk_hits'], stats['memory_hits'], stats['misses']) == (1, 1, 0)
+
+    # Otro modelo no comparte vectores
+    CachedEmbeddings(provider, EmbeddingCache(path=path), model='otro').embed_query('precio paracetamol')
+    assert len(provider.calls) == 2
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from config import Config
+from models.embeddings import EmbeddingProvider, HashedNgramEmbeddings, get_embeddings, embeddings_available
+
+
+def test_local_provider_is_deterministic_and_typo_tolerant():
+    embeddings = HashedNgramEmbeddings(dim=256)
+    query = np.array(embeddings.embed_query('Ibuprofeno 400mg'))
+    assert len(query) == 256 and abs(np.linalg.norm(query) - 1) < 1e-5
+    assert embeddings.embed_query('Ibuprofeno 400mg') == query.tolist()
+
+    typo, other = (np.array(v) for v in embeddings.embed_documents(['IBUPRFOENO 400 mg', 'Vitamina C']))
+    assert query @ typo > 0.3 > 0.1 > query @ other
+    assert embeddings.embed_query('') == [0.0] * 256
+
+
+def test_provider_selected_by_config(monkeypatch):
+    monkeypatch.setattr(Config, 'EMBEDDING_PROVIDER', 'local')
+    monkeypatch.setattr(Config, 'EMBEDDING_DIM', 64)
+    assert get_embeddings().dim == 64 and embeddings_available()
+
+    monkeypatch.delenv('COHERE_API_KEY', raising=False)
+    assert not embeddings_available('cohere')
+    with pytest.raises(ValueError):
+        get_embeddings('cohere')
+    with pytest.raises(ValueError):
+        get_embeddings('otro')
+
+
+def test_provider_must_implement_both_methods():
+    class OnlyQuery(EmbeddingProvider):
+        def embed_query(self, text):
+            return [0.0]
+
+    with pytest.raises(TypeError):
+        OnlyQuery()
+    with pytest.raises(TypeError):
+        EmbeddingProvider()
@@ -0,0 +1,96 @@
+import os
+import threading
+import models.db as db_module
+from models.event_bus import EventBus, StockWatcher
+
+
+def test_bounded_buffer_marks_overflow_and_replays_from_last_event_id():
+    bus = EventBus(history=3)
+    slow = bus.subscribe('stock', maxsize=2)
+    for i in range(1, 5):
+        bus.publish('stock', [{'idarticulo': i, 'stock': i}])
+
+    assert [e.id for e in slow.get(timeout=0)] == [3, 4]
+    assert slow.take_overflow() is True and slow.take_overflow() is False
+    assert slow.get(timeout=0.01) == []
+
+    # Reconexión dentro del historial: se reponen los eventos perdidos
+    resumed = bus.subscribe('stock', last_event_id=2)
+    assert [e.id for e in resumed.get(timeout=0)] == [3, 4] and not resumed.take_overflow()
+    # Demasiado tarde: el historial ya no los tiene
+    assert bus.subscribe('stock', last_event_id=0).take_overflow() is True
+
+    slow.close()
+    assert bus.subscriber_count('stock') == 2
+
+
+def test_get_wakes_up_on_publish():
+    bus = EventBus()
+    subscription = bus.subscribe('stock')
+    threading.Timer(0.05, bus.publish, ('stock', [{'idarticulo': 1, 'stock': 0}])).start()
+    assert subscription.get(timeout=2)[0].data == [{'idarticulo': 1, 'stock': 0}]
+
+
+def test_watcher_publishes_catalog_changes(local_db, monkeypatch):
+    from config import Config
+    monkeypatch.setattr(Config, 'CATALOG_SYNC_LAG', 0)
+    bus = EventBus()
+    subscription = bus.subscribe('stock')
+    watcher = StockWatcher(bus, lambda: local_db, interval=0)
+    watcher.poll()
+
+    local_db.table('articulo').update({'stock': 7}).eq('idarticulo', 1).execute()
+    local_db.table('articulo').delete().eq('idarticulo', 3).execute()
+    assert watcher.poll() == 2
+    assert subscription.get(timeout=0)[0].data == [{'idarticulo': 1, 'stock': 7},
+                                                   {'idarticulo': 3, 'stock': 0, 'deleted': True}]
+
+
+def test_stock_stream_pushes_sale_deltas(local_db, monkeypatch):
+    from app import create_app
+    from config import Config
+    from models.sale_service import SaleService
+    monkeypatch.setattr(Config, 'SUPABASE_BACKEND', 'sqlite')
+    monkeypatch.setattr(Config, 'STOCK_STREAM_POLL', 0)
+    monkeypatch.setattr(Config, 'CATALOG_SYNC_LAG', 0)
+    monkeypatch.setattr(db_module, '_client', local_db)
+    monkeypatch.setattr(db_module, '_client_pid', os.getpid())
+    client = create_app().test_client()
+    with client.session_transaction() as session:
+        session['logueado'] = True
+
+    response = client.get('/sales/stock/stream', buffered=False)
+    chunks = iter(response.response)
+    assert next(chunks).startswith(b'retry:')
+    SaleService(local_db).register([{'idarticulo': 1, 'cantidad': 2, 'precio': 2.0, 'subtotal': 4.0}])
+    message = next(chunks).decode()
+    response.close()
+
+    assert 'event: stock' in message and '"idarticulo": 1, "stock": 48' in message
+
+
+def _block(text, start):
+    """Desde `start` hasta la llave que cierra la primera que se abre"""
+    depth, i = 0, text.index('{', start)
+    while True:
+        depth += {'{': 1, '}': -1}.get(text[i], 0)
+        if depth == 0:
+            return text[start:i + 1]
+        i += 1
+
+
+def test_pos_page_subscribes_to_stock_stream_once(local_db, monkeypatch):
+    from app import create_app
+    from config import Config
+    monkeypatch.setattr(Config, 'SUPABASE_BACKEND', 'sqlite')
+    monkeypatch.setattr(db_module, '_client', local_db)
+    monkeypatch.setattr(db_module, '_client_pid', os.getpid())
+    client = create_app().test_client()
+    with client.session_transaction() as session:
+        session['logueado'] = True
+
+    html = client.get('/sales/create').get_data(as_text=True)
+    subscribe = 'new EventSource("/sales/stock/stream")'
+    assert html.count(subscribe) == 1
+    keydown = _block(html, html.index("addEventListener('keydown'"))
+    assert subscribe not in keydown and 'aplicarStock' not in keydown
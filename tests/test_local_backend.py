@@ -0,0 +1,108 @@
+import pytest
+from models.db import SupabaseHTTPError
+from models.sale_service import SaleService, SaleError
+
+
+def test_filters_order_and_count(local_db):
+    rows = local_db.table('articulo').select('codigo').eq('estado', 'activo') \
+        .or_('stock.lt.5,codigo.eq.ANA001').order('fecha_vencimiento').execute().data
+
+    # NULL al final en orden ascendente, como Postgres
+    assert rows == [{'codigo': 'ANA001'}, {'codigo': 'ANT001'}]
+    assert local_db.table('articulo').lte('stock', 10).count() == 2
+    assert local_db.table('articulo').in_('codigo', ['ANT001', 'VIT001']).not_('estado', 'eq', 'activo').count() == 1
+    assert local_db.table('articulo').ilike('nombre', '*vitamina*').is_('fecha_vencimiento', None).count() == 0
+
+
+def test_embedded_joins_and_sale_rpc(local_db):
+    venta = SaleService(local_db).register([
+        {'idarticulo': 1, 'cantidad': 3, 'precio': 2.0, 'subtotal': 6.0},
+        {'idarticulo': 2, 'cantidad': 1, 'precio': 5.5, 'subtotal': 5.5},
+    ], idcliente=1, idtrabajador=1)
+
+    row = local_db.table('venta').select(
+        '*, cliente(nombre, apellidos), trabajador(usuario), detalle_venta(*, articulo(nombre, codigo))'
+    ).eq('idventa', venta['idventa']).single().execute().data
+
+    assert row['total_venta'] == 11.5
+    assert row['cliente'] == {'nombre': 'Juan', 'apellidos': 'Pérez'}
+    assert row['trabajador'] == {'usuario': 'admin'}
+    assert [d['articulo']['codigo'] for d in row['detalle_venta']] == ['ANA001', 'ANT001']
+    assert local_db.table('articulo').select('stock').eq('idarticulo', 1).single().execute().data['stock'] == 47
+
+
+def test_failed_sale_rolls_back(local_db):
+    with pytest.raises(SaleError, match='Stock insuficiente'):
+        SaleService(local_db).register([
+            {'idarticulo': 1, 'cantidad': 1, 'precio': 2.0, 'subtotal': 2.0},
+            {'idarticulo': 2, 'cantidad': 10, 'precio': 5.5, 'subtotal': 55.0},
+        ])
+
+    assert local_db.table('venta').count() == 0
+    assert local_db.table('articulo').select('stock').eq('idarticulo', 1).single().execute().data['stock'] == 50
+
+
+def test_writes_return_representation(local_db):
+    created = local_db.table('cliente').insert({'nombre': 'Ana'}).execute().data
+    updated = local_db.table('cliente').update({'telefono': '777'}).eq('idcliente', created[0]['idcliente']).execute().data
+    deleted = local_db.table('cliente').delete().eq('nombre', 'Ana').execute().data
+
+    assert updated[0]['telefono'] == '777'
+    assert deleted[0]['idcliente'] == created[0]['idcliente']
+    with pytest.raises(SupabaseHTTPError) as exc:
+        local_db.table('cliente').select('no_existe').execute()
+    assert exc.value.status == 400
+
+
+def test_venta_diaria_follows_sales_and_backfill(local_db):
+    from models.venta_diaria import day_totals, backfill
+    venta = SaleService(local_db).register([{'idarticulo': 1, 'cantidad': 2, 'precio': 2.0, 'subtotal': 4.0}],
+                                           idtrabajador=1)
+    hoy = local_db.table('venta').select('fecha_hora').single().execute().data['fecha_hora'][:10]
+    assert day_totals(local_db, hoy) == (1, 4.0)
+
+    local_db.table('venta').update({'total_venta': 10}).eq('idventa', venta['idventa']).execute()
+    assert day_totals(local_db, hoy) == (1, 10.0)
+
+    local_db.table('venta_diaria').delete().eq('fecha', hoy).execute()
+    assert backfill(local_db) == 1
+    assert day_totals(local_db, hoy) == (1, 10.0)
+
+    local_db.table('detalle_venta').delete().eq('idventa', venta['idventa']).execute()
+    local_db.table('venta').delete().eq('idventa', venta['idventa']).execute()
+    assert day_totals(local_db, hoy) == (0, 0.0)
+
+
+def test_sales_report_aggregates(local_db):
+    service = SaleService(local_db)
+    service.register([{'idarticulo': 1, 'cantidad': 1, 'precio': 2.0, 'subtotal': 2.0}], idtrabajador=1)
+    service.register([{'idarticulo': 1, 'cantidad': 2, 'precio': 2.0, 'subtotal': 4.0}])
+    hoy = local_db.table('venta').select('fecha_hora').limit(1).execute().data[0]['fecha_hora'][:10]
+
+    resumen = local_db.rpc('sales_report', {'p_desde': hoy, 'p_hasta': hoy}).execute().data
+
+    assert (resumen['total_ventas'], resumen['total_monto'], resumen['ticket_promedio']) == (2, 6.0, 3.0)
+    assert resumen['por_dia'] == [{'fecha': hoy, 'cantidad': 2, 'total': 6.0}]
+    assert [(t['usuario'], t['total']) for t in resumen['por_trabajador']] == [(None, 4.0), ('admin', 2.0)]
+    assert local_db.rpc('sales_report', {'p_desde': '2000-01-01', 'p_hasta': '2000-01-31'}).execute().data['total_ventas'] == 0
+
+
+def test_hot_query_plans_use_indexes(local_db):
+    from models.query_plans import hot_queries, check_query_plans
+    # ilike '*texto*' depende de pg_trgm, que no tiene equivalente en SQLite
+    queries = {k: v for k, v in hot_queries(local_db).items() if k != 'cliente por nombre'}
+
+    assert check_query_plans(local_db, min_rows=0, queries=queries) == []
+    problems = check_query_plans(local_db, min_rows=0, queries={'sin índice': local_db.table('cliente').eq('telefono', '1')})
+    assert problems == [{'query': 'sin índice', 'table': 'cliente', 'rows': 1}]
+
+
+def test_query_plans_include_embeds(local_db):
+    from models.query_plans import check_query_plans
+    from models.sale_service import invoice_query
+    SaleService(local_db).register([{'idarticulo': 1, 'cantidad': 1, 'precio': 2.0, 'subtotal': 2.0}])
+    local_db.transport.conn.execute('DROP INDEX idx_detalle_venta_idventa')
+
+    # Sin índice sobre detalle_venta.idventa el embed del recibo recorre la tabla
+    problems = check_query_plans(local_db, min_rows=0, queries={'recibo': invoice_query(local_db, 1)})
+    assert problems == [{'query': 'recibo', 'table': 'detalle_venta', 'rows': 1}]
@@ -0,0 +1,72 @@
+import pytest
+from models.product_lookup import ProductLookupIndex, ProductLookupService, fold
+
+
+PRODUCTS = [
+    {'idarticulo': 1, 'codigo': '7790001', 'nombre': 'Ibuprofeno 400mg', 'stock': 20, 'precio_venta': 1.5},
+    {'idarticulo': 2, 'codigo': '7790002', 'nombre': 'Ácido Acetilsalicílico 100mg', 'stock': 5, 'precio_venta': 0.8},
+    {'idarticulo': 3, 'codigo': '7790003', 'nombre': 'Jarabe de Ibuprofeno Infantil', 'stock': 0, 'precio_venta': 9.0},
+    {'idarticulo': 4, 'codigo': 'IBU800', 'nombre': 'Ibuprofeno 800mg Caja', 'stock': 3, 'precio_venta': 4.0},
+]
+
+
+def test_fold_removes_accents_and_punctuation():
+    assert fold('Ácido  Acetilsalicílico (100mg)') == 'acido acetilsalicilico 100mg'
+
+
+def test_search_by_prefix_code_and_ranking():
+    index = ProductLookupIndex(PRODUCTS)
+
+    # Prefijo de nombre sin acentos, varios términos en cualquier orden
+    assert [p['idarticulo'] for p in index.search('acido acet')] == [2]
+    assert [p['idarticulo'] for p in index.search('100 acid')] == [2]
+    # El nombre que empieza con la frase va antes; el sin stock se excluye
+    assert [p['idarticulo'] for p in index.search('ibupro')] == [1, 4]
+    assert [p['idarticulo'] for p in index.search('ibupro', in_stock=False)] == [1, 4, 3]
+    # Código de barras exacto primero
+    assert index.search('IBU800')[0]['idarticulo'] == 4
+    assert index.get_by_code('7790002')['nombre'].startswith('Ácido')
+    assert index.search('xyz') == []
+    assert len(index.search('', limit=2)) == 2
+
+
+def test_service_reloads_after_writes_and_applies_stocks(local_db):
+    service = ProductLookupService(loader=lambda: local_db.table('articulo').select('*').eq('estado', 'activo').execute().data)
+    assert [p['codigo'] for p in service.search('ana')] == ['ANA001']
+
+    service.apply_stocks([{'idarticulo': 1, 'stock': 0}])
+    assert service.search('ana') == []
+
+    local_db.table('articulo').insert({'codigo': 'ANA002', 'nombre': 'Analgésico Forte', 'stock': 7, 'estado': 'activo'}).execute()
+    service.on_query({'table': 'articulo', 'op': 'insert'})
+    # Recargado: el stock vuelve a leerse de la base y el nombre nuevo coincide antes que el código
+    assert [p['codigo'] for p in service.search('ana')] == ['ANA002', 'ANA001']
+    assert service.loads == 2
+
+
+def test_changes_during_a_reload_are_not_forgotten():
+    catalog = [{'idarticulo': 1, 'codigo': 'ANA001', 'nombre': 'Paracetamol', 'stock': 5}]
+    service = None
+
+    def loader():
+        snapshot = [dict(p) for p in catalog]
+        if service.loads == 0:
+            # Otra petición escribe mientras se lee el catálogo
+            catalog[0]['stock'] = 0
+            service.on_query({'table': 'articulo', 'op': 'update'})
+        return snapshot
+
+    service = ProductLookupService(loader=loader)
+    assert [p['codigo'] for p in service.search('para')] == ['ANA001']
+    assert service.search('para') == []
+    assert service.loads == 2
+
+    def failing():
+        raise RuntimeError('sin base')
+
+    service.loader = failing
+    service.invalidate()
+    with pytest.raises(RuntimeError):
+        service.get_index()
+    service.loader = lambda: catalog
+    assert service.search('para') == [] and service.loads == 3
@@ -0,0 +1,53 @@
+import pytest
+from flask import Flask
+from models.db import SupabaseClient, QueryCache
+from models import query_ledger
+from models.query_ledger import NPlusOneError, query_shape
+
+
+class _StubTransport:
+    def request(self, method, url, op='select', **kwargs):
+        class _Response:
+            status_code = 200
+            headers = {}
+            content = b'[{"stock": 3}]'
+            def raise_for_status(self):
+                pass
+            def json(self):
+                return [{'stock': 3}]
+        return _Response()
+
+
+@pytest.fixture
+def ledger_app():
+    db = SupabaseClient('http://db', 'key', transport=_StubTransport(), cache=QueryCache())
+    app = Flask(__name__)
+    app.config.update(TESTING=True, QUERY_LEDGER_N1_THRESHOLD=3, QUERY_LEDGER_STRICT=False)
+    query_ledger.init_app(app)
+
+    @app.route('/n-plus-one/<int:n>')
+    def n_plus_one(n):
+        for idarticulo in range(n):
+            db.table('articulo').select('stock').eq('idarticulo', idarticulo).execute()
+        return 'ok'
+
+    return app
+
+
+def test_server_timing_reports_request_totals(ledger_app):
+    response = ledger_app.test_client().get('/n-plus-one/2')
+    assert response.headers['Server-Timing'].startswith('db;dur=')
+    assert 'desc="2 queries, 28 B"' in response.headers['Server-Timing']
+
+
+def test_strict_mode_fails_on_repeated_query_shape(ledger_app):
+    ledger_app.config['QUERY_LEDGER_STRICT'] = True
+    client = ledger_app.test_client()
+    assert client.get('/n-plus-one/3').status_code == 200
+    with pytest.raises(NPlusOneError):
+        client.get('/n-plus-one/4')
+
+
+def test_query_shape_hides_values():
+    record = {'method': 'GET', 'table': 'venta', 'query': 'select=*&fecha_hora=gte.2026-01-01&estado=not.eq.x&limit=5'}
+    assert query_shape(record) == 'GET venta?select=*&fecha_hora=gte.?&estado=not.eq.?&limit=5'
@@ -0,0 +1,75 @@
+from models.rag_indexer import AdaptiveRateLimiter, RAGIndexer
+
+
+class FakeEmbeddings:
+    model = 'fake'
+
+    def __init__(self, fail_on=None, rate_limited=0):
+        self.batches = []
+        self.fail_on = fail_on
+        self.rate_limited = rate_limited
+
+    def embed_documents(self, texts):
+        if self.rate_limited:
+            self.rate_limited -= 1
+            raise RuntimeError('429 Too Many Requests')
+        if self.fail_on and any(self.fail_on in t for t in texts):
+            raise RuntimeError('proveedor caído')
+        self.batches.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+def make_indexer(db, embeddings, batch_size=2):
+    limiter = AdaptiveRateLimiter(rate=1000, sleep=lambda s: None)
+    return RAGIndexer(db, embeddings, batch_size=batch_size, concurrency=2, limiter=limiter)
+
+
+def documents(db):
+    return {d['source_key']: d for d in db.table('documents').select('source_key, content, content_hash').execute().data}
+
+
+def test_incremental_run_embeds_only_changes_and_prunes(local_db):
+    local_db.table('documents').insert({'content': 'carga antigua', 'metadata': {'source': 'test'}}).execute()
+    embeddings = FakeEmbeddings()
+    indexer = make_indexer(local_db, embeddings)
+
+    stats = indexer.run(['articulo', 'categoria'])
+    assert stats['embedded'] == 4 and stats['failed_batches'] == 0
+    assert [len(b) for b in embeddings.batches] == [2, 2]
+    assert set(documents(local_db)) >= {'articulo:1', 'articulo:2', 'categoria:1', 'categoria:2'}
+
+    # Sin cambios: no se vuelve a embeber nada
+    assert indexer.run(['articulo', 'categoria'])['embedded'] == 0
+
+    local_db.table('articulo').update({'stock': 49}).eq('idarticulo', 1).execute()
+    local_db.table('articulo').update({'estado': 'inactivo'}).eq('idarticulo', 2).execute()
+    stats = indexer.run(['articulo', 'categoria'], prune_legacy=True)
+    assert (stats['embedded'], stats['unchanged'], stats['deleted'], stats['legacy_deleted']) == (1, 2, 1, 1)
+    docs = documents(local_db)
+    assert 'STOCK ACTUAL: 49' in docs['articulo:1']['content']
+    assert 'articulo:2' not in docs and len(docs) == 3
+
+
+def test_failed_batch_is_resumed_and_rate_limits_back_off(local_db):
+    indexer = make_indexer(local_db, FakeEmbeddings(fail_on='Paracetamol'), batch_size=1)
+    stats = indexer.run(['articulo'])
+    assert (stats['embedded'], stats['failed_batches']) == (1, 1)
+
+    indexer.embeddings = FakeEmbeddings(rate_limited=2)
+    stats = indexer.run(['articulo'])
+    assert (stats['embedded'], stats['failed_batches']) == (1, 0)
+    assert indexer.limiter.throttled == 2
+    assert set(documents(local_db)) == {'articulo:1', 'articulo:2'}
+
+
+def test_rate_limiter_is_aimd():
+    clock, slept = [0.0], []
+    limiter = AdaptiveRateLimiter(rate=2, max_rate=4, clock=lambda: clock[0], sleep=slept.append)
+    limiter.acquire()
+    limiter.acquire()
+    assert slept == [0.5]
+    limiter.throttle()
+    assert limiter.rate == 1
+    for _ in range(20):
+        limiter.success()
+    assert limiter.rate == 4
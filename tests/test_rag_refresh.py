@@ -0,0 +1,76 @@
+from models.event_bus import EventBus
+from models.rag_indexer import RAGIndexer, AdaptiveRateLimiter
+from models.rag_refresh import RAGRefreshQueue
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_queue_debounces_and_coalesces():
+    clock, calls = Clock(), []
+    queue = RAGRefreshQueue(lambda ids: calls.append(ids) or {'embedded': len(ids)},
+                            debounce=5, max_delay=20, batch_size=2, clock=clock)
+    bus = EventBus()
+    bus.add_listener('stock', queue.on_stock_event)
+
+    bus.publish('stock', [{'idarticulo': 3, 'stock': 1}, {'idarticulo': 1, 'stock': 0}])
+    clock.now += 4
+    bus.publish('stock', [{'idarticulo': 3, 'stock': 0}])
+    clock.now += 4
+    assert queue.run_once() == 0  # cambios recientes: todavía en debounce
+    clock.now += 1
+    assert queue.run_once() == 2 and calls == [[1, 3]]
+    assert queue.stats()['last_lag_s'] == 9 and queue.stats()['pending'] == 0
+
+    # Una racha continua no posterga más allá de max_delay
+    for _ in range(6):
+        bus.publish('stock', [{'idarticulo': 7, 'stock': 1}])
+        clock.now += 4
+    assert queue.run_once() == 1 and calls[-1] == [7]
+
+
+def test_failures_are_requeued_with_backoff():
+    clock, attempts = Clock(), []
+
+    def refresher(ids):
+        attempts.append(ids)
+        if len(attempts) == 1:
+            raise RuntimeError('Cohere caído')
+        return {'embedded': 1}
+
+    queue = RAGRefreshQueue(refresher, debounce=1, clock=clock)
+    queue.mark([5])
+    clock.now += 1
+    assert queue.run_once() == 0 and queue.stats()['errors'] == 1
+    clock.now += 1
+    assert queue.run_once() == 0  # backoff
+    clock.now += 2
+    assert queue.run_once() == 1 and queue.stats()['last_lag_s'] == 4
+
+
+def test_refresh_reindexes_only_dirty_products(local_db):
+    class Embeddings:
+        model = 'fake'
+        texts = []
+
+        def embed_documents(self, texts):
+            self.texts.extend(texts)
+            return [[1.0, 0.0] for _ in texts]
+
+    embeddings = Embeddings()
+    indexer = RAGIndexer(local_db, embeddings, limiter=AdaptiveRateLimiter(rate=1000, sleep=lambda s: None))
+    indexer.run(['articulo'])
+    assert len(embeddings.texts) == 2
+
+    local_db.table('articulo').update({'stock': 3}).eq('idarticulo', 2).execute()
+    local_db.table('articulo').delete().eq('idarticulo', 1).execute()
+    result = indexer.refresh('articulo', [1, 2])
+    assert result == {'documents': 1, 'embedded': 1, 'deleted': 1}
+    assert 'STOCK ACTUAL: 3' in embeddings.texts[-1]
+    keys = [d['source_key'] for d in local_db.table('documents').select('source_key').execute().data]
+    assert keys == ['articulo:2']
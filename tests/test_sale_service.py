@@ -0,0 +1,48 @@
+import pytest
+from models.db import SupabaseClient
+from models.sale_service import SaleService, SaleError
+
+
+class _RecordingResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, data):
+        self._data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._data
+
+
+class _RecordingTransport:
+    def __init__(self):
+        self.calls = []
+
+    def request(self, method, url, op='select', **kwargs):
+        self.calls.append((method, url, kwargs.get('json')))
+        return _RecordingResponse({'idventa': 7, 'total_venta': 13.0, 'stocks': []})
+
+
+def test_register_is_single_rpc_round_trip():
+    transport = _RecordingTransport()
+    service = SaleService(SupabaseClient('http://db', 'key', transport=transport))
+
+    venta = service.register([
+        {'idarticulo': '3', 'cantidad': '2', 'precio': 5.5, 'subtotal': '11.00', 'nombre': 'X'},
+        {'idarticulo': 4, 'cantidad': 1, 'precio': 2, 'subtotal': 2},
+    ], idcliente='1', idtrabajador=2)
+
+    assert venta['idventa'] == 7
+    assert len(transport.calls) == 1
+    method, url, payload = transport.calls[0]
+    assert (method, url) == ('POST', 'http://db/rest/v1/rpc/register_sale')
+    assert payload['p_idcliente'] == 1
+    assert payload['p_items'][0] == {'idarticulo': 3, 'cantidad': 2, 'precio': 5.5, 'subtotal': 11.0}
+
+
+def test_register_rejects_empty_cart():
+    with pytest.raises(SaleError):
+        SaleService(SupabaseClient('http://db', 'key', transport=_RecordingTransport())).register([])
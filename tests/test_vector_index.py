@@ -0,0 +1,128 @@
+import numpy as np
+
+from models.db import add_query_listener, remove_query_listener
+from models.vector_index import LocalVectorStore, VectorIndex
+
+ROWS = [
+    {'id': 1, 'content': 'paracetamol', 'embedding': [1.0, 0.0, 0.0], 'metadata': {'type': 'product'}, 'version': 1},
+    {'id': 2, 'content': 'ibuprofeno', 'embedding': '[0.8,0.6,0]', 'metadata': {'type': 'product'}, 'version': 2},
+    {'id': 3, 'content': 'analgésicos', 'embedding': [0.6, 0.8, 0.0], 'metadata': {'type': 'categoria'}, 'version': 3},
+]
+
+
+def test_search_top_k_filters_and_int8():
+    index = VectorIndex.from_rows(ROWS)
+    assert [d['id'] for d in index.search([1, 0, 0], top_k=2)] == [1, 2]
+    assert [d['id'] for d in index.search([1, 0, 0], top_k=3, threshold=0.7)] == [1, 2]
+    assert [d['id'] for d in index.search([1, 0, 0], where={'type': 'categoria'})] == [3]
+    assert [d['id'] for d in index.search([0, 1, 0], where={'type': ['product', 'otro']})] == [2]
+
+    quantized = VectorIndex.from_rows(ROWS, dtype='int8')
+    assert quantized.matrix.dtype == np.int8
+    results = quantized.search([0.6, 0.8, 0], top_k=3)
+    assert [d['id'] for d in results] == [3, 2, 1]
+    assert abs(results[0]['similarity'] - 1.0) < 0.01
+
+
+def test_apply_updates_deletes_and_snapshot(tmp_path):
+    index = VectorIndex.from_rows(ROWS).apply(
+        [{'id': 1, 'content': 'paracetamol', 'embedding': [0, 0, 1], 'metadata': None, 'version': 7}], deleted_ids=[2])
+    assert len(index) == 2 and index.version == 7
+    assert index.search([0, 0, 1], top_k=1)[0]['id'] == 1
+
+    index.save(str(tmp_path))
+    loaded = VectorIndex.load(str(tmp_path))
+    assert isinstance(loaded.matrix, np.memmap)
+    assert loaded.version == 7 and sorted(loaded.ids.tolist()) == [1, 3]
+    assert loaded.search([0, 0, 1], top_k=1)[0]['content'] == 'paracetamol'
+
+
+def test_store_refreshes_incrementally(local_db, tmp_path):
+    local_db.table('documents').insert([{k: r[k] for k in ('content', 'embedding', 'metadata')} for r in ROWS[:2]]).execute()
+    store = LocalVectorStore(lambda: local_db, path=str(tmp_path), refresh_interval=3600)
+    assert [d['content'] for d in store.search([1, 0, 0], top_k=5)] == ['paracetamol', 'ibuprofeno']
+
+    local_db.table('documents').update({'embedding': [0, 1, 0]}).eq('id', 1).execute()
+    local_db.table('documents').delete().eq('id', 2).execute()
+    assert len(store.search([1, 0, 0], top_k=5)) == 2  # dentro del intervalo: sin consultar
+    store.invalidate()
+    assert [d['id'] for d in store.search([0, 1, 0], top_k=5)] == [1]
+    assert store.stats()['rows_applied'] == 4
+
+    # Otro worker arranca desde el snapshot y sólo pide lo nuevo
+    other = LocalVectorStore(lambda: local_db, path=str(tmp_path))
+    assert [d['id'] for d in other.search([0, 1, 0], top_k=5)] == [1]
+    assert other.stats()['from_snapshot'] and other.stats()['rows_applied'] == 0
+
+
+def test_store_applies_tombstones_without_scanning_ids(local_db):
+    local_db.table('documents').insert([{k: r[k] for k in ('content', 'embedding', 'metadata')} for r in ROWS]).execute()
+    store = LocalVectorStore(lambda: local_db, refresh_interval=3600)
+    assert len(store.search([1, 0, 0], top_k=5, threshold=-1)) == 3
+
+    # Editado y borrado entre dos refrescos: la lápida gana
+    local_db.table('documents').update({'content': 'ibuprofeno 400'}).eq('id', 2).execute()
+    local_db.table('documents').delete().eq('id', 2).execute()
+    queries = []
+    add_query_listener(queries.append)
+    try:
+        store.invalidate()
+        assert [d['id'] for d in store.search([1, 0, 0], top_k=5, threshold=-1)] == [1, 3]
+    finally:
+        remove_query_listener(queries.append)
+    assert [q['table'] for q in queries] == ['documents', 'documents_borrado']
+    assert all('version=gt.' in q['query'] for q in queries)
+    assert store.stats()['version'] == local_db.table('documents_borrado').select('version').execute().data[0]['version']
+
+
+def test_store_cursor_waits_for_versions_committed_out_of_order(local_db, tmp_path):
+    conn = local_db.transport.conn
+
+    def insert(row, version, recent):
+        doc = local_db.table('documents').insert({k: row[k] for k in ('content', 'embedding', 'metadata')}).execute().data[0]
+        stamp = "datetime('now', 'localtime')" if recent else "'2000-01-01 00:00:00'"
+        with conn:
+            conn.execute(f"UPDATE documents SET version = {version}, updated_at = {stamp} WHERE id = {doc['id']}")
+        return doc['id']
+
+    store = LocalVectorStore(lambda: local_db, path=str(tmp_path), refresh_interval=3600, lag=60)
+    # Versiones explícitas distintas de las del trigger (si no cambian, el trigger las renueva)
+    insert(ROWS[0], 101, recent=False)
+    insert(ROWS[1], 103, recent=True)
+    assert len(store.search([1, 0, 0], top_k=5, threshold=-1)) == 2
+    # La versión 103 es reciente: la 102 podría seguir en una transacción
+    assert store.stats()['version'] == 101 and VectorIndex.load(str(tmp_path)).version == 101
+
+    # El lote con la versión 102 se confirma tarde
+    late = insert(ROWS[2], 102, recent=True)
+    store.invalidate()
+    assert late in [d['id'] for d in store.search([0.6, 0.8, 0], top_k=5, threshold=-1)]
+    assert store.stats()['version'] == 101
+
+    with conn:
+        conn.execute("UPDATE documents SET version = version + 100, updated_at = '2000-01-01 00:00:00'")
+    store.invalidate()
+    assert len(store.get_index()) == 3 and store.stats()['version'] == 203
+
+
+def test_snapshots_keep_previous_and_missing_arrays_fall_back_to_db(local_db, tmp_path):
+    import os
+    import shutil
+    index = VectorIndex.from_rows(ROWS)
+    for version in (3, 4, 5):
+        index.version = version
+        index.save(str(tmp_path))
+    # Sólo el snapshot actual y el anterior (un worker puede estar abriéndolo)
+    snapshots = sorted(e for e in os.listdir(tmp_path) if e.startswith('snapshot-'))
+    assert [e.split('-')[1] for e in snapshots] == ['4', '5']
+
+    # Otro worker borró los arrays a los que apunta index.json: se reconstruye desde la base
+    for entry in snapshots:
+        shutil.rmtree(tmp_path / entry)
+    assert VectorIndex.load(str(tmp_path)) is None
+    local_db.table('documents').insert([{k: r[k] for k in ('content', 'embedding', 'metadata')} for r in ROWS[:2]]).execute()
+    store = LocalVectorStore(lambda: local_db, path=str(tmp_path), refresh_interval=3600)
+    assert len(store.search([1, 0, 0], top_k=5)) == 2 and not store.stats()['from_snapshot']
+
+    (tmp_path / 'index.json').write_text('{"version": 1', encoding='utf-8')
+    assert VectorIndex.load(str(tmp_path)) is None